@@ -22,14 +22,28 @@ class Agent:
         - alpha: 学习率
         - gamma: 折扣因子
         - epsilon: 探索率
-        - beta: 记忆使用率"""
+        - beta: 记忆使用率
+        - memory: 记忆，默认为 Memory，也可传入 ArrayMemory 等同接口的实现，
+          或带 capacity 的有界记忆
+        - rng: 代理自己的随机数生成器，为 None 时使用全局的 random 与
+          np.random；给定时代理的全部随机选择只消耗自己的随机数流，
+          结果与代理的执行顺序、所在进程或线程无关
+        - similar_threshold: 近似声音阈值，为 None 时只按名称精确匹配；
+          否则未听过的声音与已知声音的相似度不低于阈值时视为该已知声音"""
 
-    def __init__(self, env, id: int, name: str = "Agent"):
+    def __init__(self,
+                 env,
+                 id: int,
+                 name: str = "Agent",
+                 memory=None,
+                 rng: np.random.Generator = None):
         """初始化人类"""
         self.id = id
         self.name = name
         self.env = env
-        self.position = np.random.rand(2) * env.size
+        self.rng = rng
+        self.position = (np.random.rand(2)
+                         if rng is None else rng.random(2)) * env.size
         self.tx_range = 100
         self.rx_range = 100
         self.sounds = []
@@ -40,14 +54,47 @@ class Agent:
         self.gamma = 0.9  # 折扣因子
         self.epsilon = 0.1  # 探索率
         self.beta = 0.95  # 记忆使用率
-        self.memory = Memory()  # 记忆图
+        self.memory = Memory(
+            rng=rng) if memory is None else memory  # 记忆图
         self.mood = 0  # 情绪
         self.actions = ["cry", "laugh"]
+        self.similar_threshold = None  # 近似声音阈值
+
+    def __getstate__(self):
+        # 环境不随代理序列化，由接收方重新挂接
+        state = self.__dict__.copy()
+        state["env"] = None
+        return state
+
+    def _uniform(self):
+        """0-1 间的随机数"""
+        if self.rng is None:
+            return np.random.uniform(0, 1)
+        return self.rng.random()
+
+    def _choice(self, seq):
+        """从序列中随机选一个"""
+        if self.rng is None:
+            return random.choice(seq)
+        return seq[int(self.rng.integers(len(seq)))]
 
     def receive_sound(self, sound: sd.Sound):
         """接收信号"""
         # 更新记忆
         self.memory.match_node(sound.name, sound, sound=True)
+        self.memory.enforce_capacity()
+
+    def receive_sounds(self, sounds: list[sd.Sound]):
+        """一次接收多个信号"""
+        self.memory.match_nodes([(sound.name, sound, {
+            "sound": True
+        }) for sound in sounds])
+        self.memory.enforce_capacity()
+
+    def hear(self, sound: sd.Sound, scheduler):
+        """事件调度器中声音到达时调用，默认只接收声音。子类可以在这里
+        回应，如 send_sound 或 scheduler.schedule 新的事件"""
+        self.receive_sound(sound)
 
     def send_sound(self, sound: sd.Sound):
         """发送信号"""
@@ -60,13 +107,13 @@ class Agent:
         return SimpleNamespace(name=name, data=data, kwargs=kwargs)
 
     def make_rand_sound(self):
-        constant = self.consonants[random.choice("bpmfd")]
-        vowel = self.vowels[random.choice("aeiouü")]
-        sound = sd.Sound([constant, vowel])
+        constant = self.consonants[self._choice("bpmfd")]
+        vowel = self.vowels[self._choice("aeiouü")]
+        sound = sd.Sound.get([constant, vowel])
         return SimpleNamespace(name=sound.name, data=sound)
 
     def make_rand_good(self):
-        good = random.choice(self.env.goods)
+        good = self._choice(self.env.goods)
         return SimpleNamespace(name=f"{good}", data=good)
 
     def associate(self, data1, data2):
@@ -74,15 +121,22 @@ class Agent:
         node1 = self.memory.match_node(data1.name, data1.data, **data1.kwargs)
         node2 = self.memory.match_node(data2.name, data2.data, **data2.kwargs)
         conneted = False
-        if self.memory.data.are_connected(node1, node2):
+        if self.memory.are_adjacent(node1, node2):
             # 如果已经连接，则不需要重新连接
             conneted = True
         edge = self.memory.match_edge(node1, node2)
         if conneted:
             # 权重提高
-            edge['weight'] *= 2
+            self.memory.set_weight(edge, edge['weight'] * 2)
         return edge
 
+    def associate_many(self, pairs):
+        """批量建立联系，pairs 为 wrap_data 包装后的 (data1, data2)"""
+        return self.memory.associate_many([
+            ((d1.name, d1.data, d1.kwargs), (d2.name, d2.data, d2.kwargs))
+            for d1, d2 in pairs
+        ])
+
     def get_associatian(self, data_name: str, **kwarg):
         """在记忆中寻找与 data 相关的节点"""
         data_node = self.memory.match_node(data_name)
@@ -108,9 +162,8 @@ class Agent:
         other_args = {k: kwargs[k] for k in param_map['other'] if k in kwargs}
 
         data_node = self.memory.match_node(data_name, data, **data_args)
-        if np.random.uniform(0, 1) < self.epsilon or np.random.uniform(
-                0,
-                1) > self.beta or not self.memory.select_nodes(**other_args):
+        if (self._uniform() < self.epsilon or self._uniform() > self.beta
+                or not self.memory.select_nodes(**other_args)):
             other = callback()
             other_node = self.memory.match_node(other.name, other.data,
                                                 **other_args)
@@ -119,15 +172,15 @@ class Agent:
             other_node = self.memory.max_weight_node(data_node)
             if not other_node:
                 other_nodes = self.memory.select_nodes(**other_args)
-                other_node = random.choice(other_nodes)
+                other_node = self._choice(other_nodes)
             other = other_node['data']
         return other
 
     def choose_sound(self, data, name, **kwargs):
         """选择声音"""
         data_node = self.memory.match_node(name, data, **kwargs)
-        if np.random.uniform(0, 1) < self.epsilon or np.random.uniform(
-                0, 1) > self.beta or not self.memory.select_nodes(sound=True):
+        if (self._uniform() < self.epsilon or self._uniform() > self.beta
+                or not self.memory.select_nodes(sound=True)):
             other = self.make_rand_sound()
             other_node = self.memory.match_node(other.name,
                                                 other.data,
@@ -137,15 +190,27 @@ class Agent:
             other_node = self.memory.max_weight_node(data_node)
             if not other_node:
                 other_nodes = self.memory.select_nodes(sound=True)
-                other_node = random.choice(other_nodes)
+                other_node = self._choice(other_nodes)
             other = other_node['data']
         return other
 
+    def recall_sound(self, sound: sd.Sound):
+        """把未听过的声音映射为记忆中最相似的已知声音，相似度低于
+        similar_threshold 或未设阈值时返回原声音"""
+        if self.similar_threshold is None or self.memory.index.find(
+                sound.name) is not None:
+            return sound
+        matches = self.memory.match_similar(sound, 1)
+        if matches and matches[0][1] >= self.similar_threshold:
+            return matches[0][0]["data"]
+        return sound
+
     def choose_good(self, sound: sd.Sound):
         """选择物体"""
+        sound = self.recall_sound(sound)
         data_node = self.memory.match_node(sound.name, sound, sound=True)
-        if np.random.uniform(0, 1) < self.epsilon or np.random.uniform(
-                0, 1) > self.beta or not self.memory.select_nodes(good=True):
+        if (self._uniform() < self.epsilon or self._uniform() > self.beta
+                or not self.memory.select_nodes(good=True)):
             other = self.make_rand_good()
             other_node = self.memory.match_node(other.name,
                                                 other.data,
@@ -155,7 +220,7 @@ class Agent:
             other_node = self.memory.max_weight_node(data_node)
             if not other_node:
                 other_nodes = self.memory.select_nodes(good=True)
-                other_node = random.choice(other_nodes)
+                other_node = self._choice(other_nodes)
             other = other_node['data']
         return other
 
@@ -181,7 +246,9 @@ class Agent:
             reward + self.gamma * next_max)
 
         # 更新边的权重
-        edge['weight'] = new_value
+        self.memory.set_weight(edge, new_value)
+        # 超出容量时淘汰节点，此后不再持有节点句柄
+        self.memory.enforce_capacity()
 
     def show_memory(self, n: int = 5):
         """展示记忆"""
@@ -189,21 +256,21 @@ class Agent:
         self.memory.plot(n, [action for action in self.actions])
 
     def choose_action(self, sound: sd.Sound = None):
-        if sound is None or np.random.uniform(
-                0, 1) < self.epsilon or np.random.uniform(
-                    0, 1) > self.beta or not self.memory.select_nodes(
-                        action=True):
+        if (sound is None or self._uniform() < self.epsilon
+                or self._uniform() > self.beta
+                or not self.memory.select_nodes(action=True)):
             other = self.give_action()
             other_node = self.memory.match_node(other.name,
                                                 other.data,
                                                 action=True)
             other = other.data
         else:
+            sound = self.recall_sound(sound)
             data_node = self.memory.match_node(sound.name, sound, sound=True)
             other_node = self.memory.max_weight_node(data_node)
             if not other_node:
                 other_nodes = self.memory.select_nodes(action=True)
-                other_node = random.choice(other_nodes)
+                other_node = self._choice(other_nodes)
             other = other_node['data']
         action = getattr(self, other)
         action()
@@ -211,7 +278,7 @@ class Agent:
 
     def give_action(self):
         """给出动作"""
-        action = random.choice(self.actions)
+        action = self._choice(self.actions)
         return SimpleNamespace(name=action, data=action)
 
     def cry(self):
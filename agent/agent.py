@@ -1,6 +1,6 @@
 import numpy as np
 import combination.sound as sd
-from base import BaseAgent
+from agent.base import BaseAgent
 from combination.constructor import Constructor
 
 
@@ -29,7 +29,7 @@ class Agent(BaseAgent):
         """生成一个随机的单词"""
         vowel = np.random.choice(self.vowels)
         constant = np.random.choice(self.consonants)
-        return sd.Sound([vowel, constant])
+        return sd.Sound.get([vowel, constant])
 
     def construct_sentence(self, *args):
         v_node = self.memory.match_node("_verb_")
@@ -18,9 +18,10 @@ class BaseAgent:
         - alpha: 学习率
         - gamma: 折扣因子
         - epsilon: 探索率
-        - beta: 记忆使用率"""
+        - beta: 记忆使用率
+        - memory: 记忆，默认为 BaseMemory，可传入带 capacity 的有界记忆"""
 
-    def __init__(self, env, id: int, name: str = "Agent"):
+    def __init__(self, env, id: int, name: str = "Agent", memory=None):
         """初始化人类"""
         self.id = id
         self.name = name
@@ -30,7 +31,7 @@ class BaseAgent:
         self.gamma = 0.9  # 折扣因子
         self.epsilon = 0.1  # 探索率
         self.beta = 0.95  # 记忆使用率
-        self.memory = BaseMemory()  # 记忆图
+        self.memory = BaseMemory() if memory is None else memory  # 记忆图
 
     def associate(self, data1, data2):
         """建立联系，如果已经存在则加倍权重"""
@@ -38,9 +39,15 @@ class BaseAgent:
         node2 = self.memory.match_node(data2)
         edge, is_connected = self.memory.match_edge(node1, node2)
         if is_connected:
-            edge['weight'] *= 2
+            self.memory.set_weight(edge, edge['weight'] * 2)
         return edge
 
+    def associate_many(self, pairs):
+        """批量建立联系，pairs 为 (data1, data2)，规则同 associate"""
+        return self.memory.associate_many([
+            ((d1.__repr__(), d1), (d2.__repr__(), d2)) for d1, d2 in pairs
+        ])
+
     def get_associatian(self, data_name: str, **kwarg):
         """在记忆中寻找与 data 相关的节点，如果不满足返回 None。"""
         data_node = self.memory.match_node(data_name)
@@ -70,24 +77,34 @@ class BaseAgent:
             next_value = 0 if not next_action_max_node else next_action_max_node[
                 'weight']
         # 认为 state 保持不变
-        edge['weight'] = (
-                1 -
-                self.beta) * value + self.beta * reward + self.gamma * next_value
+        self.memory.set_weight(
+            edge, (1 - self.beta) * value + self.beta * reward +
+            self.gamma * next_value)
+        self.memory.enforce_capacity()
 
     def show_memory(self, num: int, names=None):
         self.memory.plot(num, names=names)
 
-    def save_memory(self):
+    def _memory_path(self, binary: bool):
         dir_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-        file_path = os.path.join(dir_path, "/result/", f"{self.name}.net")
-        self.memory.save(file_path)
+        suffix = "snap" if binary else "net"
+        return os.path.join(dir_path, "result", f"{self.name}.{suffix}")
 
-    def load_memory(self):
-        dir_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-        file_path = os.path.join(dir_path, "/result/", f"{self.name}.net")
-        if os.path.exists(file_path):
-            self.memory.load(file_path)
+    def save_memory(self, binary: bool = False):
+        """保存记忆，binary 为 True 时保存为二进制快照目录"""
+        file_path = self._memory_path(binary)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if binary:
+            self.memory.save_snapshot(file_path)
         else:
-            raise FileNotFoundError(f"Memory file {file_path} not found.")
-        
+            self.memory.save(file_path)
 
+    def load_memory(self, binary: bool = False):
+        """载入记忆，binary 为 True 时从二进制快照目录载入"""
+        file_path = self._memory_path(binary)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Memory file {file_path} not found.")
+        if binary:
+            self.memory.load_snapshot(file_path)
+        else:
+            self.memory.load(file_path)
@@ -0,0 +1,161 @@
+import numpy as np
+import combination.sound as sd
+from memory.memory import Memory
+
+
+def sound_space():
+    """Agent.make_rand_sound 可能产生的全部声音：辅音 + 元音"""
+    return [
+        sd.Sound.get([sd.dict_consonants[c], sd.dict_vowels[v]])
+        for c in "bpmfd" for v in "aeiouü"
+    ]
+
+
+class Population:
+    """群体 Q 表，所有代理的 状态→声音 权重保存在一个张量中，
+    Q-learning 更新对全部代理一次向量化完成。批量的选择与更新只用于
+    Environment.train_population；Environment.train 与
+    task.task.train_action 中每个代理有自己的记忆图，仍由执行器逐个代理
+    选择与更新。
+
+    属性：
+        - q: 权重张量 (代理 × 状态 × 声音)，尚未建立联系的位置为 NaN
+        - heard: 代理是否认识该声音 (代理 × 声音)
+        - states: 状态列表（动作或物品）
+        - sounds: 声音列表
+        - state_kind: 导出记忆时状态节点的属性名，如 "action"、"good"
+        - alpha: 学习率
+        - gamma: 折扣因子
+        - epsilon: 探索率
+        - beta: 记忆使用率"""
+
+    def __init__(self,
+                 num_agents: int,
+                 states: list,
+                 sounds: list[sd.Sound] = None,
+                 state_kind: str = "action",
+                 seed: int = None):
+        """初始化群体"""
+        self.states = list(states)
+        self.sounds = sound_space() if sounds is None else list(sounds)
+        self.sound_ids = {sound.name: i for i, sound in enumerate(self.sounds)}
+        self.state_kind = state_kind
+        self.q = np.full((num_agents, len(self.states), len(self.sounds)),
+                         np.nan)
+        self.heard = np.zeros((num_agents, len(self.sounds)), dtype=bool)
+        self.rng = np.random.default_rng(seed)
+        self.alpha = 0.2  # 学习率
+        self.gamma = 0.9  # 折扣因子
+        self.epsilon = 0.1  # 探索率
+        self.beta = 0.95  # 记忆使用率
+
+    @property
+    def num_agents(self):
+        return self.q.shape[0]
+
+    @property
+    def num_states(self):
+        return self.q.shape[1]
+
+    @property
+    def num_sounds(self):
+        return self.q.shape[2]
+
+    def _touch(self, agents, states, sound):
+        """确保 (代理, 状态, 声音) 已建立联系，新联系的权重为 0-1 间的随机数"""
+        values = self.q[agents, states, sound]
+        missing = np.isnan(values)
+        if missing.any():
+            values[missing] = self.rng.random(missing.sum())
+            self.q[agents, states, sound] = values
+        self.heard[agents, sound] = True
+
+    def associate(self, state: int, sound: int, agents=None):
+        """建立联系，如果已经存在则加倍权重，规则同 Agent.associate"""
+        agents = np.arange(self.num_agents) if agents is None else agents
+        values = self.q[agents, state, sound]
+        missing = np.isnan(values)
+        values[~missing] *= 2
+        values[missing] = self.rng.random(missing.sum())
+        self.q[agents, state, sound] = values
+        self.heard[agents, sound] = True
+
+    def choose_sound(self, agent: int, state: int):
+        """为状态选择声音，ε-贪心规则同 Agent.choose_sound，返回声音编号"""
+        if self.rng.random() < self.epsilon or self.rng.random(
+        ) > self.beta or not self.heard[agent].any():
+            sound = int(self.rng.integers(self.num_sounds))
+            self.heard[agent, sound] = True
+            return sound
+        row = self.q[agent, state]
+        if np.isnan(row).all():
+            return int(self.rng.choice(np.flatnonzero(self.heard[agent])))
+        return int(np.nanargmax(row))
+
+    def choose_state(self, agent: int, sound: int):
+        """听到声音后选择状态，ε-贪心规则同 Agent.choose_action，
+        返回状态编号"""
+        self.heard[agent, sound] = True
+        if self.rng.random() < self.epsilon or self.rng.random() > self.beta:
+            return int(self.rng.integers(self.num_states))
+        column = self.q[agent, :, sound]
+        if np.isnan(column).all():
+            return int(self.rng.integers(self.num_states))
+        return int(np.nanargmax(column))
+
+    def choose_states(self, sound: int, agents=None):
+        """一组代理（默认全部）同时听到声音并选择状态，返回状态编号数组。
+
+        探索掩码由一次随机数组抽取，贪心选择按列一次 argmax 得到，
+        规则与逐个调用 choose_state 相同。"""
+        agents = np.arange(self.num_agents) if agents is None else agents
+        self.heard[agents, sound] = True
+        draws = self.rng.random((2, len(agents)))
+        columns = self.q[agents, :, sound]
+        known = ~np.isnan(columns)
+        explore = (draws[0] < self.epsilon) | (draws[1] > self.beta)
+        explore |= ~known.any(axis=1)
+        greedy = np.where(known, columns, -np.inf).argmax(axis=1)
+        random_states = self.rng.integers(self.num_states, size=len(agents))
+        return np.where(explore, random_states, greedy)
+
+    def update(self, state: int, sound: int, next_states, rewards,
+               agents=None):
+        """对一组代理（默认全部）同时执行 Agent.update_qlearning"""
+        agents = np.arange(self.num_agents) if agents is None else agents
+        self._touch(agents, state, sound)
+        old = self.q[agents, state, sound]
+        self._touch(agents, next_states, sound)
+        next_max = np.nanmax(self.q[agents, next_states], axis=1)
+        self.q[agents, state, sound] = (1 - self.alpha) * old + self.alpha * (
+            rewards + self.gamma * next_max)
+
+    def replay(self, buffer, batch_size: int = 64):
+        """从经验回放缓冲区抽取一批经验，一次向量化地执行 Q-learning 更新。
+        同一批中重复的 (代理, 状态, 声音) 只保留最后一次更新。"""
+        if not len(buffer):
+            return
+        agents, states, sounds, next_states, rewards = buffer.sample(
+            batch_size)
+        self._touch(agents, states, sounds)
+        old = self.q[agents, states, sounds]
+        self._touch(agents, next_states, sounds)
+        next_max = np.nanmax(self.q[agents, next_states], axis=1)
+        self.q[agents, states,
+               sounds] = (1 - self.alpha) * old + self.alpha * (
+                   rewards + self.gamma * next_max)
+
+    def to_memory(self, agent: int, memory=None):
+        """导出单个代理的记忆图，新边的初始随机权重取自 self.rng"""
+        memory = Memory(rng=self.rng) if memory is None else memory
+        states = memory.match_nodes([(f"{state}", state, {
+            self.state_kind: True
+        }) for state in self.states])
+        sounds = {}
+        for i in np.flatnonzero(self.heard[agent]).tolist():
+            sound = self.sounds[i]
+            sounds[i] = memory.match_node(sound.name, sound, sound=True)
+        for state, sound in zip(*np.nonzero(~np.isnan(self.q[agent]))):
+            edge = memory.match_edge(states[state], sounds[sound])
+            memory.set_weight(edge, float(self.q[agent, state, sound]))
+        return memory
@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class ReplayBuffer:
+    """经验回放环形缓冲区，(代理, 状态, 声音, 下一状态, 奖励) 按列保存在
+    定长数组中，写满后覆盖最早的经验。
+
+    属性：
+        - capacity: 容量
+        - agents: 代理编号
+        - states: 状态编号
+        - sounds: 声音编号
+        - next_states: 下一状态编号
+        - rewards: 奖励
+        - rng: 抽样用的随机数生成器"""
+
+    def __init__(self, capacity: int, seed=None):
+        """初始化缓冲区，seed 为种子或 numpy.random.Generator"""
+        self.capacity = capacity
+        self.agents = np.zeros(capacity, dtype=np.int64)
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.sounds = np.zeros(capacity, dtype=np.int64)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.rng = np.random.default_rng(seed)
+        self.size = 0  # 已保存的经验数
+        self.pos = 0  # 下一条经验写入的位置
+
+    def __len__(self):
+        return self.size
+
+    def add(self, agents, states, sounds, next_states, rewards):
+        """写入一批经验，标量参数按 agents 的长度广播"""
+        agents = np.atleast_1d(agents)
+        n = len(agents)
+        if n > self.capacity:
+            # 只保留最后 capacity 条
+            keep = slice(n - self.capacity, n)
+            agents = agents[keep]
+            states, sounds, next_states, rewards = [
+                np.broadcast_to(x, n)[keep]
+                for x in (states, sounds, next_states, rewards)
+            ]
+            n = self.capacity
+        slots = (self.pos + np.arange(n)) % self.capacity
+        self.agents[slots] = agents
+        self.states[slots] = states
+        self.sounds[slots] = sounds
+        self.next_states[slots] = next_states
+        self.rewards[slots] = rewards
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size: int):
+        """有放回地均匀抽取一批经验，返回
+        (agents, states, sounds, next_states, rewards)"""
+        if not self.size:
+            raise ValueError("cannot sample from an empty replay buffer")
+        slots = self.rng.integers(self.size, size=batch_size)
+        return (self.agents[slots], self.states[slots], self.sounds[slots],
+                self.next_states[slots], self.rewards[slots])
+
+    def clear(self):
+        self.size = 0
+        self.pos = 0
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+from agent.population import Population
+from agent.replay import ReplayBuffer
+
+
+def test_population_update():
+    p = Population(3, ["cry", "laugh"], seed=0)
+    p.q[:, 0, 4] = [1., 2., 3.]
+    p.q[:, 1, :] = 0.
+    p.q[:, 1, 7] = [4., 5., 6.]
+    p.update(0, 4, np.array([1, 1, 1]), 10.)
+    expected = 0.8 * np.array([1., 2., 3.]) + 0.2 * (10 + 0.9 * np.array(
+        [4., 5., 6.]))
+    assert np.allclose(p.q[:, 0, 4], expected)
+    # 未建立的联系以随机权重建立
+    p.update(1, 2, np.array([0]), 0., agents=np.array([0]))
+    assert not np.isnan(p.q[0, 1, 2]) and np.isnan(p.q[1, 0, 2])
+
+
+def test_population_choose_states():
+    p = Population(4, ["cry", "laugh", "wait"], seed=0)
+    p.q[:, :, 1] = [[0., 1., 2.], [3., 2., 1.], [np.nan, 5., 1.],
+                    [np.nan] * 3]
+    p.epsilon, p.beta = 0., 1.
+    choices = p.choose_states(1)
+    assert choices[:3].tolist() == [2, 0, 1]
+    assert p.heard[:, 1].all()
+    p.epsilon = 1.
+    choices = np.concatenate([p.choose_states(1) for _ in range(200)])
+    assert set(choices.tolist()) == {0, 1, 2}
+
+
+def test_population_to_memory():
+    p = Population(2, ["cry", "laugh"], seed=0)
+    p.associate(0, 3)
+    p.associate(0, 3, agents=np.array([1]))
+    memory = p.to_memory(1)
+    node = memory.max_weight_node(memory.match_node("cry"))
+    assert node["data"] is p.sounds[3]
+    assert memory.max_weight_edge(
+        memory.match_node("cry"))["weight"] == p.q[1, 0, 3]
+    assert len(memory.select_nodes(action=True)) == 2
+    # 只消耗群体自己的随机数流，给定 seed 时可重现
+    np.random.seed(5)
+    expected = np.random.random()
+    np.random.seed(5)
+    q = Population(2, ["cry", "laugh"], seed=0)
+    q.associate(0, 3)
+    q.associate(0, 3, agents=np.array([1]))
+    q.to_memory(1)
+    assert np.random.random() == expected
+    assert q.rng.random() == p.rng.random()
+
+
+def test_replay_buffer():
+    buffer = ReplayBuffer(5, seed=0)
+    with pytest.raises(ValueError):
+        buffer.sample(1)
+    buffer.add(np.arange(3), 1, 2, np.array([0, 1, 0]), 4.)
+    buffer.add(np.array([7, 8, 9]), 0, 3, 1, -1.)
+    assert len(buffer) == 5 and buffer.pos == 1
+    assert buffer.agents.tolist() == [9, 1, 2, 7, 8]
+    assert buffer.rewards.tolist() == [-1., 4., 4., -1., -1.]
+    agents, states, sounds, next_states, rewards = buffer.sample(100)
+    assert set(agents.tolist()) == {1, 2, 7, 8, 9}
+    assert np.all(sounds == np.where(agents < 7, 2, 3))
+    buffer.add(np.arange(12), 0, 0, 0, 0.)
+    assert buffer.agents.tolist() == [11, 7, 8, 9, 10]
+
+
+def test_population_replay():
+    a = Population(2, ["cry", "laugh"], seed=0)
+    a.q[:, :, 4] = [[1., 2.], [3., 4.]]
+    b = Population(2, ["cry", "laugh"], seed=0)
+    b.q[:] = a.q
+    a.update(0, 4, np.array([1]), 6., agents=np.array([1]))
+    buffer = ReplayBuffer(4)
+    buffer.add(1, 0, 4, 1, 6.)
+    b.replay(buffer, 3)
+    assert np.array_equal(a.q, b.q, equal_nan=True)
+    # 一批经验一次回放
+    buffer.add(np.array([0, 1]), 1, 4, 0, np.array([10., -10.]))
+    b.replay(buffer, 64)
+    assert b.q[0, 1, 4] > 2. and b.q[1, 1, 4] < 4.
+
+
+def test_recall_similar_sound():
+    import combination.sound as sd
+    from agent._agent import Agent
+    from env.environment import Environment
+    agent = Agent(Environment(), 0)
+    agent.epsilon, agent.beta = 0., 1.
+    ba = sd.Sound.get([sd.dict_consonants["b"], sd.dict_vowels["a"]])
+    pa = sd.Sound.get([sd.dict_consonants["p"], sd.dict_vowels["a"]])
+    agent.memory.match_node("3", 3, good=True)
+    agent.update_qlearning(3, ba, 3, 10.)
+    assert agent.recall_sound(pa) is pa
+    agent.similar_threshold = 0.5
+    assert agent.recall_sound(pa) is ba
+    assert agent.choose_good(pa) == 3
+    assert agent.memory.index.find(pa.name) is None
+    agent.similar_threshold = 0.99
+    assert agent.recall_sound(pa) is pa
+
+
+
+@pytest.mark.parametrize("backend", ["Memory", "ArrayMemory"])
+def test_get_associatian(backend):
+    from agent._agent import Agent
+    from env.environment import Environment
+    from memory.array_memory import ArrayMemory
+    from memory.memory import Memory
+    memory = {"Memory": Memory, "ArrayMemory": ArrayMemory}[backend]()
+    agent = Agent(Environment(), 0, memory=memory)
+    agent.associate(agent.wrap_data("cry", "cry", action=True),
+                    agent.wrap_data(1, "1", sound=True))
+    agent.associate(agent.wrap_data("cry", "cry", action=True),
+                    agent.wrap_data(2, "2", good=True))
+    nodes = agent.get_associatian("cry", sound=True)
+    assert [n["name"] for n in nodes] == ["1"]
+    assert agent.get_associatian("cry", action=True) is None
+
+if __name__ == "__main__":
+    pytest.main([__file__])
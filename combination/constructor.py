@@ -1,8 +1,8 @@
 import random
 import combination.combination as cc
 from memory.base import BaseMemory
-from sound import Word, Syllable, YunMu, ShengMu
-from sound import dict_vowels, dict_consonants
+from combination.sound import Word, Syllable, YunMu, ShengMu
+from combination.sound import dict_vowels, dict_consonants
 
 
 class Constructor:
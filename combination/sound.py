@@ -1,5 +1,7 @@
 import enum
 import random
+import threading
+from collections import OrderedDict
 import numpy as np
 
 
@@ -11,7 +13,11 @@ class Phoneme:
         - duration: 持续时间(世界时间单位)
         - strength: 强度 1-10
         - difficulty: 发音难度 1-10
-        - clarity: 清晰度 1-10"""
+        - clarity: 清晰度 1-10
+        - id: 在音素表中的下标，登记前为 None"""
+
+    __slots__ = ("name", "duration", "strength", "difficulty", "clarity",
+                 "is_vowel", "is_consonant", "id")
 
     def __init__(self,
                  name: str,
@@ -25,6 +31,9 @@ class Phoneme:
         self.strength = strength  # 强度 1-10
         self.difficulty = difficulty  # 发音难度 1-10
         self.clarity = clarity  # 清晰度 1-10
+        self.is_vowel = False
+        self.is_consonant = False
+        self.id = None  # 音素表下标
 
 
 class Vowel(Phoneme):
@@ -33,6 +42,8 @@ class Vowel(Phoneme):
     属性：
         - name: 元音名称"""
 
+    __slots__ = ()
+
     def __init__(self,
                  name: str,
                  duration: float = 0.5,
@@ -51,6 +62,8 @@ class Consonant(Phoneme):
     属性：
         - name: 辅音名称"""
 
+    __slots__ = ()
+
     def __init__(self,
                  name: str,
                  duration: float = 0.5,
@@ -77,6 +90,149 @@ class Tone(enum.Enum):
     FOURTH = 4
 
 
+PHONEME_DTYPE = np.dtype([
+    ("name", "U8"),
+    ("duration", np.float64),
+    ("strength", np.float64),
+    ("difficulty", np.float64),
+    ("clarity", np.float64),
+    ("is_vowel", np.bool_),
+])
+
+# 复合单位的属性：持续时间和强度乘以强度系数，难度不乘，清晰度取平均
+ATTRIBUTE_DTYPE = np.dtype([
+    ("duration", np.float64),
+    ("strength", np.float64),
+    ("difficulty", np.float64),
+    ("clarity", np.float64),
+])
+
+
+class PhonemeTable:
+    """音素表，全部音素的属性保存在一个结构化数组中。复合单位（韵母、
+    声母、音节、词、声音）以音素下标数组表示，成批单位的属性可以对
+    -1 填充的下标矩阵一次算出。
+
+    属性：
+        - data: 结构化数组，字段见 PHONEME_DTYPE
+        - phonemes: 下标 -> 音素对象
+        - ids: 音素名称 -> 下标（同名音素取最先登记的）"""
+
+    def __init__(self, phonemes=()):
+        """初始化音素表"""
+        self.data = np.zeros(0, dtype=PHONEME_DTYPE)
+        self.phonemes: list[Phoneme] = []
+        self.ids: dict[str, int] = {}
+        self._lock = threading.Lock()
+        for phoneme in phonemes:
+            self.register(phoneme)
+
+    def __len__(self):
+        return len(self.phonemes)
+
+    def register(self, phoneme: Phoneme) -> int:
+        """登记音素并返回下标，已登记的音素直接返回下标"""
+        index = phoneme.id
+        if index is not None and index < len(self.phonemes) and \
+                self.phonemes[index] is phoneme:
+            return index
+        with self._lock:
+            # 反序列化得到的副本与已登记的同名同属性音素共用下标
+            index = self.ids.get(phoneme.name)
+            if index is not None and self._same(self.phonemes[index],
+                                                phoneme):
+                phoneme.id = index
+                return index
+            index = len(self.phonemes)
+            row = np.array([(phoneme.name, phoneme.duration, phoneme.strength,
+                             phoneme.difficulty, phoneme.clarity,
+                             phoneme.is_vowel)],
+                           dtype=PHONEME_DTYPE)
+            self.data = np.concatenate([self.data, row])
+            self.phonemes.append(phoneme)
+            self.ids.setdefault(phoneme.name, index)
+            phoneme.id = index
+            return index
+
+    @staticmethod
+    def _same(a: Phoneme, b: Phoneme) -> bool:
+        return (type(a) is type(b) and all(
+            getattr(a, attr) == getattr(b, attr)
+            for attr in ("name", "duration", "strength", "difficulty",
+                         "clarity", "is_vowel")))
+
+    def lookup(self, phonemes: list[Phoneme]) -> np.ndarray:
+        """音素序列 -> 下标数组，未登记的音素先登记"""
+        return np.array([self.register(p) for p in phonemes], dtype=np.int64)
+
+    def find(self, name: str) -> Phoneme:
+        """按名称取音素"""
+        return self.phonemes[self.ids[name]]
+
+    @staticmethod
+    def pad(ids: list[np.ndarray], width: int = None) -> np.ndarray:
+        """把若干下标数组用 -1 填充为 N × L 矩阵"""
+        width = max([len(i) for i in ids] + [0]) if width is None else width
+        matrix = np.full((len(ids), width), -1, dtype=np.int64)
+        for row, i in zip(matrix, ids):
+            row[:len(i)] = i
+        return matrix
+
+    def attributes(self, ids: np.ndarray, strength=1.) -> np.ndarray:
+        """对 N × L 的下标矩阵（-1 为填充）一次计算 N 个单位的属性，
+        strength 为标量或长度 N 的强度系数，返回 ATTRIBUTE_DTYPE 数组"""
+        ids = np.asarray(ids, dtype=np.int64)
+        valid = ids >= 0
+        rows = self.data[np.where(valid, ids, 0)]
+        strength = np.asarray(strength, dtype=np.float64)
+        count = valid.sum(axis=-1)
+        out = np.zeros(ids.shape[:-1], dtype=ATTRIBUTE_DTYPE)
+        out["duration"] = np.where(valid, rows["duration"], 0.).sum(
+            axis=-1) * strength
+        out["strength"] = np.where(valid, rows["strength"], 0.).sum(
+            axis=-1) * strength
+        out["difficulty"] = np.where(valid, rows["difficulty"],
+                                     0.).sum(axis=-1)
+        clarity = np.where(valid, rows["clarity"], 0.).sum(axis=-1)
+        out["clarity"] = np.divide(clarity,
+                                   count,
+                                   out=np.zeros_like(clarity),
+                                   where=count > 0)
+        return out
+
+    def attributes_of(self, units: list, strength=1.) -> np.ndarray:
+        """成批计算带 ids 的单位（韵母、声母、声音等）的属性"""
+        return self.attributes(self.pad([unit.ids for unit in units]),
+                               strength)
+
+
+def _units(cls, n: int, **columns) -> list:
+    """按列构造 n 个单位对象，跳过 __init__，供批量生成使用"""
+    units = [object.__new__(cls) for _ in range(n)]
+    for attr, column in columns.items():
+        if not isinstance(column, (list, np.ndarray)):
+            column = [column] * n
+        for unit, value in zip(units, column):
+            setattr(unit, attr, value)
+    return units
+
+
+def _names(ids: np.ndarray) -> list[str]:
+    """下标矩阵 -> 名称列表"""
+    names = phoneme_table.data["name"]
+    return ["".join(names[row[row >= 0]]) for row in ids]
+
+
+def _split(ids: np.ndarray) -> list[np.ndarray]:
+    """下标矩阵 -> 去掉填充的下标数组列表"""
+    return [row[row >= 0] for row in ids]
+
+
+def _ids(table: dict[str, Phoneme], letters: str) -> np.ndarray:
+    """字母 -> 音素表下标数组，音素须已登记"""
+    return np.array([table[c].id for c in letters], dtype=np.int64)
+
+
 class YunMu:
     """韵母类
 
@@ -85,19 +241,22 @@ class YunMu:
         - duration: 持续时间(世界时间单位)
         - strength: 强度 1-10
         - difficulty: 发音难度 1-10
-        - clarity: 清晰度 1-10"""
+        - clarity: 清晰度 1-10
+        - ids: 音素表下标"""
+
+    __slots__ = ("name", "is_yunmu", "ids", "strength", "duration",
+                 "difficulty")
 
     def __init__(self, strength: float = 1.0, *args: list[Phoneme]):
         # 排序 args，将元音放在最前面
         sorted_args = sorted(args, key=lambda x: x.is_vowel, reverse=True)
         self.name = "".join([phoneme.name for phoneme in sorted_args])
         self.is_yunmu = True
-        self.strength = (np.sum([phoneme.strength
-                                 for phoneme in sorted_args])) * strength
-        self.duration = (np.sum([phoneme.duration
-                                 for phoneme in sorted_args])) * strength
-        self.difficulty = np.sum(
-            [phoneme.difficulty for phoneme in sorted_args])
+        self.ids = phoneme_table.lookup(sorted_args)
+        attrs = phoneme_table.attributes(self.ids[None], strength)[0]
+        self.strength = attrs["strength"]
+        self.duration = attrs["duration"]
+        self.difficulty = attrs["difficulty"]
 
     def __repr__(self):
         return f"{self.name}"
@@ -115,6 +274,47 @@ class YunMu:
         ]
         return YunMu(1.0, *vowels, *consonants)
 
+    @staticmethod
+    def random_ids(n: int, rng: np.random.Generator) -> np.ndarray:
+        """随机生成 n 个韵母的下标矩阵 (n × 3，-1 填充)，
+        分布同 random_yunmu"""
+        v_length = rng.integers(1, 3, n)
+        c_length = np.where(v_length >= 2, 0, rng.integers(0, 3, n))
+        vowels = _vowel_ids[rng.integers(len(_vowel_ids), size=(n, 2))]
+        consonants = _consonant_ids[rng.integers(len(_consonant_ids),
+                                                 size=(n, 2))]
+        slots = np.arange(2)
+        valid = np.concatenate([
+            slots < v_length[:, None], slots < c_length[:, None]
+        ],
+                               axis=1)
+        # 元音在前，有效的音素移到每行前部
+        order = np.argsort(~valid, axis=1, kind="stable")[:, :3]
+        ids = np.take_along_axis(np.concatenate([vowels, consonants], axis=1),
+                                 order,
+                                 axis=1)
+        return np.where(np.take_along_axis(valid, order, axis=1), ids, -1)
+
+    @staticmethod
+    def from_ids(ids: np.ndarray) -> list["YunMu"]:
+        """由下标矩阵 (-1 填充) 批量构造韵母，属性一次算出"""
+        attrs = phoneme_table.attributes(ids)
+        return _units(YunMu,
+                      len(ids),
+                      name=_names(ids),
+                      is_yunmu=True,
+                      ids=_split(ids),
+                      strength=list(attrs["strength"]),
+                      duration=list(attrs["duration"]),
+                      difficulty=list(attrs["difficulty"]))
+
+    @staticmethod
+    def random_yunmus(n: int, seed=None) -> list["YunMu"]:
+        """由一个 numpy.random.Generator 批量生成 n 个韵母，
+        seed 为种子或 Generator"""
+        return YunMu.from_ids(
+            YunMu.random_ids(n, np.random.default_rng(seed)))
+
 
 class ShengMu:
     """声母类
@@ -124,19 +324,22 @@ class ShengMu:
         - duration: 持续时间(世界时间单位)
         - strength: 强度 1-10
         - difficulty: 发音难度 1-10
-        - clarity: 清晰度 1-10"""
+        - clarity: 清晰度 1-10
+        - ids: 音素表下标"""
+
+    __slots__ = ("name", "is_shengmu", "ids", "strength", "duration",
+                 "difficulty")
 
     def __init__(self, strength: float = 1.0, *args: list[Consonant]):
         # 排序 args，将辅音放在最前面，最多两个辅音
         sorted_args = sorted(args, key=lambda x: x.is_consonant)[:2]
         self.name = "".join([phoneme.name for phoneme in sorted_args])
         self.is_shengmu = True
-        self.strength = (np.sum([phoneme.strength
-                                 for phoneme in sorted_args])) * strength
-        self.duration = (np.sum([phoneme.duration
-                                 for phoneme in sorted_args])) * strength
-        self.difficulty = np.sum(
-            [phoneme.difficulty for phoneme in sorted_args])
+        self.ids = phoneme_table.lookup(sorted_args)
+        attrs = phoneme_table.attributes(self.ids[None], strength)[0]
+        self.strength = attrs["strength"]
+        self.duration = attrs["duration"]
+        self.difficulty = attrs["difficulty"]
 
     def __repr__(self):
         return f"{self.name}"
@@ -150,6 +353,31 @@ class ShengMu:
         ]
         return ShengMu(1.0, *consonants)
 
+    @staticmethod
+    def random_ids(n: int, rng: np.random.Generator) -> np.ndarray:
+        """随机生成 n 个声母的下标矩阵 (n × 1)，分布同 random_shengmu"""
+        return _consonant_ids[rng.integers(len(_consonant_ids), size=(n, 1))]
+
+    @staticmethod
+    def from_ids(ids: np.ndarray) -> list["ShengMu"]:
+        """由下标矩阵 (-1 填充) 批量构造声母，属性一次算出"""
+        attrs = phoneme_table.attributes(ids)
+        return _units(ShengMu,
+                      len(ids),
+                      name=_names(ids),
+                      is_shengmu=True,
+                      ids=_split(ids),
+                      strength=list(attrs["strength"]),
+                      duration=list(attrs["duration"]),
+                      difficulty=list(attrs["difficulty"]))
+
+    @staticmethod
+    def random_shengmus(n: int, seed=None) -> list["ShengMu"]:
+        """由一个 numpy.random.Generator 批量生成 n 个声母，
+        seed 为种子或 Generator"""
+        return ShengMu.from_ids(
+            ShengMu.random_ids(n, np.random.default_rng(seed)))
+
 
 class Syllable:
     """音节类
@@ -159,7 +387,11 @@ class Syllable:
         - duration: 持续时间(世界时间单位)
         - strength: 强度 1-10
         - difficulty: 发音难度 1-10
-        - clarity: 清晰度 1-10"""
+        - clarity: 清晰度 1-10
+        - ids: 音素表下标（声母在前）"""
+
+    __slots__ = ("name", "is_syllable", "shengmu", "yunmu", "ids",
+                 "strength", "duration", "difficulty")
 
     def __init__(
         self,
@@ -172,6 +404,9 @@ class Syllable:
         self.is_syllable = True
         self.shengmu = shengmu
         self.yunmu = yunmu
+        self.ids = np.concatenate([unit.ids for unit in (shengmu, yunmu)
+                                   if unit is not None] +
+                                  [np.zeros(0, dtype=np.int64)])
         self.strength = (shengmu.strength +
                          yunmu.strength) * strength if shengmu and yunmu else 0
         self.duration = (shengmu.duration +
@@ -189,13 +424,62 @@ class Syllable:
         shengmu = ShengMu.random_shengmu() if random.random() > 0.5 else None
         return Syllable(yunmu, shengmu, 1.0)
 
+    @staticmethod
+    def random_syllables(n: int, seed=None) -> list["Syllable"]:
+        """由一个 numpy.random.Generator 批量生成 n 个音节，分布同
+        random_syllable：一半的音节有声母，没有声母的音节名称为空、
+        属性为 0"""
+        rng = np.random.default_rng(seed)
+        yunmu_ids = YunMu.random_ids(n, rng)
+        has_shengmu = rng.random(n) > 0.5
+        shengmu_ids = ShengMu.random_ids(int(has_shengmu.sum()), rng)
+        yunmus = YunMu.from_ids(yunmu_ids)
+        shengmus = np.full(n, None, dtype=object)
+        shengmus[has_shengmu] = ShengMu.from_ids(shengmu_ids)
+        attrs = np.zeros(n, dtype=ATTRIBUTE_DTYPE)
+        yunmu_attrs = phoneme_table.attributes(yunmu_ids[has_shengmu])
+        shengmu_attrs = phoneme_table.attributes(shengmu_ids)
+        for field in ("strength", "duration", "difficulty"):
+            attrs[field][has_shengmu] = shengmu_attrs[field] + yunmu_attrs[
+                field]
+        return _units(Syllable,
+                      n,
+                      name=[
+                          s.name + y.name if s else ""
+                          for s, y in zip(shengmus, yunmus)
+                      ],
+                      is_syllable=True,
+                      shengmu=shengmus.tolist(),
+                      yunmu=yunmus,
+                      ids=[
+                          np.concatenate([s.ids, y.ids]) if s else y.ids
+                          for s, y in zip(shengmus, yunmus)
+                      ],
+                      strength=list(attrs["strength"]),
+                      duration=list(attrs["duration"]),
+                      difficulty=list(attrs["difficulty"]))
+
 
 class Word:
+    """词类
+
+    属性：
+        - name: 词名称
+        - is_verb: 是否为动词
+        - ids: 音素表下标
+        - duration: 持续时间(世界时间单位)
+        - strength: 强度
+        - difficulty: 发音难度"""
+
+    __slots__ = ("name", "is_word", "is_verb", "ids", "duration", "strength",
+                 "difficulty")
 
     def __init__(self, verb=False, *args: list[Syllable]):
         self.name = "".join([syllable.name for syllable in args])
         self.is_word = True
         self.is_verb = verb
+        self.ids = np.concatenate([syllable.ids for syllable in args] +
+                                  [np.zeros(0, dtype=np.int64)])
         self.duration = np.sum([syllable.duration for syllable in args])
         self.strength = np.sum([syllable.strength for syllable in args])
         self.difficulty = np.sum([syllable.difficulty for syllable in args])
@@ -203,34 +487,240 @@ class Word:
     def __repr__(self):
         return f"{self.name}"
 
+    @staticmethod
+    def random_words(n: int,
+                     seed=None,
+                     max_syllables: int = 3,
+                     verb: bool = False) -> list["Word"]:
+        """由一个 numpy.random.Generator 批量生成 n 个词，每个词的音节数
+        在 1 到 max_syllables 间均匀分布，音节分布同 random_syllable"""
+        rng = np.random.default_rng(seed)
+        lengths = rng.integers(1, max_syllables + 1, n)
+        syllables = Syllable.random_syllables(int(lengths.sum()), rng)
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        groups = [syllables[i:i + k] for i, k in zip(starts, lengths)]
+        # 音节属性排成 n × max_syllables 矩阵，空位为 0，按行求和
+        slots = starts[:, None] + np.arange(max_syllables)
+        valid = np.arange(max_syllables) < lengths[:, None]
+        slots = np.where(valid, slots, 0)
+        columns = {}
+        for field in ("duration", "strength", "difficulty"):
+            values = np.array([getattr(s, field) for s in syllables] + [0.])
+            columns[field] = list(
+                np.where(valid, values[slots], 0.).sum(axis=1))
+        return _units(
+            Word,
+            n,
+            name=["".join([s.name for s in group]) for group in groups],
+            is_word=True,
+            is_verb=verb,
+            ids=[np.concatenate([s.ids for s in group]) for group in groups],
+            **columns)
+
 
 class Sound:
-    """音节类
+    """声音类，不可变。相同音素、强度和音调的声音应通过 Sound.get 取得，
+    共享同一个对象，记忆中可以按对象身份比较声音。
 
     属性：
-        - vowel: 元音
-        - consonant: 辅音
+        - name: 名称
+        - phonemes: 组成的音素
+        - factor: 强度系数
         - tone: 音调
-        - time: 持续时间(拍)"""
+        - duration: 持续时间(世界时间单位)
+        - strength: 强度
+        - difficulty: 发音难度
+        - ids: 音素表下标
+        - uid: 驻留编号，只有 Sound.get 创建的声音才有"""
+
+    __slots__ = ("name", "is_sound", "tone", "phonemes", "ids", "factor",
+                 "duration", "strength", "difficulty", "uid")
+    _interned: dict[tuple, "Sound"] = {}  # (音素名, 强度系数, 音调) -> 声音
+    _lock = threading.Lock()
 
     def __init__(self,
                  Phoneme: list[Phoneme],
                  strength: float = 1.0,
                  tone: Tone = Tone.FIRST):
-        """初始化音节类"""
-        self.name = "".join([phoneme.name for phoneme in Phoneme])
-        self.is_sound = True  # 是否为音节
-        self.tone = tone
-
-        self.duration = np.sum([phoneme.duration
-                                for phoneme in Phoneme]) * strength
-        self.strength = np.sum([phoneme.strength
-                                for phoneme in Phoneme]) * strength
-        self.difficulty = np.sum([phoneme.difficulty for phoneme in Phoneme])
+        """初始化声音，属性在此一次算好"""
+        ids = phoneme_table.lookup(Phoneme)
+        ids.flags.writeable = False
+        attrs = phoneme_table.attributes(ids[None], strength)[0]
+        for name, value in dict(
+                name="".join([phoneme.name for phoneme in Phoneme]),
+                is_sound=True,  # 是否为声音
+                tone=tone,
+                phonemes=tuple(Phoneme),  # 组成的音素
+                ids=ids,  # 音素表下标
+                factor=strength,  # 强度系数
+                duration=float(attrs["duration"]),
+                strength=float(attrs["strength"]),
+                difficulty=float(attrs["difficulty"]),
+                uid=None,
+        ).items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Sound is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Sound is immutable")
 
     def __repr__(self):
         return f"({self.name})"
 
+    def __reduce__(self):
+        # 反序列化时重新驻留，得到进程内共享的对象
+        return Sound.get, (self.phonemes, self.factor, self.tone)
+
+    @property
+    def key(self):
+        """驻留键：(音素名, 强度系数, 音调)"""
+        return (tuple(p.name for p in self.phonemes), self.factor, self.tone)
+
+    @classmethod
+    def get(cls,
+            phonemes: list[Phoneme],
+            strength: float = 1.0,
+            tone: Tone = Tone.FIRST) -> "Sound":
+        """返回驻留的声音，相同的音素序列、强度和音调返回同一个对象"""
+        key = (tuple(p.name for p in phonemes), strength, tone)
+        sound = cls._interned.get(key)
+        if sound is not None:
+            return sound
+        with cls._lock:
+            sound = cls._interned.get(key)
+            if sound is None:
+                sound = cls(phonemes, strength, tone)
+                object.__setattr__(sound, "uid", len(cls._interned))
+                cls._interned[key] = sound
+        return sound
+
+
+class SoundSimilarity:
+    """声音相似度。声音编码为定长特征向量（width 个音素下标、持续时间、
+    强度、平均清晰度、音调），两组声音的相似度矩阵由 NumPy 一次算出：
+
+        相似度 = 音素权重 × 对齐音素相同的比例
+               + 连续特征权重 × exp(-Σ((差 / 尺度)²))
+               + 音调权重 × 音调相同
+
+    相同的声音相似度为 1。驻留声音的特征与相似度矩阵按 uid 缓存。
+
+    属性：
+        - width: 特征向量中音素下标的个数，更长的声音会加宽
+        - weights: (音素, 连续特征, 音调) 权重
+        - scale: (持续时间, 强度, 清晰度) 的尺度
+        - maxsize: 相似度矩阵 LRU 缓存的容量"""
+
+    def __init__(self,
+                 width: int = 4,
+                 weights: tuple = (0.6, 0.25, 0.15),
+                 scale: tuple = (0.5, 5., 2.),
+                 maxsize: int = 1024):
+        """初始化相似度"""
+        self.width = width
+        self.weights = weights
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.maxsize = maxsize
+        self._features: dict[int, np.ndarray] = {}  # uid -> 特征向量
+        self._cache: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def features(self, sounds: list[Sound]) -> np.ndarray:
+        """把声音编码为 N × (width + 4) 的特征矩阵，
+        列为 width 个音素下标（-1 填充）、持续时间、强度、清晰度、音调"""
+        width = max([self.width] + [len(s.ids) for s in sounds])
+        out = np.empty((len(sounds), width + 4), dtype=np.float64)
+        missing = []
+        for i, sound in enumerate(sounds):
+            cached = self._features.get(sound.uid)
+            if cached is not None and len(cached) == width + 4:
+                out[i] = cached
+            else:
+                missing.append(i)
+        if missing:
+            ids = PhonemeTable.pad([sounds[i].ids for i in missing], width)
+            clarity = phoneme_table.attributes(ids)["clarity"]
+            out[missing, :width] = ids
+            out[missing, width] = [sounds[i].duration for i in missing]
+            out[missing, width + 1] = [sounds[i].strength for i in missing]
+            out[missing, width + 2] = clarity
+            out[missing, width + 3] = [sounds[i].tone.value for i in missing]
+            for i in missing:
+                if sounds[i].uid is not None:
+                    self._features[sounds[i].uid] = out[i].copy()
+        return out
+
+    def kernel(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """由两组特征矩阵计算 N × M 相似度矩阵"""
+        width = a.shape[1] - 4
+        ids_a, ids_b = a[:, None, :width], b[None, :, :width]
+        same = ((ids_a == ids_b) & (ids_a >= 0)).sum(axis=-1)
+        length = np.maximum((ids_a >= 0).sum(axis=-1),
+                            (ids_b >= 0).sum(axis=-1))
+        phonemes = same / np.maximum(length, 1)
+        diff = (a[:, None, width:width + 3] -
+                b[None, :, width:width + 3]) / self.scale
+        continuous = np.exp(-(diff**2).sum(axis=-1))
+        tone = a[:, None, width + 3] == b[None, :, width + 3]
+        w_phonemes, w_continuous, w_tone = self.weights
+        return w_phonemes * phonemes + w_continuous * continuous + w_tone * tone
+
+    def matrix(self, a: list[Sound], b: list[Sound] = None) -> np.ndarray:
+        """两组声音的相似度矩阵，b 默认为 a；全部为驻留声音时结果按
+        uid 缓存，返回的矩阵不应修改"""
+        b = a if b is None else b
+        key = (tuple(s.uid for s in a), tuple(s.uid for s in b))
+        cacheable = None not in key[0] and None not in key[1]
+        if cacheable:
+            with self._lock:
+                result = self._cache.get(key)
+                if result is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return result
+        features = self.features(list(a) + list(b))
+        result = self.kernel(features[:len(a)], features[len(a):])
+        result.flags.writeable = False
+        if cacheable:
+            with self._lock:
+                self.misses += 1
+                self._cache[key] = result
+                if len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return result
+
+    def similarity(self, a: Sound, b: Sound) -> float:
+        """两个声音的相似度"""
+        return float(self.matrix([a], [b])[0, 0])
+
+    def closest(self, sound: Sound, lexicon: list[Sound]):
+        """返回词汇表中与 sound 最相似的声音及相似度，词汇表为空时返回
+        (None, 0.)"""
+        if not lexicon:
+            return None, 0.
+        row = self.matrix([sound], lexicon)[0]
+        best = int(np.argmax(row))
+        return lexicon[best], float(row[best])
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._features.clear()
+            self._cache.clear()
+
 
 # 常用的元音
 dict_vowels = {
@@ -251,8 +741,123 @@ dict_consonants = {
     "d": Consonant("d"),
 }
 
-monster_roar = Sound(
+# 音素表，先登记常用的元音和辅音，其余音素在组成复合单位时登记
+phoneme_table = PhonemeTable(
+    [*dict_vowels.values(), *dict_consonants.values()])
+# 随机生成时可选的元音、辅音
+_vowel_ids = _ids(dict_vowels, "aeiouü")
+_consonant_ids = _ids(dict_consonants, "bpmfd")
+
+monster_roar = Sound.get(
     [dict_consonants["b"], dict_vowels["a"], dict_consonants["m"]],
     strength=5.0,
     tone=Tone.FOURTH,
 )
+
+# 默认的声音相似度
+sound_similarity = SoundSimilarity()
+
+
+PHONEMES = {**dict_vowels, **dict_consonants}
+
+# 音节编码：声母（无或一个辅音）× 韵母 × 音调 与整数一一对应。
+# 韵母为一个元音加 0-2 个辅音，或两个元音，与 random_yunmu 的取值范围相同
+VOWELS = "aeiouü"
+CONSONANTS = "bpmfd"
+NUM_SHENGMU = 1 + len(CONSONANTS)
+# 单元音韵母后的辅音组合数：无、一个、两个
+_NUM_SINGLE = 1 + len(CONSONANTS) + len(CONSONANTS)**2
+NUM_YUNMU = len(VOWELS) * _NUM_SINGLE + len(VOWELS)**2
+NUM_TONES = len(Tone)
+NUM_SYLLABLES = NUM_SHENGMU * NUM_YUNMU * NUM_TONES
+
+
+def _yunmu_code(names: list[str]) -> int:
+    """韵母的音素名称 -> 韵母编号"""
+    v, c = len(VOWELS), len(CONSONANTS)
+    try:
+        if len(names) == 2 and names[1] in VOWELS:
+            return v * _NUM_SINGLE + VOWELS.index(
+                names[0]) * v + VOWELS.index(names[1])
+        if 1 <= len(names) <= 3 and names[0] in VOWELS:
+            rest = [CONSONANTS.index(n) for n in names[1:]]
+            offset = [0, 1, 1 + c][len(rest)]
+            code = sum(i * c**k for k, i in enumerate(reversed(rest)))
+            return VOWELS.index(names[0]) * _NUM_SINGLE + offset + code
+    except ValueError:
+        pass
+    raise ValueError(f"not a legal yunmu: {''.join(names)!r}")
+
+
+def _yunmu_names(code: int) -> list[str]:
+    """韵母编号 -> 韵母的音素名称"""
+    v, c = len(VOWELS), len(CONSONANTS)
+    if code >= v * _NUM_SINGLE:
+        first, second = divmod(code - v * _NUM_SINGLE, v)
+        return [VOWELS[first], VOWELS[second]]
+    vowel, rest = divmod(code, _NUM_SINGLE)
+    if rest == 0:
+        return [VOWELS[vowel]]
+    if rest <= c:
+        return [VOWELS[vowel], CONSONANTS[rest - 1]]
+    first, second = divmod(rest - 1 - c, c)
+    return [VOWELS[vowel], CONSONANTS[first], CONSONANTS[second]]
+
+
+def _encode(shengmu: list[str], yunmu: list[str], tone: Tone) -> int:
+    if len(shengmu) > 1 or (shengmu and shengmu[0] not in CONSONANTS):
+        raise ValueError(f"not a legal shengmu: {''.join(shengmu)!r}")
+    sheng = 1 + CONSONANTS.index(shengmu[0]) if shengmu else 0
+    return (sheng * NUM_YUNMU + _yunmu_code(yunmu)) * NUM_TONES + (
+        tone.value - 1)
+
+
+def _decode(code: int) -> tuple[list[str], list[str], Tone]:
+    if not 0 <= code < NUM_SYLLABLES:
+        raise ValueError(f"syllable code out of range: {code}")
+    rest, tone = divmod(code, NUM_TONES)
+    sheng, yun = divmod(rest, NUM_YUNMU)
+    shengmu = [CONSONANTS[sheng - 1]] if sheng else []
+    return shengmu, _yunmu_names(yun), Tone(tone + 1)
+
+
+def _phoneme_names(unit) -> list[str]:
+    return phoneme_table.data["name"][unit.ids].tolist()
+
+
+def encode_syllable(yunmu: YunMu,
+                    shengmu: ShengMu = None,
+                    tone: Tone = Tone.FIRST) -> int:
+    """(韵母, 声母, 音调) -> 音节编号，非法的组合抛出 ValueError"""
+    return _encode([] if shengmu is None else _phoneme_names(shengmu),
+                   _phoneme_names(yunmu), tone)
+
+
+def decode_syllable(code: int) -> tuple[YunMu, ShengMu | None, Tone]:
+    """音节编号 -> (韵母, 声母, 音调)，没有声母时为 None"""
+    shengmu, yunmu, tone = _decode(code)
+    return (YunMu(1.0, *[PHONEMES[n] for n in yunmu]),
+            ShengMu(1.0, dict_consonants[shengmu[0]]) if shengmu else None,
+            tone)
+
+
+def sound_code(sound: Sound) -> int:
+    """声音 -> 音节编号。以辅音开头的声音，首个辅音为声母，其余为韵母；
+    以元音开头的声音没有声母。强度系数不参与编码。"""
+    names = [p.name for p in sound.phonemes]
+    if names and names[0] in CONSONANTS:
+        return _encode(names[:1], names[1:], sound.tone)
+    return _encode([], names, sound.tone)
+
+
+def code_sound(code: int) -> Sound:
+    """音节编号 -> 驻留的声音（强度系数为 1）"""
+    shengmu, yunmu, tone = _decode(code)
+    return Sound.get([PHONEMES[n] for n in shengmu + yunmu], 1.0, tone)
+
+
+def iter_syllables(start: int = 0, stop: int = None):
+    """按编号顺序惰性枚举合法的音节空间，产生 (编号, 声音)"""
+    stop = NUM_SYLLABLES if stop is None else min(stop, NUM_SYLLABLES)
+    for code in range(start, stop):
+        yield code, code_sound(code)
@@ -0,0 +1,170 @@
+import wave
+import numpy as np
+import combination.sound as sd
+
+SAMPLE_RATE = 16000
+
+# 音调的基频轮廓：相对基频的倍数，按发音进度 0-1 取值
+TONE_CONTOURS = {
+    1: lambda x: np.ones_like(x),  # 一声：平
+    2: lambda x: 0.8 + 0.4 * x,  # 二声：升
+    3: lambda x: 0.9 - 0.8 * x + 0.9 * x**2,  # 三声：降后升
+    4: lambda x: 1.25 - 0.5 * x,  # 四声：降
+}
+
+
+def tone_contour(tone, n: int) -> np.ndarray:
+    """音调在 n 个采样点上的基频倍数，tone 为 Tone 或 1-4"""
+    value = getattr(tone, "value", tone)
+    return TONE_CONTOURS[value](np.linspace(0., 1., n, endpoint=False))
+
+
+def lexicon(agents) -> list:
+    """收集一组代理记忆中的全部声音，按名称去重，保持首次出现的顺序"""
+    sounds = {}
+    for agent in agents:
+        for node in agent.memory.select_nodes(sound=True) or []:
+            sounds.setdefault(node["name"], node["data"])
+    return list(sounds.values())
+
+
+class Synthesizer:
+    """把 Sound、Syllable、Word 合成为 float32 PCM 波形。
+
+    每个音素按其在音素表中的持续时间分得一段：元音为基频及其谐波，
+    辅音为噪声。基频随音调轮廓变化，振幅由强度决定。
+    没有音调的单位（音节、词）使用 tone 参数指定的音调。
+
+    属性：
+        - sample_rate: 采样率
+        - base_f0: 基频(Hz)
+        - time_scale: 每个世界时间单位对应的秒数
+        - ramp: 起止淡入淡出的秒数"""
+
+    def __init__(self,
+                 sample_rate: int = SAMPLE_RATE,
+                 base_f0: float = 200.,
+                 time_scale: float = 0.4,
+                 ramp: float = 0.005):
+        """初始化合成器"""
+        self.sample_rate = sample_rate
+        self.base_f0 = base_f0
+        self.time_scale = time_scale
+        self.ramp = ramp
+        # 辅音使用的噪声表，循环取用，保证合成结果确定
+        self._noise = np.random.default_rng(0).uniform(
+            -1., 1., sample_rate).astype(np.float32)
+
+    def num_samples(self, unit) -> int:
+        """单位合成后的采样点数"""
+        return int(round(unit.duration * self.time_scale * self.sample_rate))
+
+    @staticmethod
+    def amplitude(strength: float) -> float:
+        """强度 -> 振幅，强度越大越接近 1"""
+        return strength / (strength + 5.) if strength > 0 else 0.
+
+    def render_into(self, unit, out: np.ndarray, tone=None) -> int:
+        """把单位合成到预先分配的缓冲区 out 的开头，返回写入的采样点数"""
+        n = self.num_samples(unit)
+        if n > len(out):
+            raise ValueError(
+                f"buffer too small: {len(out)} < {n} samples")
+        if n == 0 or not len(unit.ids):
+            out[:n] = 0.
+            return n
+        tone = getattr(unit, "tone", None) or tone or sd.Tone.FIRST
+        f0 = self.base_f0 * tone_contour(tone, n)
+        phase = 2 * np.pi * np.cumsum(f0) / self.sample_rate
+        voiced = (np.sin(phase) + 0.5 * np.sin(2 * phase) +
+                  0.25 * np.sin(3 * phase)) / 1.75
+        # 按音素持续时间划分采样段
+        rows = sd.phoneme_table.data[np.asarray(unit.ids)]
+        bounds = np.round(
+            np.cumsum(rows["duration"]) / rows["duration"].sum() *
+            n).astype(np.int64)
+        vowel = np.repeat(rows["is_vowel"], np.diff(bounds, prepend=0))
+        noise = np.resize(self._noise, n)
+        signal = np.where(vowel, voiced, noise)
+        envelope = np.full(n, self.amplitude(unit.strength))
+        k = min(int(self.ramp * self.sample_rate), n // 2)
+        if k:
+            envelope[:k] *= np.linspace(0., 1., k, endpoint=False)
+            envelope[n - k:] *= np.linspace(1., 0., k, endpoint=False)
+        np.multiply(signal, envelope, out=out[:n], casting="unsafe")
+        return n
+
+    def render(self, unit, tone=None) -> np.ndarray:
+        """合成单个单位，返回新的 float32 数组"""
+        out = np.empty(self.num_samples(unit), dtype=np.float32)
+        self.render_into(unit, out, tone)
+        return out
+
+    def stream(self, units, chunk: int = 4096, gap: float = 0.05, tone=None):
+        """依次合成一串单位，单位之间插入 gap 秒静音，按 chunk 个采样点
+        分块产生。产生的数组是复用的缓冲区，下一次迭代前应处理完。"""
+        block = np.zeros(chunk, dtype=np.float32)
+        scratch = np.zeros(0, dtype=np.float32)
+        silence = int(round(gap * self.sample_rate))
+        fill = 0
+        for i, unit in enumerate(units):
+            n = self.num_samples(unit) + (silence if i else 0)
+            if n > len(scratch):
+                scratch = np.zeros(max(n, 2 * len(scratch)), dtype=np.float32)
+            start = silence if i else 0
+            scratch[:start] = 0.
+            self.render_into(unit, scratch[start:], tone)
+            pos = 0
+            while pos < n:
+                take = min(chunk - fill, n - pos)
+                block[fill:fill + take] = scratch[pos:pos + take]
+                fill += take
+                pos += take
+                if fill == chunk:
+                    yield block
+                    fill = 0
+        if fill:
+            yield block[:fill]
+
+    def write_wav(self,
+                  path: str,
+                  units,
+                  chunk: int = 4096,
+                  gap: float = 0.05,
+                  tone=None) -> int:
+        """把一串单位逐块写入 16 位单声道 WAV 文件，返回写入的采样点数"""
+        total = 0
+        pcm = np.zeros(chunk, dtype=np.int16)
+        with wave.open(str(path), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            for block in self.stream(units, chunk, gap, tone):
+                n = len(block)
+                np.multiply(np.clip(block, -1., 1.),
+                            32767,
+                            out=pcm[:n],
+                            casting="unsafe")
+                f.writeframes(pcm[:n].tobytes())
+                total += n
+        return total
+
+    def render_lexicon(self, units, batch_size: int = 256, tone=None):
+        """分批合成词汇表，每批产生 (单位列表, 波形矩阵, 长度数组)。
+        波形矩阵为 batch × 最长采样点数，不足处为 0，矩阵在批之间复用。"""
+        buffer = np.zeros((batch_size, 0), dtype=np.float32)
+        units = iter(units)
+        while True:
+            batch = [unit for _, unit in zip(range(batch_size), units)]
+            if not batch:
+                return
+            lengths = np.array([self.num_samples(u) for u in batch],
+                               dtype=np.int64)
+            width = int(lengths.max())
+            if width > buffer.shape[1]:
+                buffer = np.zeros((batch_size, width), dtype=np.float32)
+            waves = buffer[:len(batch), :width]
+            waves[:] = 0.
+            for row, unit in zip(waves, batch):
+                self.render_into(unit, row, tone)
+            yield batch, waves, lengths
@@ -1,3 +1,5 @@
+import pickle
+import numpy as np
 import pytest
 import sound as sd
 
@@ -10,6 +12,158 @@ def test_shengmu():
     print(shengmu)
 
 
+def test_sound_interned():
+    b, a = sd.dict_consonants["b"], sd.dict_vowels["a"]
+    sound = sd.Sound.get([b, a])
+    assert sd.Sound.get([b, a]) is sound
+    assert sd.Sound.get([b, a], 2.) is not sound
+    assert sd.Sound.get([b, a], tone=sd.Tone.THIRD) is not sound
+    assert type(sound.strength) is float and sound.strength == 4.
+    assert sound.uid is not None and sd.Sound([b, a]).uid is None
+    with pytest.raises(AttributeError):
+        sound.name = "ab"
+    assert pickle.loads(pickle.dumps(sound)) is sound
+
+
+def test_phoneme_table():
+    table = sd.phoneme_table
+    a, m = sd.dict_vowels["a"], sd.dict_consonants["m"]
+    b = sd.dict_consonants["b"]
+    units = [sd.YunMu(1.0, m, a), sd.ShengMu(1.0, b), sd.YunMu(2.0, a)]
+    assert units[0].ids.tolist() == [a.id, m.id]
+    attrs = table.attributes_of(units, [1., 1., 2.])
+    assert attrs["strength"].tolist() == [u.strength for u in units]
+    assert attrs["duration"].tolist() == [u.duration for u in units]
+    assert attrs["difficulty"].tolist() == [u.difficulty for u in units]
+    assert attrs["clarity"].tolist() == [4., 3., 5.]
+    assert table.attributes(np.full((2, 3), -1))["strength"].tolist() == [
+        0., 0.
+    ]
+    # 不在表中的音素在使用时登记，结束后恢复全局音素表
+    saved = table.data, list(table.phonemes), dict(table.ids)
+    try:
+        x = sd.Consonant("x", 0.3)
+        sound = sd.Sound([x, a])
+        assert x.id == len(table) - 1 and table.find("x") is x
+        assert table.data[x.id]["duration"] == 0.3
+        assert sound.duration == 0.3 + a.duration
+    finally:
+        table.data, table.phonemes, table.ids = saved
+    assert "x" not in table.ids
+    with pytest.raises(AttributeError):
+        a.tone = 1
+
+
+def test_random_batches():
+    phonemes = sd.phoneme_table.phonemes
+    yunmus = sd.YunMu.random_yunmus(3000, seed=0)
+    assert [y.name for y in yunmus] == [
+        y.name for y in sd.YunMu.random_yunmus(3000, seed=0)
+    ]
+    for y in yunmus[:100]:
+        z = sd.YunMu(1.0, *[phonemes[i] for i in y.ids])
+        assert (y.name, y.strength, y.duration,
+                y.difficulty) == (z.name, z.strength, z.duration,
+                                  z.difficulty)
+    # 与 random_yunmu 相同的长度分布：1/6 单元音，2/3 两个音素
+    lengths = np.bincount([len(y.name) for y in yunmus], minlength=4)
+    assert np.allclose(lengths[1:] / 3000, [1 / 6, 2 / 3, 1 / 6], atol=0.03)
+    assert all(len(s.name) == 1 for s in sd.ShengMu.random_shengmus(50, 1))
+    syllables = sd.Syllable.random_syllables(2000, seed=2)
+    assert 0.45 < np.mean([s.shengmu is None for s in syllables]) < 0.55
+    for s in syllables[:100]:
+        t = sd.Syllable(s.yunmu, s.shengmu)
+        assert (s.name, s.strength, s.duration) == (t.name, t.strength,
+                                                    t.duration)
+    words = sd.Word.random_words(100, seed=3)
+    rng = np.random.default_rng(3)
+    lengths = rng.integers(1, 4, 100)
+    syllables = sd.Syllable.random_syllables(int(lengths.sum()), rng)
+    groups = np.split(np.array(syllables, dtype=object),
+                      np.cumsum(lengths)[:-1])
+    for word, group in zip(words, groups):
+        expected = sd.Word(False, *group)
+        assert (word.name, word.strength,
+                word.difficulty) == (expected.name, expected.strength,
+                                     expected.difficulty)
+
+
+def test_similarity():
+    v, c = sd.dict_vowels, sd.dict_consonants
+    ba = sd.Sound.get([c["b"], v["a"]])
+    pa = sd.Sound.get([c["p"], v["a"]])
+    bu = sd.Sound.get([c["b"], v["ü"]], tone=sd.Tone.THIRD)
+    lexicon = [bu, pa, ba]
+    kernel = sd.SoundSimilarity(maxsize=2)
+    matrix = kernel.matrix(lexicon)
+    assert matrix.shape == (3, 3) and np.allclose(np.diag(matrix), 1.)
+    assert np.allclose(matrix, matrix.T)
+    assert matrix[2, 1] > matrix[2, 0]
+    assert kernel.similarity(ba, pa) == pytest.approx(matrix[2, 1])
+    # 按 uid 缓存，超出容量时淘汰最久未用的
+    assert kernel.matrix(lexicon) is matrix and kernel.hits == 1
+    kernel.similarity(pa, bu)
+    kernel.similarity(bu, pa)
+    assert kernel.matrix(lexicon) is not matrix
+    # 未驻留的声音也可以比较，不进入缓存
+    fresh = sd.Sound([c["b"], v["a"]])
+    assert kernel.closest(fresh, lexicon) == (ba, pytest.approx(1.))
+    assert kernel.closest(sd.monster_roar, []) == (None, 0.)
+    assert kernel.closest(sd.monster_roar, lexicon)[0] is ba
+
+
+def test_syllable_codes():
+    assert sd.NUM_YUNMU == 222 and sd.NUM_SYLLABLES == 6 * 222 * 4
+    codes = [code for code, _ in sd.iter_syllables()]
+    assert codes == list(range(sd.NUM_SYLLABLES))
+    sounds = [sound for _, sound in sd.iter_syllables(5000, 5010)]
+    assert [sd.sound_code(s) for s in sounds] == list(range(5000, 5010))
+    assert len({(s.name, s.tone) for _, s in sd.iter_syllables()}) == len(
+        codes)
+    for syllable in sd.Syllable.random_syllables(200, seed=4):
+        code = sd.encode_syllable(syllable.yunmu, syllable.shengmu,
+                                  sd.Tone.THIRD)
+        yunmu, shengmu, tone = sd.decode_syllable(code)
+        assert yunmu.name == syllable.yunmu.name and tone == sd.Tone.THIRD
+        assert (shengmu and shengmu.name) == (syllable.shengmu
+                                              and syllable.shengmu.name)
+    assert sd.code_sound(sd.sound_code(sd.monster_roar)).name == "bam"
+    with pytest.raises(ValueError):
+        sd.sound_code(sd.Sound.get([sd.dict_consonants["b"]]))
+    with pytest.raises(ValueError):
+        sd.decode_syllable(sd.NUM_SYLLABLES)
+
+
+def test_synthesis(tmp_path):
+    import wave
+    from combination.synthesis import Synthesizer, tone_contour
+    syn = Synthesizer(sample_rate=8000)
+    assert tone_contour(sd.Tone.SECOND, 10)[-1] > tone_contour(2, 10)[0]
+    assert np.argmin(tone_contour(sd.Tone.THIRD, 100)) not in (0, 99)
+    words = sd.Word.random_words(20, seed=5)
+    buffer = np.full(100000, 9., dtype=np.float32)
+    n = syn.render_into(words[0], buffer)
+    assert n == syn.num_samples(words[0]) and buffer[n] == 9.
+    assert np.array_equal(buffer[:n], syn.render(words[0]))
+    assert np.abs(buffer[:n]).max() <= syn.amplitude(words[0].strength)
+    with pytest.raises(ValueError):
+        syn.render_into(sd.monster_roar, np.zeros(10, dtype=np.float32))
+    # 分块输出拼接后等于逐个合成并插入静音
+    gap = np.zeros(int(0.05 * 8000), dtype=np.float32)
+    expected = np.concatenate(
+        [x for w in words for x in (gap, syn.render(w))][1:])
+    streamed = np.concatenate(
+        [block.copy() for block in syn.stream(words, chunk=1000)])
+    assert np.array_equal(streamed, expected)
+    frames = syn.write_wav(tmp_path / "words.wav", words, chunk=1000)
+    with wave.open(str(tmp_path / "words.wav")) as f:
+        assert f.getnframes() == frames == len(expected)
+        assert f.getframerate() == 8000
+    batches = list(syn.render_lexicon(words, batch_size=8))
+    assert [len(units) for units, _, _ in batches] == [8, 8, 4]
+    units, waves, lengths = batches[-1]
+    assert np.array_equal(waves[1, :lengths[1]], syn.render(units[1]))
+
 
 if __name__ == "__main__":
     #pytest.main([__file__])
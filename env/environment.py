@@ -1,10 +1,14 @@
 import random
+from contextlib import contextmanager
 import numpy as np
 import combination.sound as sd
 from agent._agent import Agent
 import agent._agent as agt
 from task.task  import *
 from collections import Counter
+from agent.population import Population
+from env.spatial import GridIndex
+from env.executor import SerialExecutor, choice, most_common
 
 
 class Signal:
@@ -31,6 +35,9 @@ class Environment:
         self.size = 100
         self.agents: list[agt.Agent] = []
         self.goods = [0, 1, 2, 3, 4, 5]
+        self.grid = GridIndex(cell_size=25)  # 代理位置的空间索引
+        self.pending: list[Signal] | None = None  # 当前时间步待广播的信号
+        self.scheduler = None  # 事件调度器，为 None 时信号立即送达
 
     @staticmethod
     def calculate_distance(agent1: Agent, agent2: Agent):
@@ -39,20 +46,82 @@ class Environment:
 
     def add_agent(self, agent: Agent):
         self.agents.append(agent)
+        self.grid.insert(agent, agent.position)
 
     def remove_agent(self, agent: Agent):
-        if Agent in self.agents:
+        if agent in self.agents:
             self.agents.remove(agent)
+            self.grid.remove(agent)
+
+    def move_agent(self, agent: Agent, position: np.ndarray):
+        """移动代理，同时更新空间索引"""
+        agent.position = position
+        self.grid.move(agent, position)
 
     def broadcast(self, signal: Signal):
-        """广播信号"""
-        for receiver in self.agents:
+        """广播信号，只检查空间索引中 tx_range 范围内的代理。
+        设置了 scheduler 时信号按传播延迟送达；在 tick() 中调用时信号先
+        缓存，时间步结束时统一广播。"""
+        if self.scheduler is not None:
+            self.scheduler.send(signal)
+            return
+        if self.pending is not None:
+            self.pending.append(signal)
+            return
+        for receiver in self.grid.query(signal.position, signal.tx_range):
             if receiver is signal.sender:
                 continue
             distance = self.calculate_distance(signal, receiver)
             if distance < signal.tx_range and distance < receiver.rx_range:
                 receiver.receive_sound(signal.sound)
 
+    @contextmanager
+    def tick(self):
+        """一个时间步：期间 send_sound 发出的信号被收集起来，
+        正常退出时由 flush_signals 一次广播；有异常抛出时丢弃本时间步
+        收集的信号，接收者的记忆不变"""
+        outer = self.pending
+        self.pending = [] if outer is None else outer
+        mark = len(self.pending)
+        try:
+            yield self
+        except BaseException:
+            del self.pending[mark:]
+            if outer is None:
+                self.pending = None
+            raise
+        if outer is None:
+            signals, self.pending = self.pending, None
+            self.flush_signals(signals)
+
+    def flush_signals(self, signals: list[Signal], chunk: int = 256):
+        """批量广播一组信号：由位置数组一次算出 发送者×接收者 距离矩阵，
+        按 tx_range 与 rx_range 过滤后，每个接收者一次接收全部声音。
+        chunk 限制每次参与计算的信号数，控制距离矩阵的内存。"""
+        if not signals or not self.agents:
+            return
+        positions = np.array([a.position for a in self.agents])
+        rx_ranges = np.array([a.rx_range for a in self.agents])
+        index = {id(a): i for i, a in enumerate(self.agents)}
+        heard: dict[int, list[sd.Sound]] = {}
+        for start in range(0, len(signals), chunk):
+            batch = signals[start:start + chunk]
+            origins = np.array([s.position for s in batch])
+            tx_ranges = np.array([s.tx_range for s in batch])
+            distance = np.linalg.norm(origins[:, None, :] -
+                                      positions[None, :, :],
+                                      axis=2)
+            mask = (distance < tx_ranges[:, None]) & (distance
+                                                      < rx_ranges[None, :])
+            for row, signal in enumerate(batch):
+                sender = index.get(id(signal.sender))
+                if sender is not None:
+                    mask[row, sender] = False
+            for row, col in zip(*np.nonzero(mask)):
+                heard.setdefault(int(col), []).append(batch[row].sound)
+        for col in sorted(heard):
+            self.agents[col].receive_sounds(heard[col])
+
     def choose_good(self):
         return random.choice(self.goods)
 
@@ -62,42 +131,55 @@ class Environment:
     def judge_learn(self, good: int, action: int, sound: sd.Sound):
         pass
 
-    def train(self, episodes: int = 500):
-        """训练Q-learning表"""
+    def train(self,
+              episodes: int = 500,
+              epsilon: float = 0.1,
+              executor=None,
+              seed=None):
+        """训练Q-learning表，epsilon 为初始探索率。
+        代理的选择与更新由 executor（默认为 self.agents 上的
+        SerialExecutor）完成，每一步只交换声音与各物品的票数。声音经
+        broadcast 送达，设置了 scheduler 时每一步发声后运行调度器，直到
+        到达事件全部处理完。发送者与物品由 seed 给出的随机数生成器抽取，
+        seed 为 None 时使用全局的 random，规则同 task.task.train_action。"""
         rewards = []
         steps = []
-        epsilon = 0.1
+        initial_epsilon = epsilon
+        rng = None if seed is None else np.random.default_rng(seed)
+        if executor is None:
+            executor = SerialExecutor(self.agents)
         # 首先让所有 agent 接触
-        self.contact_data()
+        self.contact_data(executor, rng)
 
         for ep in range(episodes):
             # 随机选一个物品
-            good = random.choice(self.goods)
-            agent = random.choice(self.agents)
+            good = choice(rng, self.goods)
+            agent = choice(rng, executor.agent_ids)
             total_average_reward = 0
             step = 0
             done = False
             # 设置探索率
-            for agent in self.agents:
-                agent.epsilon = epsilon
+            executor.set_epsilon(epsilon)
             while not done:
-                sound = agent.choose_sound(f"{good}", good, good=True)
-                agent.send_sound(sound)
+                sound = executor.choose_sound(agent,
+                                              good,
+                                              f"{good}",
+                                              good=True)
+                executor.send_sound(agent, sound)
+                if self.scheduler is not None:
+                    self.scheduler.run()
                 # 检查
                 next_good, next_agent, done, average_reward = self.judge(
-                    agent, good, sound, step)
+                    executor, agent, good, sound, step, rng)
 
                 agent = next_agent
                 good = next_good
                 step += 1
                 total_average_reward += average_reward
-
-                if done:
-                    break
             rewards.append(total_average_reward)
             steps.append(step)
             # 动态调整探索率
-            epsilon = max(0.01, 0.1 - ep / 500)
+            epsilon = max(0.01, initial_epsilon - ep / 500)
 
             if ep % 50 == 0:
                 print(
@@ -105,55 +187,130 @@ class Environment:
                 )
         return rewards, steps
 
-    def contact_data(self):
-        """获取接触数据"""
-        agent = random.choice(self.agents)
-        for good in self.goods:
-            sound = agent.make_rand_sound().data
-            for rv in self.agents:
-                rv.associate(rv.wrap_data(good, f"{good}", good=True),
-                             rv.wrap_data(sound, sound.name, sound=True))
-
-    def judge(self, agent: Agent, good: int, sound: sd.Sound, step: int):
-        flag = False
+    def contact_data(self, executor=None, rng: np.random.Generator = None):
+        """获取接触数据：随机一个代理为每个物品发出一个声音，全部代理把
+        物品与声音联系起来"""
+        if executor is None:
+            executor = SerialExecutor(self.agents)
+        agent = choice(rng, executor.agent_ids)
+        executor.contact(self.goods,
+                         executor.make_sounds(agent, len(self.goods)))
+
+    def judge(self,
+              executor,
+              agent: int,
+              good: int,
+              sound: sd.Sound,
+              step: int,
+              rng: np.random.Generator = None):
+        """其余代理听到 agent 的声音后选择物品并更新，返回
+        (下一物品, 下一发送者, 是否全部一致, 奖励)。票数相同时取编号
+        最小的物品，使结果与分片方式无关。"""
+        receivers = len(executor.agent_ids) - 1
         # 计算奖励
-        filtered_agents = [rv for rv in self.agents if rv is not agent]
-        goods = [
-            rv.choose_good(sound) for rv in self.agents if rv is not agent
-        ]
-        #print(f"goods: {goods}")
+        max_count_good, max_count = most_common(
+            executor.choose_goods(sound, agent))
+
+        reward = np.clip(receivers / 2 - step, -5, 5)
+        reward += max_count - receivers / 2.
+        executor.update_goods(good, sound, max_count_good, reward,
+                              receivers / 2 + 1)
+
+        next_agent = choice(rng, [a for a in executor.agent_ids if a != agent])
+        next_good = choice(rng, [g for g in self.goods if g != good])
+
+        return next_good, next_agent, max_count == receivers, reward
+
+    def train_population(self,
+                         episodes: int = 500,
+                         population: Population = None,
+                         max_steps: int = None):
+        """train 的群体张量版本，全部代理的 物品→声音 权重保存在
+        Population 中，每一步的判定与更新一次向量化完成。"""
+        if population is None:
+            population = Population(len(self.agents),
+                                    self.goods,
+                                    state_kind="good")
+        self.population = population
+        rng = population.rng
+        rewards = []
+        steps = []
+        epsilon = 0.1
+        # 首先让所有 agent 接触
+        for good in range(population.num_states):
+            population.associate(good,
+                                 int(rng.integers(population.num_sounds)))
 
-        counter = Counter(goods)
-        max_count_good = counter.most_common(1)[0][0]
-        max_count = counter.most_common(1)[0][1]
+        for ep in range(episodes):
+            # 随机选一个物品
+            good = int(rng.integers(population.num_states))
+            agent = int(rng.integers(population.num_agents))
+            total_average_reward = 0
+            step = 0
+            done = False
+            # 设置探索率
+            population.epsilon = epsilon
+            while not done:
+                sound = population.choose_sound(agent, good)
+                # 检查
+                (next_good, next_agent, done,
+                 average_reward) = self.judge_population(
+                     population, agent, good, sound, step)
 
-        reward = np.clip(len(filtered_agents)/2 - step, -5, 5)
-        reward += max_count - len(goods) / 2.
+                agent = next_agent
+                good = next_good
+                step += 1
+                total_average_reward += average_reward
+
+                if step == max_steps:
+                    break
+            rewards.append(total_average_reward)
+            steps.append(step)
+            # 动态调整探索率
+            epsilon = max(0.01, 0.1 - ep / 500)
 
-        next_good = max_count_good
+            if ep % 50 == 0:
+                print(
+                    f"Episode {ep}: Steps={step}, Reward={total_average_reward:.1f}"
+                )
+        return rewards, steps
 
-        if max_count == len(goods):
-            flag = True
+    @staticmethod
+    def judge_population(population: Population, agent: int, good: int,
+                         sound: int, step: int):
+        """judge 的群体张量版本，物品与声音均为编号"""
+        agents = np.arange(population.num_agents)
+        filtered_agents = agents[agents != agent]
+        goods = population.choose_states(sound, filtered_agents)
+
+        counts = np.bincount(goods, minlength=population.num_states)
+        max_count_good = int(np.argmax(counts))
+        max_count = counts[max_count_good]
+
+        reward = np.clip(len(filtered_agents) / 2 - step, -5, 5)
+        reward += max_count - len(goods) / 2.
 
-        for rv, selected_good in zip(filtered_agents, goods):
-            if selected_good == max_count_good:
-                setted_reward = reward + len(goods) / 2 + 1
-            else:
-                setted_reward = reward
-            rv.update_qlearning(good, sound, next_good, setted_reward)
+        rv_rewards = np.where(goods == max_count_good,
+                              reward + len(goods) / 2 + 1, reward)
+        population.update(good, sound,
+                          np.full(len(filtered_agents), max_count_good),
+                          rv_rewards, filtered_agents)
 
-        next_agent = random.choice([a for a in self.agents if a is not agent])
-        next_good = random.choice([g for g in self.goods if g is not good])
+        next_agent = int(population.rng.choice(filtered_agents))
+        next_good = int(
+            population.rng.choice(
+                [g for g in range(population.num_states) if g != good]))
 
-        return next_good, next_agent, flag, reward
+        return next_good, next_agent, max_count == len(goods), reward
 
-    def run(self):
-        """运行环境"""
-        for i in range(30):
-            self.add_agent(Agent(self, i, f"H-{i}"))
+    def run(self, checkpoint=None):
+        """运行环境，给定 checkpoint 时从最近的检查点继续"""
+        if checkpoint is None or not checkpoint.exists():
+            for i in range(30):
+                self.add_agent(Agent(self, i, f"H-{i}"))
 
         # self.train(100)
-        train_action(self, 100)
+        train_action(self, 100, checkpoint=checkpoint)
 
         # 展示网络
         agent = random.choice(self.agents)
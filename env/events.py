@@ -0,0 +1,84 @@
+import heapq
+import itertools
+import numpy as np
+
+
+class EventScheduler:
+    """离散事件调度器。事件按模拟时间保存在堆中，run() 依次取出最早的
+    事件执行，时间直接跳到下一个事件，没有待处理事件的代理不占用任何
+    计算。
+
+    挂到 Environment.scheduler 后，send_sound 发出的信号不再立即被接收：
+    空间索引中范围内的每个接收者得到一个到达事件，延迟为
+    距离 / speed + 声音持续时间（声音发完才算听完）。事件触发时调用接收者
+    的 hear(sound, scheduler)，代理可以在其中继续发声或安排新的事件。
+
+    同一时刻的事件按加入顺序执行，结果是确定的。
+
+    属性：
+        - env: 环境
+        - speed: 声音传播速度(世界长度单位/世界时间单位)
+        - time: 当前模拟时间
+        - queue: (时间, 序号, 回调, 参数) 组成的堆
+        - processed: 已执行的事件数"""
+
+    def __init__(self, env, speed: float = 100.):
+        """初始化调度器"""
+        self.env = env
+        self.speed = speed
+        self.time = 0.
+        self.queue: list[tuple] = []
+        self.processed = 0
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, delay: float, callback: callable, *args):
+        """delay 个时间单位后调用 callback(*args)"""
+        if delay < 0:
+            raise ValueError(f"delay must be non-negative: {delay}")
+        heapq.heappush(self.queue,
+                       (self.time + delay, next(self._counter), callback, args))
+
+    def delay(self, distance: float, sound) -> float:
+        """声音传播 distance 后被完整听到所需的时间"""
+        return distance / self.speed + sound.duration
+
+    def send(self, signal):
+        """为范围内的每个接收者安排一个到达事件，距离按发出时的位置计算"""
+        for receiver in self.env.grid.query(signal.position, signal.tx_range):
+            if receiver is signal.sender:
+                continue
+            distance = float(np.linalg.norm(signal.position -
+                                            receiver.position))
+            if distance < signal.tx_range and distance < receiver.rx_range:
+                self.schedule(self.delay(distance, signal.sound),
+                              self.deliver, receiver, signal.sound)
+
+    def deliver(self, receiver, sound):
+        """声音到达接收者"""
+        receiver.hear(sound, self)
+
+    def step(self) -> bool:
+        """执行最早的一个事件，没有事件时返回 False"""
+        if not self.queue:
+            return False
+        self.time, _, callback, args = heapq.heappop(self.queue)
+        callback(*args)
+        self.processed += 1
+        return True
+
+    def run(self, until: float = None, max_events: int = None) -> int:
+        """执行事件直到队列为空、下一个事件晚于 until 或执行了 max_events
+        个事件，返回本次执行的事件数。给定 until 时结束后时间停在 until。"""
+        count = 0
+        while self.queue and (max_events is None or count < max_events):
+            if until is not None and self.queue[0][0] > until:
+                break
+            self.step()
+            count += 1
+        if until is not None and until > self.time and (
+                max_events is None or count < max_events):
+            self.time = until
+        return count
@@ -0,0 +1,406 @@
+import multiprocessing as mp
+import os
+import random
+import sys
+import warnings
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def spawn_agents(env, num_agents: int, seed=None, memory_factory=None):
+    """创建 num_agents 个代理并加入环境，每个代理使用由 seed 派生的独立
+    随机数流。memory_factory(rng) 返回代理的记忆，默认为 Memory。"""
+    from agent._agent import Agent
+    rngs = [
+        np.random.default_rng(s)
+        for s in np.random.SeedSequence(seed).spawn(num_agents)
+    ]
+    agents = [
+        Agent(env,
+              i,
+              f"H-{i}",
+              memory=None if memory_factory is None else memory_factory(rng),
+              rng=rng) for i, rng in enumerate(rngs)
+    ]
+    for agent in agents:
+        env.add_agent(agent)
+    return agents
+
+
+def free_threaded() -> bool:
+    """解释器是否在无 GIL 模式下运行。自由线程构建导入未声明支持的
+    扩展后会重新启用 GIL，因此在运行时检查而不是看构建选项。记忆依赖的
+    igraph 目前就会重新启用 GIL，实际运行中通常返回 False。"""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def choice(rng: np.random.Generator, seq):
+    """从序列中随机选一个，rng 为 None 时使用全局的 random"""
+    if rng is None:
+        return random.choice(seq)
+    return seq[int(rng.integers(len(seq)))]
+
+
+def most_common(counts: dict):
+    """票数最多的选项，票数相同时取值最小的，与分片方式无关"""
+    return min(counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+class Shard:
+    """一组代理及其在训练各阶段的本地操作。SerialExecutor 在当前进程中
+    直接调用，ShardedExecutor 在各工作进程中调用。
+
+    属性：
+        - agents: 代理编号 -> 代理
+        - choices: 最近一次 choose_goods 中各代理选择的物品"""
+
+    def __init__(self, agents):
+        """初始化分片"""
+        self.agents = {agent.id: agent for agent in agents}
+        self.choices = {}
+
+    def set_epsilon(self, epsilon: float):
+        for agent in self.agents.values():
+            agent.epsilon = epsilon
+
+    def add_action_memory(self):
+        """将动作添加到记忆中"""
+        for agent in self.agents.values():
+            agent.memory.match_nodes([(a, a, {
+                "action": True
+            }) for a in agent.actions])
+
+    def contact(self, goods: list, sounds: list):
+        """让全部代理把物品与声音一一联系起来"""
+        for agent in self.agents.values():
+            agent.associate_many([
+                (agent.wrap_data(good, f"{good}", good=True),
+                 agent.wrap_data(sound, sound.name, sound=True))
+                for good, sound in zip(goods, sounds)
+            ])
+
+    def make_sounds(self, agent_id: int, n: int) -> list:
+        """代理随机生成 n 个声音"""
+        agent = self.agents[agent_id]
+        return [agent.make_rand_sound().data for _ in range(n)]
+
+    def choose_sound(self, agent_id: int, data, name: str, kwargs: dict):
+        return self.agents[agent_id].choose_sound(data, name, **kwargs)
+
+    def choose_action(self, agent_id: int, sound=None) -> str:
+        return self.agents[agent_id].choose_action(sound)
+
+    def mood(self, agent_id: int) -> int:
+        return self.agents[agent_id].mood
+
+    def choose_actions(self, sound, exclude: int) -> Counter:
+        """除 exclude 外的代理听到声音后做出动作，返回各情绪的票数"""
+        counts = Counter()
+        for agent in self.agents.values():
+            if agent.id != exclude:
+                agent.choose_action(sound)
+                counts[agent.mood] += 1
+        return counts
+
+    def send_sound(self, agent_id: int, sound):
+        """代理发声，经所在环境的 broadcast 送达"""
+        self.agents[agent_id].send_sound(sound)
+
+    def signal(self, agent_id: int) -> tuple:
+        """代理发声的位置与发送范围"""
+        agent = self.agents[agent_id]
+        return agent.position, agent.tx_range
+
+    def hear(self, sound, position, tx_range: float, sender: int):
+        """其他分片的代理发出的声音，由本分片所在环境的 broadcast（空间
+        索引）找出范围内的代理接收。只用于 ShardedExecutor 的工作进程，
+        其中的环境只包含本分片的代理。"""
+        from env.environment import Signal
+        env = next(iter(self.agents.values())).env
+        env.broadcast(
+            Signal(self.agents.get(sender), position, tx_range, sound))
+
+    def update_actions(self, action: str, sound, reward: float):
+        """全部代理以各自随机的下一动作更新 Q 值，并重置情绪"""
+        for agent in self.agents.values():
+            next_action = agent._choice(agent.actions)
+            agent.update_qlearning(action,
+                                   sound,
+                                   next_action,
+                                   reward,
+                                   action=True)
+            agent.reset_mood()
+
+    def choose_goods(self, sound, exclude: int) -> Counter:
+        """除 exclude 外的代理听到声音后选择物品，返回各物品的票数"""
+        self.choices = {
+            agent.id: agent.choose_good(sound)
+            for agent in self.agents.values() if agent.id != exclude
+        }
+        return Counter(self.choices.values())
+
+    def update_goods(self, good: int, sound, next_good: int, reward: float,
+                     bonus: float):
+        """上一次 choose_goods 的代理更新 Q 值，选中 next_good 的额外
+        获得 bonus"""
+        for agent_id, selected_good in self.choices.items():
+            agent = self.agents[agent_id]
+            agent.update_qlearning(
+                good, sound, next_good,
+                reward + bonus if selected_good == next_good else reward)
+
+    def get_agents(self) -> list:
+        return list(self.agents.values())
+
+
+class SerialExecutor:
+    """在当前进程中执行全部分片操作，与 ShardedExecutor 接口相同。
+
+    属性：
+        - agent_ids: 全部代理编号
+        - actions: 代理的动作列表
+        - shards: 分片
+        - owner: 代理编号 -> 所在分片的下标"""
+
+    def __init__(self, agents):
+        """初始化执行器"""
+        self.agent_ids = [agent.id for agent in agents]
+        self.actions = list(agents[0].actions)
+        self.shards = [Shard(agents)]
+        self.owner = {agent.id: 0 for agent in agents}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _call(self, shard: int, method: str, *args):
+        """在一个分片上调用方法"""
+        return getattr(self.shards[shard], method)(*args)
+
+    def _broadcast(self, method: str, *args) -> list:
+        """在全部分片上调用方法，返回各分片的结果"""
+        return [getattr(shard, method)(*args) for shard in self.shards]
+
+    def _count(self, method: str, *args) -> Counter:
+        """汇总各分片的票数"""
+        total = Counter()
+        for counts in self._broadcast(method, *args):
+            total.update(counts)
+        return total
+
+    def set_epsilon(self, epsilon: float):
+        self._broadcast("set_epsilon", epsilon)
+
+    def add_action_memory(self):
+        self._broadcast("add_action_memory")
+
+    def contact(self, goods: list, sounds: list):
+        self._broadcast("contact", goods, sounds)
+
+    def make_sounds(self, agent_id: int, n: int) -> list:
+        return self._call(self.owner[agent_id], "make_sounds", agent_id, n)
+
+    def choose_sound(self, agent_id: int, data, name: str, **kwargs):
+        return self._call(self.owner[agent_id], "choose_sound", agent_id,
+                          data, name, kwargs)
+
+    def choose_action(self, agent_id: int, sound=None) -> str:
+        return self._call(self.owner[agent_id], "choose_action", agent_id,
+                          sound)
+
+    def mood(self, agent_id: int) -> int:
+        return self._call(self.owner[agent_id], "mood", agent_id)
+
+    def choose_actions(self, sound, exclude: int) -> Counter:
+        return self._count("choose_actions", sound, exclude)
+
+    def send_sound(self, agent_id: int, sound):
+        """代理发声，由代理所在环境的 Environment.broadcast 送达，空间索引、
+        tick() 批量广播与事件调度器都照常生效"""
+        self._call(self.owner[agent_id], "send_sound", agent_id, sound)
+
+    def update_actions(self, action: str, sound, reward: float):
+        self._broadcast("update_actions", action, sound, reward)
+
+    def choose_goods(self, sound, exclude: int) -> Counter:
+        return self._count("choose_goods", sound, exclude)
+
+    def update_goods(self, good: int, sound, next_good: int, reward: float,
+                     bonus: float):
+        self._broadcast("update_goods", good, sound, next_good, reward,
+                        bonus)
+
+    def agents(self) -> list:
+        """取回全部代理，按编号排序"""
+        agents = [a for part in self._broadcast("get_agents") for a in part]
+        return sorted(agents, key=lambda agent: agent.id)
+
+    def close(self):
+        pass
+
+
+class ThreadedExecutor(SerialExecutor):
+    """把代理按编号顺序分成 num_workers 片，在线程池中并行执行各分片的
+    操作。代理留在当前进程中，不需要序列化；每个代理只访问自己的记忆和
+    随机数流，结果与 SerialExecutor 一致。
+
+    parallel 为 None 时只在无 GIL 的解释器上启用线程池；标准构建中线程
+    不能并行执行 Python 代码，退化为单片串行执行。导入 igraph 后自由线程
+    构建也会重新启用 GIL，因此目前默认总是串行执行；parallel=True 时仍会
+    使用线程池，但在 GIL 启用时给出 RuntimeWarning。
+
+    线程池中各代理必须有自己的随机数生成器（见 spawn_agents），否则
+    多个线程会同时使用全局的 random 与 np.random，结果不确定，因此
+    parallel=True 时拒绝 rng 为 None 的代理。
+
+    属性：
+        - parallel: 是否使用线程池
+        - pool: 线程池，串行执行时为 None"""
+
+    def __init__(self,
+                 agents,
+                 num_workers: int = None,
+                 parallel: bool = None):
+        """初始化执行器"""
+        super().__init__(agents)
+        self.parallel = free_threaded() if parallel is None else parallel
+        self.pool = None
+        if not self.parallel:
+            return
+        if any(agent.rng is None for agent in agents):
+            raise ValueError("parallel execution requires every agent to "
+                             "have its own rng, see spawn_agents")
+        if not free_threaded():
+            warnings.warn(
+                "the GIL is enabled (igraph re-enables it on free-threaded "
+                "builds), threads will not run in parallel", RuntimeWarning)
+        num_workers = min(num_workers or os.cpu_count(), len(agents))
+        parts = np.array_split(np.arange(len(agents)), num_workers)
+        self.shards = [Shard([agents[i] for i in part]) for part in parts]
+        self.owner = {
+            agents[i].id: shard
+            for shard, part in enumerate(parts) for i in part
+        }
+        self.pool = ThreadPoolExecutor(num_workers)
+
+    def _broadcast(self, method: str, *args) -> list:
+        if self.pool is None:
+            return super()._broadcast(method, *args)
+        futures = [
+            self.pool.submit(getattr(shard, method), *args)
+            for shard in self.shards
+        ]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """关闭线程池"""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+def _serve(conn, agents, goods, size):
+    """工作进程的主循环：接收 (方法, 参数) 并在本地分片上执行"""
+    from env.environment import Environment
+    environment = Environment()
+    environment.goods = list(goods)
+    environment.size = size
+    for agent in agents:
+        agent.env = environment
+        environment.add_agent(agent)
+    shard = Shard(agents)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        method, args = message
+        try:
+            conn.send((True, getattr(shard, method)(*args)))
+        except Exception as e:
+            conn.send((False, e))
+    conn.close()
+
+
+class ShardedExecutor(SerialExecutor):
+    """把代理按编号顺序分成 num_workers 片，每片由一个工作进程持有。
+    每个工作进程拥有自己代理的记忆，只与协调进程交换声音和票数。
+    代理使用各自的随机数流（见 spawn_agents）时，结果与 SerialExecutor
+    一致，与分片数无关。
+
+    声音在协调进程中只取发送者的位置，再发给各工作进程，由工作进程中
+    环境的空间索引找出范围内的接收者。事件调度器只能在一个进程中运行，
+    因此环境设置了 scheduler 时不能使用。"""
+
+    def __init__(self, agents, num_workers: int = None):
+        """初始化执行器并启动工作进程，代理被复制到工作进程中"""
+        env = agents[0].env
+        if env.scheduler is not None:
+            raise ValueError(
+                "ShardedExecutor does not support an event scheduler")
+        num_workers = min(num_workers or mp.cpu_count(), len(agents))
+        self.agent_ids = [agent.id for agent in agents]
+        self.actions = list(agents[0].actions)
+        parts = [
+            list(part) for part in np.array_split(
+                np.arange(len(agents)), num_workers)
+        ]
+        self.owner = {
+            agents[i].id: shard
+            for shard, part in enumerate(parts) for i in part
+        }
+        self.shards = []
+        self.workers = []
+        for part in parts:
+            parent, child = mp.Pipe()
+            worker = mp.Process(target=_serve,
+                                args=(child, [agents[i] for i in part],
+                                      env.goods, env.size),
+                                daemon=True)
+            worker.start()
+            child.close()
+            self.shards.append(parent)
+            self.workers.append(worker)
+
+    @staticmethod
+    def _receive(conn):
+        ok, result = conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def _call(self, shard: int, method: str, *args):
+        self.shards[shard].send((method, args))
+        return self._receive(self.shards[shard])
+
+    def send_sound(self, agent_id: int, sound):
+        """代理发声，各工作进程由本地的空间索引找出范围内的代理接收"""
+        position, tx_range = self._call(self.owner[agent_id], "signal",
+                                        agent_id)
+        self._broadcast("hear", sound, position, tx_range, agent_id)
+
+    def _broadcast(self, method: str, *args) -> list:
+        # 先全部发出再依次接收，各工作进程并行执行
+        for conn in self.shards:
+            conn.send((method, args))
+        replies = [conn.recv() for conn in self.shards]
+        for ok, result in replies:
+            if not ok:
+                raise result
+        return [result for _, result in replies]
+
+    def close(self):
+        """结束工作进程"""
+        for conn in self.shards:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for worker in self.workers:
+            worker.join()
+        self.shards = []
+        self.workers = []
@@ -0,0 +1,65 @@
+import math
+import numpy as np
+
+
+class GridIndex:
+    """均匀网格空间索引，按位置把对象放入边长为 cell_size 的格子，
+    范围查询只访问与查询范围相交的格子。
+
+    属性：
+        - cell_size: 格子边长
+        - cells: 格子坐标 -> 格内对象（dict 作有序集合）
+        - keys: 对象 -> 所在格子坐标"""
+
+    def __init__(self, cell_size: float = 25.):
+        """初始化网格"""
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], dict] = {}
+        self.keys: dict = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, item):
+        return item in self.keys
+
+    def _key(self, position: np.ndarray):
+        return (math.floor(position[0] / self.cell_size),
+                math.floor(position[1] / self.cell_size))
+
+    def insert(self, item, position: np.ndarray):
+        """加入对象"""
+        key = self._key(position)
+        self.cells.setdefault(key, {})[item] = None
+        self.keys[item] = key
+
+    def remove(self, item):
+        """移除对象，不存在时忽略"""
+        key = self.keys.pop(item, None)
+        if key is None:
+            return
+        cell = self.cells[key]
+        del cell[item]
+        if not cell:
+            del self.cells[key]
+
+    def move(self, item, position: np.ndarray):
+        """对象位置变化后更新所在格子"""
+        if self.keys.get(item) != self._key(position):
+            self.remove(item)
+            self.insert(item, position)
+
+    def query(self, position: np.ndarray, radius: float):
+        """返回可能在 radius 范围内的对象（与范围相交的格子中的全部对象），
+        精确的距离判断由调用方完成。"""
+        x0, y0 = self._key((position[0] - radius, position[1] - radius))
+        x1, y1 = self._key((position[0] + radius, position[1] + radius))
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            # 查询范围覆盖的格子比已有格子多，直接遍历已有格子
+            keys = [(x, y) for x, y in self.cells
+                    if x0 <= x <= x1 and y0 <= y <= y1]
+        else:
+            keys = [(x, y) for x in range(x0, x1 + 1)
+                    for y in range(y0, y1 + 1)]
+        for key in keys:
+            yield from self.cells.get(key, ())
@@ -0,0 +1,270 @@
+import numpy as np
+import pytest
+from env.environment import Environment, Signal
+from env.spatial import GridIndex
+from env.events import EventScheduler
+from env.vector import VectorEnvironment
+from agent.population import Population
+from env.executor import (spawn_agents, SerialExecutor, ShardedExecutor,
+                          ThreadedExecutor)
+from task.task import train_action
+from agent._agent import Agent
+import combination.sound as sd
+
+
+def test_grid_query():
+    rng = np.random.default_rng(0)
+    grid = GridIndex(cell_size=7)
+    points = rng.random((200, 2)) * 100
+    for i, p in enumerate(points):
+        grid.insert(i, p)
+    grid.remove(5)
+    grid.move(6, np.array([50., 50.]))
+    points[6] = [50., 50.]
+    center = np.array([40., 60.])
+    found = set(grid.query(center, 15))
+    inside = {
+        i
+        for i, p in enumerate(points)
+        if i != 5 and np.linalg.norm(p - center) < 15
+    }
+    assert inside <= found
+
+
+def test_broadcast_range():
+    np.random.seed(0)
+    env = Environment()
+    env.size = 200
+    for i in range(50):
+        agent = Agent(env, i, f"H-{i}")
+        agent.rx_range = 30 + i
+        env.add_agent(agent)
+    sender = env.agents[0]
+    env.broadcast(Signal(sender, sender.position, 200, sd.monster_roar))
+    received = {a.id for a in env.agents if a.memory.select_nodes(sound=True)}
+    expected = {
+        a.id
+        for a in env.agents[1:]
+        if env.calculate_distance(sender, a) < min(200, a.rx_range)
+    }
+    assert received == expected and received
+
+
+def test_tick_broadcast():
+    def build():
+        np.random.seed(1)
+        env = Environment()
+        env.size = 200
+        for i in range(40):
+            env.add_agent(Agent(env, i, f"H-{i}"))
+        return env
+
+    def received(env):
+        return [[n["name"] for n in a.memory.data.vs] for a in env.agents]
+
+    sounds = [sd.Sound([sd.dict_consonants[c], sd.dict_vowels["a"]])
+              for c in "bpmfd"]
+    direct, batched, chunked = build(), build(), build()
+    for i, sound in enumerate(sounds):
+        direct.agents[i * 3].send_sound(sound)
+    with batched.tick():
+        for i, sound in enumerate(sounds):
+            batched.agents[i * 3].send_sound(sound)
+        assert not any(a.memory.data.vs for a in batched.agents)
+    chunked.flush_signals([
+        Signal(chunked.agents[i * 3], chunked.agents[i * 3].position, 100,
+               sound) for i, sound in enumerate(sounds)
+    ],
+                          chunk=2)
+    assert received(direct) == received(batched) == received(chunked)
+    assert any(received(batched))
+
+
+def test_tick_discards_on_error():
+    np.random.seed(2)
+    env = Environment()
+    for i in range(10):
+        env.add_agent(Agent(env, i, f"H-{i}"))
+    sound = sd.Sound([sd.dict_consonants["b"], sd.dict_vowels["a"]])
+    with pytest.raises(RuntimeError):
+        with env.tick():
+            env.agents[0].send_sound(sound)
+            raise RuntimeError("step failed")
+    assert env.pending is None
+    assert not any(a.memory.select_nodes(sound=True) for a in env.agents)
+    # 嵌套时只丢弃内层的信号
+    with env.tick():
+        env.agents[0].send_sound(sound)
+        with pytest.raises(RuntimeError):
+            with env.tick():
+                env.agents[1].send_sound(sound)
+                raise RuntimeError("inner step failed")
+        assert len(env.pending) == 1
+    assert env.pending is None
+    assert not env.agents[0].memory.select_nodes(sound=True)
+    assert any(a.memory.select_nodes(sound=True) for a in env.agents[1:])
+
+
+def test_event_delays():
+    heard = []
+
+    class Echo(Agent):
+        def hear(self, sound, scheduler):
+            super().hear(sound, scheduler)
+            heard.append((self.id, scheduler.time))
+            if self.id == 1:
+                self.send_sound(sound)
+
+    env = Environment()
+    env.size = 1000
+    scheduler = EventScheduler(env, speed=10.)
+    env.scheduler = scheduler
+    for i, x in enumerate([0., 20., 50., 500.]):
+        agent = Echo(env, i, f"H-{i}")
+        agent.position = np.array([x, 0.])
+        env.add_agent(agent)
+    sound = sd.Sound([sd.dict_consonants["b"], sd.dict_vowels["a"]])
+    env.agents[0].send_sound(sound)
+    assert not env.agents[1].memory.select_nodes(sound=True)
+    assert len(scheduler) == 2
+    d = sound.duration
+    assert scheduler.run(until=2.) == 0 and scheduler.time == 2.
+    scheduler.run()
+    # 1 听到后回应，0 和 2 在回声到达时再听到一次
+    assert [i for i, _ in heard] == [1, 0, 2, 2]
+    assert [t for _, t in heard] == pytest.approx(
+        [2 + d, 4 + 2 * d, 5 + d, 5 + 2 * d])
+    assert scheduler.processed == 4 and not len(scheduler)
+    assert not env.agents[3].memory.select_nodes(sound=True)
+
+
+def test_vector_environment():
+    v = VectorEnvironment(4, num_agents=3, max_steps=1, seed=0)
+    obs = v.reset()
+    assert obs.shape == (4, ) and set(obs.tolist()) <= {0, 1}
+    obs, rewards, dones, info = v.step(np.array([0, 1, 2, 3]))
+    assert rewards.shape == dones.shape == (4, ) and dones.all()
+    assert (info["steps"] == 1).all() and not v.steps.any()
+    assert np.allclose(rewards, 10 * info["agreed"] / 3 - 5)
+    with pytest.raises(ValueError):
+        v.step(np.array([0, 1]))
+
+    # 更新规则与 Population.update 一致
+    p = Population(3, ["cry", "laugh"], seed=1)
+    p.q[:] = np.random.default_rng(2).random(p.q.shape)
+    v.q[:] = p.q
+    v.state[:] = 1
+    next_states = np.array([[0, 1, 1]] * 4)
+    v.update(np.full(4, 5), next_states, np.full(4, 7.))
+    p.update(1, 5, next_states[0], 7.)
+    assert np.allclose(v.q, p.q[None])
+
+    # 固定的命名策略下听者逐渐一致
+    v = VectorEnvironment(32, num_agents=5, max_steps=20, seed=3)
+    obs = v.reset()
+    rewards = []
+    for _ in range(200):
+        obs, reward, dones, info = v.step(obs)
+        rewards.append(reward.mean())
+    assert np.mean(rewards[-20:]) > np.mean(rewards[:5])
+
+
+def test_sharded_matches_serial():
+    def run(mode, executor_type, **kwargs):
+        env = Environment()
+        agents = spawn_agents(env, 9, seed=3)
+        with executor_type(agents, **kwargs) as executor:
+            if mode == "action":
+                result = train_action(None, 20, executor=executor, seed=5)
+            else:
+                result = env.train(20, executor=executor, seed=5)
+            names = [[n["name"] for n in a.memory.data.vs]
+                     for a in executor.agents()]
+        return result, names
+
+    for mode in ("action", "good"):
+        serial = run(mode, SerialExecutor)
+        assert serial == run(mode, ShardedExecutor, num_workers=2)
+        assert serial == run(mode, ShardedExecutor, num_workers=4)
+        assert serial == run(mode, ThreadedExecutor, num_workers=3,
+                             parallel=True)
+        assert serial == run(mode, ThreadedExecutor)
+        assert sum(serial[0][1]) > 20
+
+
+def test_threaded_requires_rng():
+    env = Environment()
+    agents = [Agent(env, i, f"H-{i}") for i in range(3)]
+    with pytest.raises(ValueError):
+        ThreadedExecutor(agents, parallel=True)
+    # 不使用线程池时允许共享全局随机数
+    with ThreadedExecutor(agents, parallel=False) as executor:
+        assert executor.pool is None
+
+
+def test_train_grid_scheduler(monkeypatch):
+    def build():
+        env = Environment()
+        env.size = 400
+        spawn_agents(env, 12, seed=0)
+        queries = []
+        query = env.grid.query
+        monkeypatch.setattr(
+            env.grid, "query",
+            lambda position, radius: queries.append(radius) or query(
+                position, radius))
+        return env, queries
+
+    env, queries = build()
+    result = env.train(5, seed=1)
+    # 发声经 broadcast 由空间索引查找接收者
+    assert len(queries) == sum(result[1])
+    env, queries = build()
+    env.scheduler = EventScheduler(env)
+    assert env.train(5, seed=1) == result
+    # 每一步的到达事件都在评判前处理完
+    assert env.scheduler.processed > 0 and not len(env.scheduler)
+    assert len(queries) == sum(result[1])
+    with pytest.raises(ValueError):
+        ShardedExecutor(env.agents)
+
+
+def test_train_global_rng():
+    import random
+
+    def build(seed):
+        random.seed(seed)
+        np.random.seed(seed)
+        env = Environment()
+        for i in range(5):
+            env.add_agent(Agent(env, i, f"H-{i}"))
+        return env
+
+    # 使用全局随机数时与引入执行器之前的 train_action 结果相同
+    steps = [2, 2, 2, 2, 2, 4, 2, 4, 4, 5, 2, 1]
+    rewards = [0., 0., 0., 0., 0., -7.5, 0., -7.5, 0., -5., 0., 5.]
+    assert train_action(build(7), 12) == (rewards, steps)
+    env = build(7)
+    with SerialExecutor(env.agents) as executor:
+        assert train_action(None, 12, executor=executor) == (rewards, steps)
+
+    # train 的默认执行器与显式的 SerialExecutor 相同
+    default = build(3).train(10)
+    env = build(3)
+    assert env.train(10, executor=SerialExecutor(env.agents)) == default
+    assert sum(default[1]) >= 10
+
+
+def test_agent_pickle():
+    import pickle
+    env = Environment()
+    agent = spawn_agents(env, 1, seed=0)[0]
+    agent.receive_sound(sd.monster_roar)
+    copy = pickle.loads(pickle.dumps(agent))
+    assert copy.env is None and agent.env is env
+    assert copy.memory.num_nodes == agent.memory.num_nodes == 1
+    assert copy.rng.random() == agent.rng.random()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
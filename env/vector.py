@@ -0,0 +1,161 @@
+import numpy as np
+from env.base import BaseEnvironment
+from agent.population import sound_space
+
+
+class VectorEnvironment(BaseEnvironment):
+    """K 个相互独立的动作命名环境副本，全部状态批量保存在 NumPy 数组中，
+    外部强化学习代码可以一次驱动全部副本。
+
+    每个副本中有 num_agents 个听者，Q 值规则同 Population。每一步外部
+    策略作为发送者，为每个副本的目标动作给出一个声音编号；听者听到后
+    选择动作，随后以 train_population 相同的规则更新 Q 值。
+    全部听者选中目标，或步数达到 max_steps 时副本结束，并立即自动重置：
+    step 返回的观测已是新一轮的观测。
+
+    属性：
+        - num_envs: 副本数 K
+        - num_agents: 每个副本的听者数
+        - states: 动作列表
+        - sounds: 声音列表，动作 a 表示 sounds[a]
+        - q: 权重张量 (副本 × 听者 × 动作 × 声音)，尚未建立联系的位置为 NaN
+        - heard: 听者是否认识该声音 (副本 × 听者 × 声音)
+        - state: 各副本的目标动作编号 (K,)，即观测
+        - steps: 各副本本轮已进行的步数 (K,)
+        - agreement: 各副本上一步选中目标的听者比例 (K,)
+        - max_steps: 每轮的最大步数，None 表示不限
+        - alpha: 学习率
+        - gamma: 折扣因子
+        - epsilon: 探索率
+        - beta: 记忆使用率
+        - rng: 随机数生成器"""
+
+    def __init__(self,
+                 num_envs: int,
+                 num_agents: int = 10,
+                 states: list = ("cry", "laugh"),
+                 sounds: list = None,
+                 max_steps: int = None,
+                 seed=None):
+        """初始化 K 个副本，seed 为种子或 numpy.random.Generator"""
+        super().__init__(0)
+        self.num_envs = num_envs
+        self.num_agents = num_agents
+        self.states = list(states)
+        self.sounds = sound_space() if sounds is None else list(sounds)
+        self.max_steps = max_steps
+        self.observation_space = len(self.states)  # 观测取值个数
+        self.action_space = len(self.sounds)  # 动作取值个数
+        self.alpha = 0.2  # 学习率
+        self.gamma = 0.9  # 折扣因子
+        self.epsilon = 0.1  # 探索率
+        self.beta = 0.95  # 记忆使用率
+        self.rng = np.random.default_rng(seed)
+        self.q = np.full(
+            (num_envs, num_agents, len(self.states), len(self.sounds)),
+            np.nan)
+        self.heard = np.zeros((num_envs, num_agents, len(self.sounds)),
+                              dtype=bool)
+        self.state = np.zeros(num_envs, dtype=np.int64)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.agreement = np.zeros(num_envs)
+        self._envs = np.arange(num_envs)[:, None]
+        self._agents = np.arange(num_agents)[None, :]
+
+    def reset(self, envs=None) -> np.ndarray:
+        """重置一组副本（默认全部）：清空听者的记忆并抽取新的目标，
+        返回全部副本的观测"""
+        if envs is None:
+            envs = self._envs[:, 0]
+            self.current_step = 0
+        envs = np.asarray(envs)
+        self.q[envs] = np.nan
+        self.heard[envs] = False
+        self.agreement[envs] = 0.
+        self._new_episode(envs)
+        return self.state.copy()
+
+    def _new_episode(self, envs):
+        """为一组副本开始新的一轮，听者的记忆保留"""
+        self.state[envs] = self.rng.integers(len(self.states), size=len(envs))
+        self.steps[envs] = 0
+
+    def _touch(self, states, sounds):
+        """确保全部听者的 (目标, 声音) 已建立联系，states 与 sounds 为
+        可广播到 (K, 听者) 的编号数组"""
+        index = (self._envs, self._agents, states, sounds)
+        values = self.q[index]
+        missing = np.isnan(values)
+        if missing.any():
+            values[missing] = self.rng.random(missing.sum())
+            self.q[index] = values
+        self.heard[self._envs, self._agents, sounds] = True
+
+    def choose_states(self, sounds: np.ndarray) -> np.ndarray:
+        """每个副本的全部听者听到该副本的声音并选择动作，ε-贪心规则同
+        Population.choose_states，返回 (K, 听者) 的动作编号"""
+        self.heard[self._envs, self._agents, sounds[:, None]] = True
+        draws = self.rng.random((2, self.num_envs, self.num_agents))
+        columns = self.q[self._envs[:, 0], :, :, sounds]
+        known = ~np.isnan(columns)
+        explore = (draws[0] < self.epsilon) | (draws[1] > self.beta)
+        explore |= ~known.any(axis=2)
+        greedy = np.where(known, columns, -np.inf).argmax(axis=2)
+        random_states = self.rng.integers(len(self.states),
+                                          size=explore.shape)
+        return np.where(explore, random_states, greedy)
+
+    def update(self, sounds: np.ndarray, next_states: np.ndarray,
+               rewards: np.ndarray):
+        """全部副本的全部听者同时执行 Q-learning 更新，规则同
+        Population.update"""
+        states = self.state[:, None]
+        sounds = sounds[:, None]
+        self._touch(states, sounds)
+        old = self.q[self._envs, self._agents, states, sounds]
+        self._touch(next_states, sounds)
+        next_max = np.nanmax(self.q[self._envs, self._agents, next_states],
+                             axis=2)
+        self.q[self._envs, self._agents, states,
+               sounds] = (1 - self.alpha) * old + self.alpha * (
+                   rewards[:, None] + self.gamma * next_max)
+
+    def step(self, actions):
+        """每个副本执行一步，actions 为 (K,) 的声音编号。
+        返回 (观测, 奖励, 结束标志, 信息)：奖励为听者奖励（选中 +5，
+        否则 -5）的均值；信息中 "agreed" 为各副本选中目标的听者数，
+        "steps" 为各副本本轮的步数（结束的副本为整轮的步数）。"""
+        actions = np.asarray(actions, dtype=np.int64)
+        if actions.shape != (self.num_envs, ):
+            raise ValueError(f"expected {self.num_envs} actions, "
+                             f"got shape {actions.shape}")
+        if ((actions < 0) | (actions >= len(self.sounds))).any():
+            raise ValueError("action out of range")
+        choices = self.choose_states(actions)
+        agreed = (choices == self.state[:, None]).sum(axis=1)
+        self.agreement = agreed / self.num_agents
+        rewards = 10. * self.agreement - 5.
+        next_states = self.rng.integers(len(self.states),
+                                        size=choices.shape)
+        # 同 train_population：发送者的奖励为 5 + 一致数 - 不一致数
+        self.update(actions, next_states,
+                    5. + agreed - (self.num_agents - agreed))
+
+        self.steps += 1
+        self.current_step += 1
+        dones = agreed == self.num_agents
+        if self.max_steps is not None:
+            dones |= self.steps >= self.max_steps
+        info = {"agreed": agreed, "steps": self.steps.copy()}
+        self._new_episode(np.flatnonzero(dones))
+        return self.state.copy(), rewards, dones, info
+
+    def render(self):
+        """打印各副本的目标、步数与上一步的一致比例"""
+        for k in range(self.num_envs):
+            print(f"Env {k}: target={self.states[self.state[k]]}, "
+                  f"steps={self.steps[k]}, "
+                  f"agreement={self.agreement[k]:.2f}")
+
+    def close(self):
+        pass
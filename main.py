@@ -1,8 +1,12 @@
+import os
 from env.environment import Environment
+from task.checkpoint import Checkpointer
 
 def main():
     env = Environment()
-    env.run()
+    result_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                              "result")
+    env.run(Checkpointer(os.path.join(result_dir, "checkpoint")))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,645 @@
+import heapq
+import numpy as np
+import igraph as ig
+from memory.batch import doubled_weights, group_pairs, rand, resolve_nodes
+from memory.memory import Memory
+from memory.mixin import MemoryMixin
+
+
+class ArrayVertex:
+    """ArrayMemory 的顶点句柄，用法与 igraph.Vertex 相同：
+    node.index, node['data']。"""
+
+    __slots__ = ("memory", "index")
+
+    def __init__(self, memory: "ArrayMemory", index: int):
+        self.memory = memory
+        self.index = index
+
+    def __getitem__(self, attr: str):
+        return self.memory.attrs[attr][self.index]
+
+    def __setitem__(self, attr: str, value):
+        self.memory.set_attr(self.index, attr, value)
+
+    def __eq__(self, other):
+        return (isinstance(other, ArrayVertex)
+                and other.memory is self.memory and other.index == self.index)
+
+    def __hash__(self):
+        return hash((id(self.memory), self.index))
+
+    def __repr__(self):
+        name = self.memory.attrs["name"][self.index]
+        return f"ArrayVertex({self.index}, {name!r})"
+
+    def attributes(self):
+        return {k: v[self.index] for k, v in self.memory.attrs.items()}
+
+    def neighbors(self, mode="all"):
+        return self.memory.incident_nodes(self)
+
+
+class ArrayEdge:
+    """ArrayMemory 的边句柄，用法与 igraph.Edge 相同：
+    edge.source, edge.target, edge['weight']。写入 weight 会经过
+    ArrayMemory.set_weight，保持最大权重缓存正确。"""
+
+    __slots__ = ("memory", "index")
+
+    def __init__(self, memory: "ArrayMemory", index: int):
+        self.memory = memory
+        self.index = index
+
+    @property
+    def source(self):
+        return int(self.memory.src[self.index])
+
+    @property
+    def target(self):
+        return int(self.memory.dst[self.index])
+
+    @property
+    def tuple(self):
+        return self.source, self.target
+
+    def __getitem__(self, attr: str):
+        if attr != "weight":
+            raise KeyError(attr)
+        return float(self.memory.weight[self.index])
+
+    def __setitem__(self, attr: str, value):
+        if attr != "weight":
+            raise KeyError(attr)
+        self.memory.set_weight(self, value)
+
+    def __eq__(self, other):
+        return (isinstance(other, ArrayEdge)
+                and other.memory is self.memory and other.index == self.index)
+
+    def __hash__(self):
+        return hash((id(self.memory), self.index))
+
+    def __repr__(self):
+        return (f"ArrayEdge({self.source}, {self.target}, "
+                f"weight={self['weight']})")
+
+
+# 邻接块不超过该长度时按列表查找边
+SCAN = 64
+
+
+def _ranges(counts: np.ndarray) -> np.ndarray:
+    """把每段 0..count-1 的下标依次连起来，如 [2, 3] -> [0, 1, 0, 1, 2]"""
+    return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                               counts)
+
+
+def _match(value, op: str, expected):
+    """与 igraph 的 select 关键字运算符保持一致"""
+    if op == "eq":
+        return value == expected
+    if op == "ne":
+        return value != expected
+    if op == "lt":
+        return value < expected
+    if op == "le":
+        return value <= expected
+    if op == "gt":
+        return value > expected
+    if op == "ge":
+        return value >= expected
+    if op == "in":
+        return value in expected
+    if op == "notin":
+        return value not in expected
+    raise ValueError(f"unsupported operator: {op}")
+
+
+class ArrayVertexSeq:
+    """ArrayMemory 的顶点序列，用法与 igraph.VertexSeq 相同：len、迭代、
+    按位置取顶点、vs['name'] 取属性列，select 在序列内继续过滤。"""
+
+    __slots__ = ("memory", "indices")
+
+    def __init__(self, memory: "ArrayMemory", indices):
+        self.memory = memory
+        self.indices = list(indices)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        return (ArrayVertex(self.memory, i) for i in self.indices)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            column = self.memory.attrs.get(key)
+            if column is None:
+                raise KeyError(key)
+            return [column[i] for i in self.indices]
+        if isinstance(key, slice):
+            return ArrayVertexSeq(self.memory, self.indices[key])
+        return ArrayVertex(self.memory, self.indices[key])
+
+    def __repr__(self):
+        return f"ArrayVertexSeq({self.indices})"
+
+    def select(self, *args, **kwargs):
+        """同 igraph.VertexSeq.select：位置参数为序列内的位置（或位置
+        列表）及判断函数，关键字参数为属性条件"""
+        indices = self.indices
+        for arg in args:
+            if callable(arg):
+                indices = [
+                    i for i in indices if arg(ArrayVertex(self.memory, i))
+                ]
+            elif isinstance(arg, (int, np.integer)):
+                indices = [indices[arg]]
+            else:
+                indices = [indices[p] for p in arg]
+        if kwargs:
+            key = tuple(kwargs.items())
+            indices = [i for i in indices if self.memory._matches(i, key)]
+        return ArrayVertexSeq(self.memory, indices)
+
+
+class ArrayMemory(MemoryMixin):
+    """基于 NumPy 数组的联想记忆，公共接口与 Memory 相同，可直接替换。
+
+    顶点为整数索引，属性按列保存；边以 COO 形式保存在可增长的 src/dst
+    整型数组中，权重保存在连续的 float64 数组中。邻接关系为动态 CSR：
+    每个顶点在 adj（邻接顶点）与 adj_eid（边索引）中占一段连续的块，
+    块满时整块搬到数组末尾并加倍，添加边均摊 O(1)；删除节点或边后由
+    COO 数组向量化重建。plot 时才构造 igraph 图。
+
+    属性：
+        - src, dst, weight: 边数组，前 num_edges 个有效
+        - offset, degree, room: 顶点 -> 邻接块的起点、边数与容量
+        - adj, adj_eid: 邻接块数组，前 used 个位置已分配
+        - best: 顶点 -> 过滤条件 -> 最大权重边的缓存"""
+
+    def __init__(self,
+                 capacity: int = None,
+                 policy=None,
+                 evict_only: dict = None,
+                 edge_capacity: int = 64,
+                 rng: np.random.Generator = None):
+        """capacity、policy、evict_only、rng 见 MemoryMixin，edge_capacity
+        为边数组的初始长度"""
+        super().__init__(capacity, policy, evict_only, rng)
+        self.attrs: dict[str, list] = {"name": [], "data": []}
+        self.src = np.zeros(edge_capacity, dtype=np.int64)
+        self.dst = np.zeros(edge_capacity, dtype=np.int64)
+        self.weight = np.zeros(edge_capacity, dtype=np.float64)
+        self.num_edges = 0
+        self.offset = np.zeros(0, dtype=np.int64)
+        self.degree = np.zeros(0, dtype=np.int64)
+        self.room = np.zeros(0, dtype=np.int64)
+        self.adj = np.zeros(2 * edge_capacity, dtype=np.int64)
+        self.adj_eid = np.zeros(2 * edge_capacity, dtype=np.int64)
+        self.used = 0
+        self.best: dict[int, dict[tuple, int | None]] = {}
+
+    @property
+    def num_nodes(self):
+        return len(self.attrs["name"])
+
+    def _vertex(self, vid: int):
+        return ArrayVertex(self, vid)
+
+    def _column(self, attr: str) -> list:
+        return self.attrs.get(attr, [None] * self.num_nodes)
+
+    def _node(self, node):
+        return node.index if isinstance(node, ArrayVertex) else int(node)
+
+    def set_attr(self, index: int, attr: str, value):
+        """设置顶点属性，新属性列对其他顶点补 None"""
+        if attr not in self.attrs:
+            self.attrs[attr] = [None] * self.num_nodes
+        self.index.set(index, attr, self.attrs[attr][index], value)
+        self.attrs[attr][index] = value
+        self.version += 1
+
+    def match_node(self, name: str, data=None, **kwargs):
+        """匹配节点，如果没有且给出 data 则添加，否则报 IndexError。"""
+        index = self.index.find(name)
+        if index is not None:
+            if self.capacity:
+                self.capacity.touch(index)
+                self.version += 1
+            return ArrayVertex(self, index)
+        if data is None:
+            raise IndexError(f"no such vertex: {name}")
+        index = self.num_nodes
+        for column in self.attrs.values():
+            column.append(None)
+        self.attrs["name"][index] = name
+        self.attrs["data"][index] = data
+        for attr, value in kwargs.items():
+            self.set_attr(index, attr, value)
+        self._add_vertices(1)
+        self.index.add(index, name)
+        self.sounds.add(name, data)
+        self.version += 1
+        if self.capacity:
+            self.capacity.touch(index)
+        return ArrayVertex(self, index)
+
+    def match_nodes(self, items):
+        """批量匹配节点，items 为 (name, data) 或 (name, data, kwargs)，
+        缺失的节点按列一次性追加。"""
+        return [ArrayVertex(self, i) for i in self._match_indices(items)]
+
+    def _match_indices(self, items) -> list[int]:
+        """同 match_nodes，返回顶点索引"""
+        items = [(item[0], item[1], item[2] if len(item) > 2 else {})
+                 for item in items]
+        start = self.num_nodes
+        indices, names, datas, attrs = resolve_nodes(self.index, items, start)
+        if names:
+            for column in self.attrs.values():
+                column.extend([None] * len(names))
+            self.attrs["name"][start:] = names
+            self.attrs["data"][start:] = datas
+            for attr in dict.fromkeys(k for kwargs in attrs for k in kwargs):
+                column = self.attrs.setdefault(attr, [None] * self.num_nodes)
+                column[start:] = [kwargs.get(attr) for kwargs in attrs]
+            self._add_vertices(len(names))
+            for offset, (name, kwargs) in enumerate(zip(names, attrs)):
+                self.index.add(start + offset, name, **kwargs)
+            self.sounds.add_many(names, datas)
+        self.version += 1
+        if self.capacity:
+            for i in indices:
+                self.capacity.touch(i)
+        return indices
+
+    def associate_many(self, pairs):
+        """批量建立联系，格式同 Memory.associate_many。权重按数组一次性
+        加倍，缺失的边一次性写入数组。"""
+        if not pairs:
+            return []
+        start = self.num_nodes
+        # 按节点对交错排列，节点的创建顺序与逐条 associate 一致
+        nodes = np.array(
+            self._match_indices([item for pair in pairs for item in pair]))
+        keys, counts, inverse = group_pairs(nodes[0::2], nodes[1::2])
+        # 新节点还没有边，只在两端都是旧节点时查找
+        eids = np.full(len(keys), -1, dtype=np.int64)
+        for i in np.flatnonzero(keys[:, 1] < start).tolist():
+            eid = self.get_eid(*keys[i].tolist())
+            if eid is not None:
+                eids[i] = eid
+        exist = eids >= 0
+        old = np.full(len(keys), np.nan)
+        old[exist] = self.weight[eids[exist]]
+        weights = doubled_weights(old, counts, self.rng)
+        self.weight[eids[exist]] = weights[exist]
+        if not exist.all():
+            eids[~exist] = self._add_edges(keys[~exist, 0], keys[~exist, 1],
+                                           weights[~exist])
+        for vid in np.unique(keys).tolist():
+            self.best.pop(vid, None)
+        self.version += 1
+        return [ArrayEdge(self, e) for e in eids[inverse].tolist()]
+
+    def delete_nodes(self, nodes):
+        """删除节点并压缩数组，剩余顶点与边重新编号。"""
+        removed = {self._node(n) for n in nodes}
+        num_nodes = self.num_nodes
+        keep = np.ones(num_nodes, dtype=bool)
+        keep[list(removed)] = False
+        names = self.attrs["name"]
+        self.sounds.remove([names[i] for i in removed])
+        remap = np.cumsum(keep) - 1
+        attrs = {
+            attr: [v for v, k in zip(column, keep) if k]
+            for attr, column in self.attrs.items()
+        }
+        n = self.num_edges
+        alive = keep[self.src[:n]] & keep[self.dst[:n]]
+        self.rebuild(attrs, remap[self.src[:n][alive]],
+                     remap[self.dst[:n][alive]], self.weight[:n][alive])
+        if self.capacity:
+            self.capacity.deleted(removed, num_nodes)
+
+    def edge_arrays(self):
+        """返回边的 (src, dst, weight) 数组"""
+        n = self.num_edges
+        return self.src[:n], self.dst[:n], self.weight[:n]
+
+    def decay_weights(self, rate: float, threshold: float = 0.):
+        """所有权重乘以 rate，并删除权重低于 threshold 的边。没有边被删除
+        时只缩放权重数组，各顶点的最大权重边不变；否则压缩边数组并重建
+        邻接块，顶点与属性索引不变。"""
+        n = self.num_edges
+        if not n:
+            return
+        weight = self.weight[:n] * rate
+        alive = weight >= threshold
+        if alive.all():
+            self.weight[:n] = weight
+        else:
+            self._build(self.src[:n][alive], self.dst[:n][alive],
+                        weight[alive])
+            self.best = {}
+        self.version += 1
+
+    def rebuild(self, attrs: dict[str, list], src, dst, weight):
+        """由按列的顶点属性与 COO 边数组重建记忆及全部索引"""
+        self.attrs = {attr: list(column) for attr, column in attrs.items()}
+        self._build(src, dst, weight)
+        self.best = {}
+        self.index.rebuild_from(self.attrs)
+        self.version += 1
+
+    def _build(self, src, dst, weight):
+        """由 COO 边数组重建边数组与邻接块，每个顶点的邻接边按边索引
+        排列，与逐条添加的顺序相同"""
+        src = np.array(src, dtype=np.int64)
+        dst = np.array(dst, dtype=np.int64)
+        weight = np.array(weight, dtype=np.float64)
+        m = len(weight)
+        size = max(len(self.weight), m, 1)
+        self.src, self.dst = np.zeros(size, np.int64), np.zeros(size, np.int64)
+        self.weight = np.zeros(size, np.float64)
+        self.src[:m], self.dst[:m], self.weight[:m] = src, dst, weight
+        self.num_edges = m
+        # 每条边在两端各有一条半边，自环只有一条
+        loop = src == dst
+        ends = np.concatenate([src, dst[~loop]])
+        nbrs = np.concatenate([dst, src[~loop]])
+        eids = np.concatenate([np.arange(m), np.flatnonzero(~loop)])
+        order = np.lexsort((eids, ends))
+        self.degree = np.bincount(ends, minlength=self.num_nodes)
+        self.room = self.degree.copy()
+        self.offset = np.cumsum(self.degree) - self.degree
+        self.adj, self.adj_eid = nbrs[order], eids[order]
+        self.used = len(order)
+
+    def _add_vertices(self, count: int):
+        """为新增的 count 个顶点分配空的邻接块"""
+        n = self.num_nodes
+        if n > len(self.degree):
+            size = max(2 * len(self.degree), n)
+            for attr in ("offset", "degree", "room"):
+                old = getattr(self, attr)
+                new = np.zeros(size, dtype=np.int64)
+                new[:len(old)] = old
+                setattr(self, attr, new)
+        self.degree[n - count:n] = 0
+        self.room[n - count:n] = 0
+
+    def _reserve_edges(self, size: int):
+        if size <= len(self.weight):
+            return
+        capacity = max(2 * len(self.weight), size)
+        for attr in ("src", "dst", "weight"):
+            old = getattr(self, attr)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+
+    def _reserve_slots(self, size: int):
+        if size <= len(self.adj):
+            return
+        capacity = max(2 * len(self.adj), size)
+        for attr in ("adj", "adj_eid"):
+            old = getattr(self, attr)
+            new = np.zeros(capacity, dtype=np.int64)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+
+    def _move(self, vids: np.ndarray, rooms: np.ndarray):
+        """把顶点的邻接块搬到数组末尾，容量改为 rooms"""
+        starts = self.used + np.cumsum(rooms) - rooms
+        self._reserve_slots(self.used + int(rooms.sum()))
+        degree = self.degree[vids]
+        rank = _ranges(degree)
+        old = np.repeat(self.offset[vids], degree) + rank
+        new = np.repeat(starts, degree) + rank
+        self.adj[new] = self.adj[old]
+        self.adj_eid[new] = self.adj_eid[old]
+        self.offset[vids] = starts
+        self.room[vids] = rooms
+        self.used += int(rooms.sum())
+
+    def _link(self, vid: int, other: int, eid: int):
+        """把一条半边写入顶点的邻接块"""
+        degree = int(self.degree[vid])
+        if degree == self.room[vid]:
+            self._move(np.array([vid]), np.array([max(2 * degree, 4)]))
+        pos = self.offset[vid] + degree
+        self.adj[pos] = other
+        self.adj_eid[pos] = eid
+        self.degree[vid] = degree + 1
+
+    def _add_edge(self, u: int, v: int, weight: float):
+        self._reserve_edges(self.num_edges + 1)
+        eid = self.num_edges
+        self.src[eid] = u
+        self.dst[eid] = v
+        self.weight[eid] = weight
+        self.num_edges += 1
+        self._link(u, v, eid)
+        if v != u:
+            self._link(v, u, eid)
+        return eid
+
+    def _add_edges(self, u: np.ndarray, v: np.ndarray, weight: np.ndarray):
+        """一次添加多条边，返回边索引数组"""
+        m = len(weight)
+        start = self.num_edges
+        self._reserve_edges(start + m)
+        eids = np.arange(start, start + m)
+        self.src[start:start + m] = u
+        self.dst[start:start + m] = v
+        self.weight[start:start + m] = weight
+        self.num_edges += m
+        loop = u == v
+        ends = np.concatenate([u, v[~loop]])
+        nbrs = np.concatenate([v, u[~loop]])
+        half = np.concatenate([eids, eids[~loop]])
+        order = np.lexsort((half, ends))
+        ends, nbrs, half = ends[order], nbrs[order], half[order]
+        vids, counts = np.unique(ends, return_counts=True)
+        need = self.degree[vids] + counts
+        full = need > self.room[vids]
+        if full.any():
+            self._move(vids[full], np.maximum(2 * need[full], 4))
+        pos = np.repeat(self.offset[vids] + self.degree[vids],
+                        counts) + _ranges(counts)
+        self.adj[pos] = nbrs
+        self.adj_eid[pos] = half
+        self.degree[vids] = need
+        return eids
+
+    def _block(self, vid: int):
+        """顶点的邻接块：(邻接顶点, 邻接边索引)"""
+        start = self.offset[vid]
+        stop = start + self.degree[vid]
+        return self.adj[start:stop], self.adj_eid[start:stop]
+
+    def get_eid(self, node1, node2):
+        """查找两节点之间的边，没有则返回 None。在度较小的一端的邻接块
+        中查找，块较短时转为列表查找比数组比较更快。"""
+        u, v = self._node(node1), self._node(node2)
+        degree_u, degree_v = int(self.degree[u]), int(self.degree[v])
+        if degree_v < degree_u:
+            u, v, degree_u = v, u, degree_v
+        start = int(self.offset[u])
+        nbrs = self.adj[start:start + degree_u]
+        if degree_u <= SCAN:
+            try:
+                return int(self.adj_eid[start + nbrs.tolist().index(v)])
+            except ValueError:
+                return None
+        hits = (nbrs == v).nonzero()[0]
+        return int(self.adj_eid[start + hits[0]]) if len(hits) else None
+
+    def match_edge(self, node1, node2):
+        """匹配边，如果不存在则添加对应边，返回边。"""
+        eid = self.get_eid(node1, node2)
+        if eid is None:
+            eid = self._add_edge(self._node(node1), self._node(node2),
+                                 rand(self.rng))
+            self._raise(eid, self.weight[eid])
+            self.version += 1
+        return ArrayEdge(self, eid)
+
+    def set_weight(self, edge, weight: float):
+        """写入边权重，同时更新最大权重缓存。"""
+        eid = edge.index if isinstance(edge, ArrayEdge) else int(edge)
+        old = self.weight[eid]
+        self.weight[eid] = weight
+        self.version += 1
+        if weight < old:
+            for vid in {int(self.src[eid]), int(self.dst[eid])}:
+                cache = self.best.get(vid)
+                if cache:
+                    for key in [k for k, v in cache.items() if v == eid]:
+                        del cache[key]
+        else:
+            self._raise(eid, weight)
+
+    def _raise(self, eid: int, weight: float):
+        """边权重上升（或新边）时更新两端的缓存"""
+        for vid in {int(self.src[eid]), int(self.dst[eid])}:
+            cache = self.best.get(vid)
+            if not cache:
+                continue
+            other = self._other(eid, vid)
+            for key, current in cache.items():
+                if current == eid:
+                    continue
+                if current is not None and weight <= self.weight[current]:
+                    continue
+                if self._matches(other, key):
+                    cache[key] = eid
+
+    def _other(self, eid: int, vid: int):
+        s = int(self.src[eid])
+        return int(self.dst[eid]) if s == vid else s
+
+    def _matches(self, vid: int, key) -> bool:
+        """顶点是否满足 select 风格的条件，key 为 (属性[_运算符], 值) 序列"""
+        passed = self.index.matches(vid, **dict(key))
+        if passed is not None:
+            return passed
+        for attr, expected in key:
+            name, _, op = attr.rpartition("_")
+            if not name or op not in ("eq", "ne", "lt", "le", "gt", "ge",
+                                      "in", "notin"):
+                name, op = attr, "eq"
+            column = self.attrs.get(name)
+            if column is None:
+                raise KeyError(name)
+            if not _match(column[vid], op, expected):
+                return False
+        return True
+
+    def are_adjacent(self, node1, node2):
+        """判断两个节点是否相邻"""
+        return self.get_eid(node1, node2) is not None
+
+    def select_nodes(self, **kwargs):
+        """选择节点，返回 ArrayVertexSeq，条件无效时返回 None"""
+        selected = self.index.select(**kwargs)
+        if selected is not None:
+            # 由属性倒排索引直接得到结果
+            return ArrayVertexSeq(self, selected)
+        try:
+            nodes = ArrayVertexSeq(self, range(self.num_nodes)).select(**kwargs)
+        except:
+            nodes = None
+        return nodes
+
+    def incident_nodes(self, node):
+        """获取节点的所有邻接节点，返回 ArrayVertexSeq"""
+        return ArrayVertexSeq(self, self._block(self._node(node))[0].tolist())
+
+    def incident_edges(self, node):
+        """获取节点的所有邻接边"""
+        return self._block(self._node(node))[1].tolist()
+
+    def _argmax(self, vid: int, key: tuple):
+        nbrs, eids = self._block(vid)
+        if key and len(eids):
+            mask = [self._matches(other, key) for other in nbrs.tolist()]
+            eids = eids[np.asarray(mask, dtype=bool)]
+        if not len(eids):
+            return None
+        return int(eids[np.argmax(self.weight[eids])])
+
+    def sort_weight_edges(self, node, num: int = 1, **kwargs):
+        """获取权重排序的前 num 条边，kwargs 过滤邻接节点"""
+        if num == 1:
+            edge = self.max_weight_edge(node, **kwargs)
+            return [edge] if edge else None
+        nbrs, eids = self._block(self._node(node))
+        key = tuple(kwargs.items())
+        eids = [
+            e for other, e in zip(nbrs.tolist(), eids.tolist())
+            if not key or self._matches(other, key)
+        ]
+        if not eids:
+            return None
+        top = heapq.nlargest(num, eids, key=lambda e: self.weight[e])
+        return [ArrayEdge(self, e) for e in top]
+
+    def max_weight_edge(self, node, **kwargs):
+        """获取节点邻接边的最大权重对应的边"""
+        vid = self._node(node)
+        cache = self.best.setdefault(vid, {})
+        key = tuple(sorted(kwargs.items()))
+        if key not in cache:
+            cache[key] = self._argmax(vid, key)
+        eid = cache[key]
+        return None if eid is None else ArrayEdge(self, eid)
+
+    def max_weight_node(self, node, **kwargs):
+        """获取节点邻接边的最大权重对应的节点"""
+        edge = self.max_weight_edge(node, **kwargs)
+        if not edge:
+            return None
+        return ArrayVertex(self, self._other(edge.index, self._node(node)))
+
+    def to_graph(self) -> ig.Graph:
+        """构造等价的 igraph 图"""
+        n = self.num_edges
+        graph = ig.Graph(n=self.num_nodes,
+                         edges=list(zip(self.src[:n].tolist(),
+                                        self.dst[:n].tolist())))
+        for attr, column in self.attrs.items():
+            graph.vs[attr] = column
+        graph.es["weight"] = self.weight[:n].tolist()
+        return graph
+
+    def plot(self, num: int = 5, names=None):
+        """绘制图形"""
+        view = Memory()
+        view.data = self.to_graph()
+        view.index.rebuild(view.data)
+        view.plot(num, names)
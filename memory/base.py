@@ -1,22 +1,29 @@
-import numpy as np
+import heapq
 import igraph as ig
 import matplotlib.pyplot as plt
+from memory.batch import rand
+from memory.graph import GraphMemory
 
 
-class BaseMemory:
-
-    def __init__(self):
-        self.data = ig.Graph()
+class BaseMemory(GraphMemory):
 
     def match_node(self, data, **kwargs):
         """匹配节点，如果没有则直接添加，name 即 data.__repr()。"""
-        if (not self.data.vs or
-                not self.data.vs.select(name_eq=data)) and not (data is None):
-            node = self.data.add_vertex(name=data.__repr__(),
-                                        data=data,
-                                        **kwargs)
-        else:
-            node = self.data.vs.find(name_eq=data.__repr__())
+        name = data.__repr__()
+        index = self.index.find(name)
+        if index is not None:
+            if self.capacity:
+                self.capacity.touch(index)
+                self.version += 1
+            return self.data.vs[index]
+        if data is None:
+            raise ValueError(f"no such vertex: {name}")
+        node = self.data.add_vertex(name=name, data=data, **kwargs)
+        self.version += 1
+        self.index.add(node.index, name, **kwargs)
+        self.sounds.add(name, data)
+        if self.capacity:
+            self.capacity.touch(node.index)
         return node
 
     def match_node_by_index(self, index):
@@ -35,11 +42,20 @@ class BaseMemory:
             edge = self.data.add_edge(
                 node1,
                 node2,
-                weight=np.random.rand() if weight is None else weight)
+                weight=rand(self.rng) if weight is None else weight)
+            self.argmax.edge_added(self.data, edge)
+            self.version += 1
         else:
             edge = self.data.es[self.data.get_eid(node1, node2)]
         return edge, flag
 
+    def set_weight(self, edge: ig.Edge, weight: float):
+        """写入边权重，同时更新最大权重缓存。"""
+        old = edge['weight']
+        edge['weight'] = weight
+        self.argmax.weight_set(self.data, edge, old, weight)
+        self.version += 1
+
     def are_adjacent(self, node1: ig.Vertex, node2: ig.Vertex):
         """判断两个节点是否相邻"""
         return self.data.are_adjacent(node1, node2)
@@ -50,19 +66,30 @@ class BaseMemory:
 
     def select_nodes(self, **kwargs):
         """选择节点，若不符合条件，返回 None。"""
+        selected = self.index.select(**kwargs)
+        if selected is not None:
+            # 由属性倒排索引直接得到结果
+            return self.data.vs.select(list(selected))
         try:
             nodes = self.data.vs.select(**kwargs)
         except:
             nodes = None
         return nodes
 
+    def _passes(self, index: int, **kwargs):
+        """节点是否满足条件，优先使用属性倒排索引"""
+        passed = self.index.matches(index, **kwargs)
+        if passed is None:
+            passed = bool(self.data.vs.select(index, **kwargs))
+        return passed
+
     def incident_nodes(self, node: ig.Vertex, **kwargs):
         """获取节点的所有邻接节点，非节点索引，可能为 None。"""
         if not kwargs:
             return node.neighbors(mode="all")
         nodes = node.neighbors(mode='all')
         if nodes is not None:
-            return [n for n in nodes if self.data.vs.select(n.index, **kwargs)]
+            return [n for n in nodes if self._passes(n.index, **kwargs)]
         return None
 
     def incident_edges(self, node: ig.Vertex, **kwargs):
@@ -72,44 +99,33 @@ class BaseMemory:
         # 过滤不符合条件的节点所对应的边
         edges = [
             e for e in node.incident(mode="all")
-            if (e.source == node.index
-                and self.data.vs.select(e.target, **kwargs)) or (
-                    e.target == node.index
-                    and self.data.vs.select(e.source, **kwargs))
+            if self._passes(e.target if e.source ==
+                            node.index else e.source, **kwargs)
         ]
         return edges
 
     def sort_weight_edges(self, node: ig.Vertex, n: int = 1, **kwargs):
         """获取权重排序的前 num 条边，非边索引，如果无边，返回 None。"""
-        edges = self.incident_edges(node)
+        if n == 1:
+            edge = self.max_weight_edge(node, **kwargs)
+            return [edge] if edge else None
+        edges = self.incident_edges(node, **kwargs)
         if not edges:
             return None
-        # 过滤不符合条件的节点所对应的边
-        if kwargs:
-            edges = [
-                e for e in edges
-                if (e.source == node.index
-                    and self.data.vs.select(e.target, **kwargs)) or (
-                        e.target == node.index
-                        and self.data.vs.select(e.source, **kwargs))
-            ]
-        sorted_edges = sorted(edges, key=lambda e: e['weight'], reverse=True)
-        result = sorted_edges[:n]
-        return result
+        return heapq.nlargest(n, edges, key=lambda e: e['weight'])
 
     def max_weight_edge(self, node: ig.Vertex, **kwargs):
         """获取节点邻接边的最大权重对应的边，无边返回 None。"""
-        max_edges = self.sort_weight_edges(node, 1, **kwargs)
-        if not max_edges:
+        eid = self.argmax.argmax(self.data, node.index, **kwargs)
+        if eid is None:
             return None
-        return max_edges[0]
+        return self.data.es[eid]
 
     def max_weight_node(self, node: ig.Vertex, **kwargs):
         """获取节点邻接边的最大权重对应的节点，无边返回 None。"""
-        max_edges = self.sort_weight_edges(node, 1, **kwargs)
-        if not max_edges:
+        edge = self.max_weight_edge(node, **kwargs)
+        if not edge:
             return None
-        edge = max_edges[0]
         if node.index == edge.target:
             return self.data.vs[edge.source]
         else:
@@ -177,4 +193,11 @@ class BaseMemory:
         self.data.save(path)
 
     def load(self, path: str):
-        self.data.Load(path)
+        """载入图形并重建索引与容量记录"""
+        self.data = ig.Graph.Load(path)
+        self.index.rebuild(self.data)
+        self.argmax.clear()
+        self._reindex_sounds()
+        if self.capacity:
+            self.capacity.reset(self.num_nodes)
+        self.version += 1
@@ -0,0 +1,100 @@
+import numpy as np
+import igraph as ig
+from memory.index import ArgmaxIndex, NodeIndex
+
+
+def group_pairs(u: np.ndarray, v: np.ndarray):
+    """把无向节点对去重，按首次出现的顺序返回。
+
+    返回 (keys, counts, inverse)：keys 为 (小, 大) 节点对，counts 为每对
+    出现的次数，keys[inverse] 还原出原始顺序。"""
+    pairs = np.stack([np.minimum(u, v), np.maximum(u, v)], axis=1)
+    keys, first, inverse, counts = np.unique(pairs,
+                                             axis=0,
+                                             return_index=True,
+                                             return_inverse=True,
+                                             return_counts=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return keys[order], counts[order], rank[inverse.reshape(-1)]
+
+
+def rand(rng: np.random.Generator = None, size: int = None):
+    """0-1 间的随机数，rng 为 None 时使用全局的 np.random"""
+    if rng is None:
+        return np.random.rand() if size is None else np.random.rand(size)
+    return rng.random(size)
+
+
+def doubled_weights(old: np.ndarray,
+                    counts: np.ndarray,
+                    rng: np.random.Generator = None):
+    """与逐条 associate 相同的权重：已连接的边每出现一次权重加倍；
+    新边（old 为 NaN）以 0-1 间的随机数建立，之后每次出现再加倍。"""
+    new = np.isnan(old)
+    weights = old * 2.0**counts
+    weights[new] = rand(rng, new.sum()) * 2.0**(counts[new] - 1)
+    return weights
+
+
+def resolve_nodes(index: NodeIndex, items, start: int):
+    """按名称解析 items (name, data, kwargs)，缺失的节点从 start 开始依次
+    编号。返回 (顶点索引列表, 新节点的 name 列表, data 列表, kwargs 列表)。"""
+    indices = []
+    new = {}  # name -> 新顶点索引
+    names, datas, attrs = [], [], []
+    for name, data, kwargs in items:
+        vid = index.find(name)
+        if vid is None:
+            vid = new.get(name)
+        if vid is None:
+            if data is None:
+                raise IndexError(f"no such vertex: {name}")
+            vid = new[name] = start + len(names)
+            names.append(name)
+            datas.append(data)
+            attrs.append(kwargs)
+        indices.append(vid)
+    return indices, names, datas, attrs
+
+
+def add_nodes(graph: ig.Graph, index: NodeIndex, items):
+    """批量匹配节点，items 为 (name, data, kwargs)，缺失的节点通过一次
+    add_vertices 添加，返回顶点索引列表。"""
+    start = graph.vcount()
+    indices, names, datas, attrs = resolve_nodes(index, items, start)
+    if names:
+        columns = {"name": names, "data": datas}
+        for attr in dict.fromkeys(k for kwargs in attrs for k in kwargs):
+            columns[attr] = [kwargs.get(attr) for kwargs in attrs]
+        graph.add_vertices(len(names), attributes=columns)
+        for offset, (name, kwargs) in enumerate(zip(names, attrs)):
+            index.add(start + offset, name, **kwargs)
+    return indices
+
+
+def add_edges(graph: ig.Graph,
+              argmax: ArgmaxIndex,
+              u: list[int],
+              v: list[int],
+              rng: np.random.Generator = None):
+    """批量建立联系，已有的边权重加倍，缺失的边通过一次 add_edges 添加，
+    返回与输入顺序对应的边索引。"""
+    keys, counts, inverse = group_pairs(np.asarray(u), np.asarray(v))
+    eids = np.asarray(graph.get_eids(keys.tolist(), error=False))
+    old = np.full(len(keys), np.nan)
+    exist = eids >= 0
+    if exist.any():
+        edges = graph.es.select(eids[exist].tolist())
+        old[exist] = edges["weight"]
+    weights = doubled_weights(old, counts, rng)
+    if exist.any():
+        edges["weight"] = weights[exist].tolist()
+    if not exist.all():
+        start = graph.ecount()
+        graph.add_edges(keys[~exist].tolist(),
+                        attributes={"weight": weights[~exist].tolist()})
+        eids[~exist] = np.arange(start, start + (~exist).sum())
+    argmax.invalidate(np.unique(keys).tolist())
+    return eids[inverse].tolist()
@@ -0,0 +1,130 @@
+import time
+import numpy as np
+import combination.sound as sd
+from memory.array_memory import ArrayMemory
+from memory.memory import Memory
+
+# 参与比较的记忆后端
+BACKENDS = {"Memory": Memory, "ArrayMemory": ArrayMemory}
+
+
+def _timed(run: callable, repeat: int) -> float:
+    """运行 repeat 次，返回最短的耗时（秒）"""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_qlearning(factory,
+                    num_states: int = 50,
+                    num_sounds: int = 500,
+                    steps: int = 20000,
+                    repeat: int = 3,
+                    seed: int = 0) -> float:
+    """按 Agent.update_qlearning 的读写顺序（匹配节点、匹配边、读权重、
+    取下一状态的最大权重边、写权重）执行 steps 步，返回每步的耗时（微秒）"""
+
+    def run():
+        rng = np.random.default_rng(seed)
+        memory = factory(rng=np.random.default_rng(seed))
+        states = rng.integers(num_states, size=(steps, 2)).tolist()
+        sounds = rng.integers(num_sounds, size=steps).tolist()
+        for (state, next_state), sound in zip(states, sounds):
+            node = memory.match_node(f"{state}", state, good=True)
+            sound_node = memory.match_node(f"s{sound}", sound, sound=True)
+            edge = memory.match_edge(node, sound_node)
+            old = edge["weight"]
+            next_node = memory.match_node(f"{next_state}", next_state,
+                                          good=True)
+            memory.match_edge(next_node, sound_node)
+            best = memory.max_weight_edge(next_node)
+            memory.set_weight(edge, 0.8 * old + 0.2 * (1 + 0.9 * best["weight"]))
+
+    return _timed(run, repeat) / steps * 1e6
+
+
+def bench_bulk(factory,
+               num_pairs: int = 20000,
+               num_nodes: int = 2000,
+               repeat: int = 3,
+               seed: int = 0) -> float:
+    """associate_many 一次写入 num_pairs 对联系，再衰减一次权重，返回
+    总耗时（毫秒）"""
+
+    def run():
+        rng = np.random.default_rng(seed)
+        memory = factory(rng=np.random.default_rng(seed))
+        pairs = rng.integers(num_nodes, size=(num_pairs, 2)).tolist()
+        memory.associate_many([((f"{a}", a), (f"{b}", b)) for a, b in pairs])
+        memory.decay_weights(0.5, 0.25)
+
+    return _timed(run, repeat) * 1e3
+
+
+def _random_sounds(n: int, rng: np.random.Generator) -> list[sd.Sound]:
+    """由随机音节构成的声音，强度与音调随机"""
+    phonemes = sd.phoneme_table.phonemes
+    syllables = sd.Syllable.random_syllables(n, seed=rng)
+    return [
+        sd.Sound.get([phonemes[i] for i in s.ids],
+                     float(rng.choice([0.5, 1., 1.5, 2., 3.])),
+                     sd.Tone(int(rng.integers(1, 5))))
+        for s in syllables if len(s.ids)
+    ]
+
+
+def bench_similar(num_sounds: int = 5000,
+                  queries: int = 200,
+                  repeat: int = 3,
+                  seed: int = 0) -> tuple[float, float, float]:
+    """match_similar 与全量比较的对比：返回 (索引每次查询的耗时, 全量比较
+    每次查询的耗时, 索引平均打分的声音比例)，耗时为微秒。相似度缓存在
+    每次运行前清空"""
+    rng = np.random.default_rng(seed)
+    sounds = _random_sounds(num_sounds, rng)
+    probes = _random_sounds(queries, rng)
+    memory = ArrayMemory()
+    memory.match_nodes([(f"{s.name}{i}", s, {
+        "sound": True
+    }) for i, s in enumerate(sounds)])
+    # 首次查询时登记全部声音，不计入查询耗时
+    memory.match_similar(probes[0], 1)
+    similarity = sd.sound_similarity
+    scored = []
+
+    def indexed():
+        similarity.clear()
+        scored.clear()
+        for probe in probes:
+            memory.match_similar(probe, 1)
+            scored.append(memory.sounds.scored)
+
+    def full():
+        similarity.clear()
+        features = similarity.features(sounds)
+        for probe in probes:
+            similarity.kernel(similarity.features([probe]), features).argmax()
+
+    return (_timed(indexed, repeat) / queries * 1e6,
+            _timed(full, repeat) / queries * 1e6,
+            float(np.mean(scored)) / len(sounds))
+
+
+def main():
+    print(f"{'backend':<12} {'update (us/step)':>17} {'bulk (ms)':>10}")
+    for name, factory in BACKENDS.items():
+        print(f"{name:<12} {bench_qlearning(factory):>17.2f} "
+              f"{bench_bulk(factory):>10.1f}")
+    print(f"\n{'sounds':>7} {'index (us)':>11} {'full (us)':>10} "
+          f"{'scored':>7}")
+    for num_sounds in [1000, 5000, 20000]:
+        indexed, full, scored = bench_similar(num_sounds)
+        print(f"{num_sounds:>7} {indexed:>11.1f} {full:>10.1f} "
+              f"{scored:>7.2%}")
+
+
+if __name__ == "__main__":
+    main()
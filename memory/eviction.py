@@ -0,0 +1,112 @@
+import numpy as np
+
+
+class LRUPolicy:
+    """淘汰最久未访问的节点"""
+
+    def maintain(self, memory):
+        pass
+
+    def select(self, memory, capacity: "Capacity", candidates: np.ndarray,
+               n: int):
+        last = capacity.last_access[candidates]
+        return candidates[np.argsort(last, kind="stable")[:n]]
+
+
+class WeightPolicy:
+    """淘汰邻接边最大权重最小的节点，无边的节点最先淘汰，
+    权重相同时淘汰较久未访问的节点"""
+
+    def maintain(self, memory):
+        pass
+
+    def select(self, memory, capacity: "Capacity", candidates: np.ndarray,
+               n: int):
+        src, dst, weight = memory.edge_arrays()
+        best = np.full(memory.num_nodes, -np.inf)
+        np.maximum.at(best, src, weight)
+        np.maximum.at(best, dst, weight)
+        order = np.lexsort((capacity.last_access[candidates],
+                            best[candidates]))
+        return candidates[order[:n]]
+
+
+class DecayPolicy(WeightPolicy):
+    """超出容量时维护：每 every 次把所有权重乘以 rate，并删除低于
+    threshold 的边；仍超出容量时按最大邻接权重淘汰节点。未超出容量时
+    权重不变，学习过程与检查容量的频率无关"""
+
+    def __init__(self, rate: float = 0.99, threshold: float = 0.01,
+                 every: int = 1):
+        self.rate = rate
+        self.threshold = threshold
+        self.every = every
+        self.count = 0
+
+    def maintain(self, memory):
+        self.count += 1
+        if self.count % self.every == 0:
+            memory.decay_weights(self.rate, self.threshold)
+
+
+class Capacity:
+    """记忆容量限制，记录每个节点最近一次被访问的时间，节点数超过 limit
+    时按淘汰策略选出要删除的节点。
+
+    属性：
+        - limit: 节点数上限
+        - policy: 淘汰策略，默认 LRUPolicy
+        - evict_only: 只淘汰满足条件的节点，如 {"sound": True}
+        - last_access: 节点 -> 最近访问时间"""
+
+    def __init__(self, limit: int, policy=None, evict_only: dict = None):
+        """初始化容量限制"""
+        self.limit = limit
+        self.policy = LRUPolicy() if policy is None else policy
+        self.evict_only = evict_only or {}
+        self.clock = 0
+        self.last_access = np.zeros(0, dtype=np.int64)
+
+    def _reserve(self, size: int):
+        if size > len(self.last_access):
+            grown = np.zeros(max(2 * len(self.last_access), size),
+                             dtype=np.int64)
+            grown[:len(self.last_access)] = self.last_access
+            self.last_access = grown
+
+    def touch(self, vid: int):
+        """记录节点被访问"""
+        self._reserve(vid + 1)
+        self.clock += 1
+        self.last_access[vid] = self.clock
+
+    def reset(self, num_nodes: int):
+        """记忆整体载入后调用，原有的访问时间不再对应顶点，全部节点视为
+        同时访问"""
+        self.last_access = np.full(num_nodes, self.clock, dtype=np.int64)
+
+    def deleted(self, removed, num_nodes: int):
+        """节点删除后按新的编号压缩访问时间"""
+        keep = np.ones(num_nodes, dtype=bool)
+        keep[list(removed)] = False
+        last = np.zeros(num_nodes, dtype=np.int64)
+        size = min(num_nodes, len(self.last_access))
+        last[:size] = self.last_access[:size]
+        self.last_access = last[keep]
+
+    def victims(self, memory):
+        """超出容量时执行策略的维护，返回需要淘汰的节点索引"""
+        excess = memory.num_nodes - self.limit
+        if excess <= 0:
+            return []
+        self.policy.maintain(memory)
+        self._reserve(memory.num_nodes)
+        if self.evict_only:
+            nodes = memory.select_nodes(**self.evict_only) or []
+            candidates = np.array([node.index for node in nodes],
+                                  dtype=np.int64)
+        else:
+            candidates = np.arange(memory.num_nodes)
+        if not len(candidates):
+            return []
+        return self.policy.select(memory, self, candidates, excess).tolist()
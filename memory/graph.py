@@ -0,0 +1,95 @@
+import numpy as np
+import igraph as ig
+from memory.batch import add_edges, add_nodes
+from memory.index import ArgmaxIndex
+from memory.mixin import MemoryMixin
+
+
+class GraphMemory(MemoryMixin):
+    """Memory 与 BaseMemory 共用的 igraph 实现。
+
+    属性：
+        - data: igraph 图，顶点属性 name、data 及选择用的标记
+        - argmax: 顶点 -> 最大权重边的缓存"""
+
+    def __init__(self,
+                 capacity: int = None,
+                 policy=None,
+                 evict_only: dict = None,
+                 rng: np.random.Generator = None):
+        """参数见 MemoryMixin"""
+        super().__init__(capacity, policy, evict_only, rng)
+        self.data = ig.Graph()
+        self.argmax = ArgmaxIndex(self.index)
+
+    @property
+    def num_nodes(self):
+        return self.data.vcount()
+
+    def _vertex(self, vid: int):
+        return self.data.vs[vid]
+
+    def _column(self, attr: str) -> list:
+        if attr not in self.data.vs.attributes():
+            return [None] * self.num_nodes
+        return self.data.vs[attr]
+
+    def match_nodes(self, items):
+        """批量匹配节点，items 为 (name, data) 或 (name, data, kwargs)，
+        缺失的节点一次性添加。"""
+        items = [(item[0], item[1], item[2] if len(item) > 2 else {})
+                 for item in items]
+        start = self.num_nodes
+        indices = add_nodes(self.data, self.index, items)
+        if self.num_nodes > start:
+            added = self.data.vs[start:]
+            self.sounds.add_many(added["name"], added["data"])
+        self.version += 1
+        if self.capacity:
+            for i in indices:
+                self.capacity.touch(i)
+        return [self.data.vs[i] for i in indices]
+
+    def associate_many(self, pairs):
+        """批量建立联系，pairs 为 (item1, item2)，item 格式同 match_nodes。
+        已连接的边每出现一次权重加倍，新边权重为 0-1 间的随机数，缺失的
+        节点与边一次性添加。"""
+        if not pairs:
+            return []
+        # 按节点对交错排列，节点的创建顺序与逐条 associate 一致
+        nodes = self.match_nodes([item for pair in pairs for item in pair])
+        u = [node.index for node in nodes[0::2]]
+        v = [node.index for node in nodes[1::2]]
+        eids = add_edges(self.data, self.argmax, u, v, self.rng)
+        self.version += 1
+        return [self.data.es[e] for e in eids]
+
+    def delete_nodes(self, nodes):
+        """删除节点，igraph 会重新编号，因此重建索引。"""
+        removed = {n.index if isinstance(n, ig.Vertex) else n for n in nodes}
+        num_nodes = self.num_nodes
+        self.sounds.remove(self.data.vs[list(removed)]["name"])
+        self.data.delete_vertices(removed)
+        self.index.rebuild(self.data)
+        self.argmax.clear()
+        self.version += 1
+        if self.capacity:
+            self.capacity.deleted(removed, num_nodes)
+
+    def edge_arrays(self):
+        """返回边的 (src, dst, weight) 数组"""
+        edges = np.array(self.data.get_edgelist(),
+                         dtype=np.int64).reshape(-1, 2)
+        weight = np.array(self.data.es["weight"] if edges.size else [],
+                          dtype=np.float64)
+        return edges[:, 0], edges[:, 1], weight
+
+    def decay_weights(self, rate: float, threshold: float = 0.):
+        """所有权重乘以 rate，并删除权重低于 threshold 的边"""
+        if not self.data.ecount():
+            return
+        weight = np.array(self.data.es["weight"]) * rate
+        self.data.es["weight"] = weight.tolist()
+        self.data.delete_edges(np.flatnonzero(weight < threshold).tolist())
+        self.argmax.clear()
+        self.version += 1
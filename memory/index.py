@@ -0,0 +1,186 @@
+import igraph as ig
+
+# 不建立倒排索引的顶点属性
+UNINDEXED = ("name", "data")
+# igraph select 关键字参数支持的运算符后缀
+OPERATORS = ("eq", "ne", "lt", "le", "gt", "ge", "in", "notin")
+
+
+class NodeIndex:
+    """节点索引，维护 name -> 顶点索引 的哈希表，以及每个属性的倒排索引
+    （属性值 -> 有序的顶点索引集合），使查找与按属性选择的代价只与
+    结果大小有关。
+
+    igraph 删除顶点后会重新编号，因此删除或重新载入图之后需要调用
+    rebuild 重建索引，重建时 version 加一。"""
+
+    def __init__(self):
+        self.version = 0  # 重建次数，依赖顶点编号的缓存据此失效
+        self.names: dict[str, int] = {}
+        # 属性 -> 属性值 -> 顶点索引（dict 作有序集合，顶点按添加顺序递增）
+        self.attrs: dict[str, dict] = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def find(self, name):
+        """查找名称对应的顶点索引，没有则返回 None。"""
+        return self.names.get(name)
+
+    def add(self, index: int, name: str, **attrs):
+        """登记新添加的顶点"""
+        self.names[name] = index
+        for attr, value in attrs.items():
+            self.set(index, attr, None, value)
+
+    def set(self, index: int, attr: str, old, value):
+        """顶点属性由 old 改为 value 时更新倒排索引"""
+        if attr in UNINDEXED:
+            return
+        table = self.attrs.setdefault(attr, {})
+        if old is not None:
+            table.get(old, {}).pop(index, None)
+        if value is None:
+            return
+        try:
+            table.setdefault(value, {})[index] = None
+        except TypeError:
+            # 属性值不可哈希，放弃该属性的索引，查询时回退到线性扫描
+            self.attrs[attr] = None
+
+    def select(self, **kwargs):
+        """返回满足全部等值条件的顶点索引（升序）。条件无法由索引回答时
+        （非等值运算符、未索引的属性、值为 None 或不可哈希）返回 None，
+        调用方应回退到 vs.select。"""
+        tables = []
+        for key, expected in kwargs.items():
+            attr = key[:-3] if key.endswith("_eq") else key
+            table = self.attrs.get(attr)
+            if table is None or expected is None:
+                return None
+            if attr.rpartition("_")[2] in OPERATORS:
+                return None
+            try:
+                tables.append(table.get(expected, {}))
+            except TypeError:
+                return None
+        if not tables:
+            return None
+        tables.sort(key=len)
+        if len(tables) == 1:
+            return tables[0]
+        return [i for i in tables[0] if all(i in t for t in tables[1:])]
+
+    def matches(self, index: int, **kwargs):
+        """顶点是否满足条件，无法由索引回答时返回 None。"""
+        selected = self.select(**kwargs)
+        return None if selected is None else index in selected
+
+    def rebuild(self, graph: ig.Graph):
+        """根据图重建索引"""
+        self.rebuild_from(
+            {attr: graph.vs[attr]
+             for attr in graph.vs.attributes()})
+
+    def rebuild_from(self, columns: dict[str, list]):
+        """根据按列保存的顶点属性重建索引"""
+        self.version += 1
+        self.names = {}
+        for index, name in enumerate(columns.get("name", [])):
+            # 与 vs.find 保持一致，重名时取最前面的顶点
+            self.names.setdefault(name, index)
+        self.attrs = {}
+        for attr, column in columns.items():
+            for index, value in enumerate(column):
+                self.set(index, attr, None, value)
+
+
+class ArgmaxIndex:
+    """缓存每个顶点邻接边中权重最大的边，按过滤条件（如 sound_eq=True）
+    分别缓存。
+
+    通过 memory 的接口添加边或写入权重时增量更新；若缓存的最大边权重
+    下降，则该项失效，下次查询时重新计算。直接写 edge['weight'] 会绕过
+    缓存。"""
+
+    def __init__(self, nodes: NodeIndex):
+        self.nodes = nodes  # 用于过滤条件的属性索引
+        self.best: dict[int, dict[tuple, int | None]] = {}
+
+    def clear(self):
+        self.best = {}
+
+    def invalidate(self, vids):
+        """使给定顶点的缓存失效"""
+        for vid in vids:
+            self.best.pop(vid, None)
+
+    def _passes(self, graph: ig.Graph, other: int, key: tuple):
+        """邻接顶点是否满足过滤条件"""
+        if not key:
+            return True
+        passed = self.nodes.matches(other, **dict(key))
+        if passed is None:
+            passed = bool(graph.vs.select(other, **dict(key)))
+        return passed
+
+    def _compute(self, graph: ig.Graph, vid: int, key: tuple):
+        """遍历邻接边求最大权重边，相同权重取邻接顺序靠前的边。"""
+        eids = graph.incident(vid)
+        if not eids:
+            return None
+        best, best_weight = None, None
+        for eid, weight in zip(eids, graph.es.select(eids)["weight"]):
+            if best_weight is not None and weight <= best_weight:
+                continue
+            if key:
+                edge = graph.es[eid]
+                other = edge.target if edge.source == vid else edge.source
+                if not self._passes(graph, other, key):
+                    continue
+            best, best_weight = eid, weight
+        return best
+
+    def argmax(self, graph: ig.Graph, vid: int, **kwargs):
+        """返回最大权重边的索引，无边返回 None。"""
+        cache = self.best.setdefault(vid, {})
+        key = tuple(sorted(kwargs.items()))
+        if key not in cache:
+            cache[key] = self._compute(graph, vid, key)
+        return cache[key]
+
+    def edge_added(self, graph: ig.Graph, edge: ig.Edge):
+        """新边加入时更新两端顶点的缓存"""
+        self._raise(graph, edge, edge["weight"])
+
+    def weight_set(self, graph: ig.Graph, edge: ig.Edge, old: float,
+                   new: float):
+        """边权重写入后更新两端顶点的缓存"""
+        if new < old:
+            # 权重下降，以该边为最大边的缓存失效
+            for vid in {edge.source, edge.target}:
+                cache = self.best.get(vid)
+                if not cache:
+                    continue
+                for key in [k for k, v in cache.items() if v == edge.index]:
+                    del cache[key]
+        else:
+            self._raise(graph, edge, new)
+
+    def _raise(self, graph: ig.Graph, edge: ig.Edge, weight: float):
+        for vid in {edge.source, edge.target}:
+            cache = self.best.get(vid)
+            if not cache:
+                continue
+            other = edge.target if edge.source == vid else edge.source
+            for key, current in cache.items():
+                if current == edge.index:
+                    continue
+                if current is not None and weight <= graph.es[current][
+                        "weight"]:
+                    continue
+                if self._passes(graph, other, key):
+                    cache[key] = edge.index
@@ -1,37 +1,58 @@
-import numpy as np
+import heapq
 import igraph as ig
 import matplotlib.pyplot as plt
+from memory.batch import rand
+from memory.graph import GraphMemory
 
 
-class Memory:
-
-    def __init__(self):
-        self.data = ig.Graph()
+class Memory(GraphMemory):
 
     def match_node(self, name: str, data=None, **kwargs):
-        """匹配节点"""
-        if (not self.data.vs or
-                not self.data.vs.select(name_eq=name)) and not (data is None):
-            node = self.data.add_vertex(name=name, data=data, **kwargs)
-        else:
-            node = self.data.vs.select(name_eq=name)[0]
+        """匹配节点，如果没有且给出 data 则添加，否则报 IndexError。"""
+        index = self.index.find(name)
+        if index is not None:
+            if self.capacity:
+                self.capacity.touch(index)
+                self.version += 1
+            return self.data.vs[index]
+        if data is None:
+            raise IndexError(f"no such vertex: {name}")
+        node = self.data.add_vertex(name=name, data=data, **kwargs)
+        self.version += 1
+        self.index.add(node.index, name, **kwargs)
+        self.sounds.add(name, data)
+        if self.capacity:
+            self.capacity.touch(node.index)
         return node
 
     def match_edge(self, node1: ig.Vertex, node2: ig.Vertex):
         """匹配边，如果不存在则添加对应边，返回边和之前是否存在。"""
         flag = self.data.are_connected(node1, node2)
         if not flag:
-            edge = self.data.add_edge(node1, node2, weight=np.random.rand())
+            edge = self.data.add_edge(node1, node2, weight=rand(self.rng))
+            self.argmax.edge_added(self.data, edge)
+            self.version += 1
         else:
             edge = self.data.es[self.data.get_eid(node1, node2)]
         return edge
 
+    def set_weight(self, edge: ig.Edge, weight: float):
+        """写入边权重，同时更新最大权重缓存。"""
+        old = edge['weight']
+        edge['weight'] = weight
+        self.argmax.weight_set(self.data, edge, old, weight)
+        self.version += 1
+
     def are_adjacent(self, node1: ig.Vertex, node2: ig.Vertex):
         """判断两个节点是否相邻"""
         return self.data.are_adjacent(node1, node2)
 
     def select_nodes(self, **kwargs):
         """选择节点"""
+        selected = self.index.select(**kwargs)
+        if selected is not None:
+            # 由属性倒排索引直接得到结果
+            return self.data.vs.select(list(selected))
         try:
             nodes = self.data.vs.select(**kwargs)
         except:
@@ -39,37 +60,41 @@ class Memory:
         return nodes
 
     def incident_nodes(self, node: ig.Vertex):
-        """获取节点的所有邻接节点"""
-        return node.neighbors()
+        """获取节点的所有邻接节点，返回 VertexSeq，可继续 select"""
+        return self.data.vs.select(self.data.neighbors(node))
 
     def incident_edges(self, node: ig.Vertex):
         """获取节点的所有邻接边"""
         return self.data.incident(node)
 
-    def sort_weight_edges(self, node: ig.Vertex, num: int = 1):
-        """获取权重排序的前 num 条边"""
-        edges = self.data.incident(node)
+    def sort_weight_edges(self, node: ig.Vertex, num: int = 1, **kwargs):
+        """获取权重排序的前 num 条边，kwargs 过滤邻接节点"""
+        if num == 1:
+            edge = self.max_weight_edge(node, **kwargs)
+            return [edge] if edge else None
+        edges = self.data.es.select(self.data.incident(node))
+        if kwargs:
+            edges = [
+                e for e in edges
+                if self.data.vs.select(e.target if e.source == node.index else
+                                       e.source, **kwargs)
+            ]
         if not edges:
             return None
-        sorted_edges = sorted(edges,
-                              key=lambda e: self.data.es[e]['weight'],
-                              reverse=True)
-        result = [self.data.es[e] for e in sorted_edges[:num]]
-        return result
+        return heapq.nlargest(num, edges, key=lambda e: e['weight'])
 
-    def max_weight_edge(self, node: ig.Vertex):
+    def max_weight_edge(self, node: ig.Vertex, **kwargs):
         """获取节点邻接边的最大权重对应的边"""
-        max_edges = self.sort_weight_edges(node, 1)
-        if not max_edges:
+        eid = self.argmax.argmax(self.data, node.index, **kwargs)
+        if eid is None:
             return None
-        return max_edges[0]
+        return self.data.es[eid]
 
-    def max_weight_node(self, node: ig.Vertex):
+    def max_weight_node(self, node: ig.Vertex, **kwargs):
         """获取节点邻接边的最大权重对应的节点"""
-        max_edges = self.sort_weight_edges(node, 1)
-        if not max_edges:
+        edge = self.max_weight_edge(node, **kwargs)
+        if not edge:
             return None
-        edge = max_edges[0]
         if node.index == edge.target:
             source = self.data.vs[edge.source]
             return source
@@ -0,0 +1,62 @@
+import numpy as np
+from memory.eviction import Capacity
+from memory.index import NodeIndex
+from memory.similar import SoundIndex
+
+
+class MemoryMixin:
+    """与存储方式无关的记忆状态与操作，Memory、BaseMemory 与 ArrayMemory
+    共用。子类提供 num_nodes、delete_nodes、_vertex 与 _column。
+
+    属性：
+        - index: 节点索引 (name -> 顶点索引，属性倒排索引)
+        - sounds: 声音近邻索引
+        - capacity: 容量限制，为 None 时不限
+        - rng: 新边初始权重的随机数生成器，为 None 时使用全局的 np.random
+        - version: 修改计数，检查点据此只重写变化的记忆"""
+
+    def __init__(self,
+                 capacity: int = None,
+                 policy=None,
+                 evict_only: dict = None,
+                 rng: np.random.Generator = None):
+        """capacity 为节点数上限，超出时由 enforce_capacity 按 policy
+        淘汰（默认 LRU），evict_only 限定可淘汰的节点，如 {"sound": True}"""
+        self.index = NodeIndex()
+        self.sounds = SoundIndex()
+        self.capacity = None if capacity is None else Capacity(
+            capacity, policy, evict_only)
+        self.rng = rng
+        self.version = 0
+
+    def match_similar(self, sound, k: int = 1):
+        """返回与 sound 最相似的 k 个声音节点及相似度 [(node, 相似度)]，
+        按相似度降序。候选由分桶的网格近邻索引给出，再由相似度核排序。"""
+        return [(self._vertex(self.index.find(name)), score)
+                for name, score in self.sounds.query(sound, k)]
+
+    def _reindex_sounds(self):
+        """整体替换顶点（载入、恢复快照）后重新登记全部声音顶点"""
+        self.sounds.clear()
+        self.sounds.add_many(self._column("name"), self._column("data"))
+
+    def enforce_capacity(self):
+        """节点数超过容量时按淘汰策略删除节点，返回删除的节点数。
+        删除会使顶点重新编号，应在不持有节点句柄时调用。"""
+        if self.capacity is None:
+            return 0
+        victims = self.capacity.victims(self)
+        if victims:
+            self.delete_nodes(victims)
+        return len(victims)
+
+    def save_snapshot(self, path: str):
+        """保存为二进制快照，见 memory.snapshot"""
+        from memory.snapshot import save_snapshot
+        save_snapshot(self, path)
+
+    def load_snapshot(self, path: str):
+        """从二进制快照载入并重建索引"""
+        from memory.snapshot import load_snapshot
+        load_snapshot(path).restore(self)
+        self.version += 1
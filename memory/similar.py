@@ -0,0 +1,209 @@
+import heapq
+import itertools
+import math
+import numpy as np
+import combination.sound as sd
+
+
+class SoundIndex:
+    """声音近邻索引。声音按 (音调, 音素下标) 分桶，桶内按 (持续时间, 强度,
+    清晰度) 放入网格，边长为相似度的尺度。同一桶内音素项与音调项相同，
+    查询时先按这两项的精确得分从高到低访问各桶，桶内由近及远逐层访问
+    格子，直到未访问的桶与格子不可能有更相似的声音，结果与全量比较相同。
+
+    索引以顶点名称登记，删除顶点后其余顶点重新编号不影响索引：新声音
+    先记入 pending，查询前一次性放入格子；删除时只移出被删的声音。
+
+    每次查询先对全部 B 个桶向量化地计算离散得分并排序，再只对少数桶内
+    的声音打分。最坏情况：与查询相似的声音都不存在时（各桶的离散得分
+    都很低，且连续特征都远离查询），需要访问全部非空桶并为每个声音打分，
+    代价与全量比较同阶。随机音节的词汇上，数千个声音时已快于全量比较，
+    见 memory.benchmark 的 bench_similar。
+
+    属性：
+        - similarity: 相似度核
+        - buckets: 桶 (音调, 音素下标) -> 格子坐标 -> 格内声音（名称 ->
+          标准化的连续特征）
+        - located: 名称 -> (桶, 格子坐标)
+        - pending: 尚未放入格子的声音（名称 -> 声音）
+        - keys, ids, tones: 各桶及其音素下标（-1 填充）与音调，按行对应
+        - empty: 已空的桶数，超过一半时压缩
+        - scored: 最近一次查询打分的声音数"""
+
+    def __init__(self, similarity: sd.SoundSimilarity = None):
+        """初始化索引"""
+        self.similarity = (sd.sound_similarity
+                           if similarity is None else similarity)
+        self.clear()
+
+    def __len__(self):
+        return len(self.located) + len(self.pending)
+
+    def clear(self):
+        self.buckets: dict[tuple, dict[tuple, dict[str, tuple]]] = {}
+        self.located: dict[str, tuple] = {}
+        self.pending: dict[str, sd.Sound] = {}
+        self.scored = 0
+        self.empty = 0
+        self.keys: list[tuple] = []
+        self.rows: dict[tuple, int] = {}
+        self.ids = np.full((0, self.similarity.width), -1, dtype=np.int64)
+        self.tones = np.zeros(0, dtype=np.int64)
+
+    def _continuous(self, sounds: list[sd.Sound]) -> np.ndarray:
+        """按尺度标准化的 (持续时间, 强度, 清晰度)"""
+        return (self.similarity.features(sounds)[:, -4:-1] /
+                self.similarity.scale)
+
+    def _cell(self, sound: sd.Sound):
+        return tuple(math.floor(f) for f in self._continuous([sound])[0])
+
+    def add(self, name: str, sound):
+        """登记顶点，数据不是声音时忽略"""
+        if isinstance(sound, sd.Sound) and name not in self.located:
+            self.pending[name] = sound
+
+    def add_many(self, names: list, datas: list):
+        for name, data in zip(names, datas):
+            self.add(name, data)
+
+    def remove(self, names):
+        """移出被删除的顶点"""
+        for name in names:
+            if self.pending.pop(name, None) is not None:
+                continue
+            where = self.located.pop(name, None)
+            if where is None:
+                continue
+            bucket, cell = where
+            cells = self.buckets[bucket]
+            del cells[cell][name]
+            if not cells[cell]:
+                del cells[cell]
+                self.empty += not cells
+        if self.empty > len(self.keys) // 2:
+            self._compact()
+
+    def _compact(self):
+        """去掉已空的桶"""
+        keys = [key for key in self.keys if self.buckets[key]]
+        rows = [self.rows[key] for key in keys]
+        self.buckets = {key: self.buckets[key] for key in keys}
+        self.keys = keys
+        self.rows = {key: row for row, key in enumerate(keys)}
+        self.ids = self.ids[rows]
+        self.tones = self.tones[rows]
+        self.empty = 0
+
+    def _flush(self):
+        """把 pending 中的声音放入格子，特征一次性计算"""
+        if not self.pending:
+            return
+        names, sounds = list(self.pending), list(self.pending.values())
+        self.pending = {}
+        continuous = self._continuous(sounds).tolist()
+        for name, sound, point in zip(names, sounds, continuous):
+            bucket = (sound.tone.value, tuple(int(i) for i in sound.ids))
+            if bucket not in self.buckets:
+                self._add_bucket(bucket)
+            elif not self.buckets[bucket]:
+                self.empty -= 1
+            cell = tuple(math.floor(f) for f in point)
+            self.buckets[bucket].setdefault(cell, {})[name] = tuple(point)
+            self.located[name] = (bucket, cell)
+
+    def _add_bucket(self, bucket: tuple):
+        tone, ids = bucket
+        if len(ids) > self.ids.shape[1]:
+            wider = np.full((len(self.ids), len(ids)), -1, dtype=np.int64)
+            wider[:, :self.ids.shape[1]] = self.ids
+            self.ids = wider
+        row = np.full((1, self.ids.shape[1]), -1, dtype=np.int64)
+        row[0, :len(ids)] = ids
+        self.ids = np.concatenate([self.ids, row])
+        self.tones = np.append(self.tones, tone)
+        self.rows[bucket] = len(self.keys)
+        self.keys.append(bucket)
+        self.buckets[bucket] = {}
+
+    def _discrete(self, sound: sd.Sound) -> np.ndarray:
+        """查询声音与各桶的音素项与音调项得分，与 SoundSimilarity.kernel
+        的计算相同"""
+        ids = np.asarray(sound.ids, dtype=np.int64)
+        width = max(self.ids.shape[1], len(ids))
+        query = np.full(width, -1, dtype=np.int64)
+        query[:len(ids)] = ids
+        bucket_ids = self.ids
+        if width > bucket_ids.shape[1]:
+            bucket_ids = np.full((len(self.ids), width), -1, dtype=np.int64)
+            bucket_ids[:, :self.ids.shape[1]] = self.ids
+        same = ((bucket_ids == query) & (query >= 0)).sum(axis=1)
+        length = np.maximum((bucket_ids >= 0).sum(axis=1), len(ids))
+        w_phonemes, _, w_tone = self.similarity.weights
+        return (w_phonemes * same / np.maximum(length, 1) +
+                w_tone * (self.tones == sound.tone.value))
+
+    @staticmethod
+    def _rings(cells: dict, center: tuple):
+        """由近及远逐层产生桶内的 (层数, 格内声音)；范围覆盖全部格子后
+        一次产生剩余的全部声音，层数为 None"""
+        for r in itertools.count():
+            if (2 * r + 1)**len(center) >= len(cells):
+                rest = {}
+                for key, cell in cells.items():
+                    if max(abs(a - b) for a, b in zip(key, center)) >= r:
+                        rest.update(cell)
+                yield None, rest
+                return
+            found = {}
+            for offset in itertools.product(range(-r, r + 1),
+                                            repeat=len(center)):
+                if max(map(abs, offset)) != r:
+                    continue
+                key = tuple(c + o for c, o in zip(center, offset))
+                found.update(cells.get(key, ()))
+            yield r, found
+
+    def query(self, sound: sd.Sound, k: int = 1) -> list[tuple[str, float]]:
+        """返回与 sound 最相似的 k 个顶点名称及相似度，按相似度降序。
+
+        桶的离散得分为 d 时，桶内距中心格子 r 层以外的声音至少有一维
+        标准化差超过 r，相似度不超过 d + w_continuous * exp(-r²)；第 k 好
+        的相似度不低于该上界时停止扫描该桶，不低于 d + w_continuous 时
+        其余的桶也不必访问"""
+        self._flush()
+        self.scored = 0
+        if not self.located or k <= 0:
+            return []
+        w_continuous = self.similarity.weights[1]
+        discrete = self._discrete(sound)
+        point = self._continuous([sound])[0].tolist()
+        center = tuple(math.floor(f) for f in point)
+        names, scores, top = [], [], []
+        for row in np.argsort(-discrete, kind="stable").tolist():
+            cells = self.buckets[self.keys[row]]
+            if not cells:
+                continue
+            bound = float(discrete[row])
+            if len(top) == k and top[0] >= bound + w_continuous:
+                break
+            for r, found in self._rings(cells, center):
+                # 同一桶内离散项相同，只需计算连续项
+                for name, other in found.items():
+                    distance = sum((a - b)**2 for a, b in zip(point, other))
+                    value = bound + w_continuous * math.exp(-distance)
+                    names.append(name)
+                    scores.append(value)
+                    if len(top) < k:
+                        heapq.heappush(top, value)
+                    elif value > top[0]:
+                        heapq.heapreplace(top, value)
+                self.scored += len(found)
+                if r is None:
+                    break
+                if len(top) == k and top[0] >= (
+                        bound + w_continuous * math.exp(-r * r)):
+                    break
+        scores = np.asarray(scores)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(names[i], float(scores[i])) for i in order]
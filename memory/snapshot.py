@@ -0,0 +1,235 @@
+import json
+import os
+import numpy as np
+import igraph as ig
+import combination.sound as sd
+from memory.array_memory import ArrayMemory
+
+VERSION = 2
+# 可以读取的版本，版本 1 的属性列只有 bool 与 int
+READABLE = (1, 2)
+NONE = np.iinfo(np.int64).min  # 属性为 None 时的占位值
+
+# 顶点 data 的类型编码
+KIND_NONE = 0
+KIND_SOUND = 1
+KIND_INT = 2
+KIND_STR = 3
+KIND_FLOAT = 4
+KIND_BOOL = 5
+
+
+def _columns(memory):
+    """取出记忆的顶点属性列、边与权重，支持 igraph 记忆与 ArrayMemory"""
+    if isinstance(memory, ArrayMemory):
+        n = memory.num_edges
+        edges = np.stack([memory.src[:n], memory.dst[:n]], axis=1)
+        return memory.attrs, edges, memory.weight[:n]
+    graph = memory.data
+    attrs = {attr: graph.vs[attr] for attr in graph.vs.attributes()}
+    edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    weights = np.array(graph.es["weight"] if graph.ecount() else [],
+                       dtype=np.float64)
+    return attrs, edges, weights
+
+
+def _encode_values(values: list, what: str = "vertex data"):
+    """把任意类型的值编码为定长数组：类型、整数、浮点、文本，以及声音的
+    音素下标、强度系数和音调。支持 None、bool、int、float、str 与
+    Sound，其他类型报 TypeError，what 为报错时值的说明"""
+    n = len(values)
+    width = max([len(d.phonemes) for d in values
+                 if isinstance(d, sd.Sound)] + [1])
+    kinds = np.zeros(n, dtype=np.int8)
+    ints = np.zeros(n, dtype=np.int64)
+    floats = np.zeros(n, dtype=np.float64)
+    texts = [""] * n
+    phonemes = np.full((n, width), -1, dtype=np.int16)
+    tones = np.zeros(n, dtype=np.int8)
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        if isinstance(value, sd.Sound):
+            kinds[i] = KIND_SOUND
+            phonemes[i, :len(value.ids)] = value.ids
+            floats[i] = value.factor
+            tones[i] = value.tone.value
+        elif isinstance(value, (bool, np.bool_)):
+            kinds[i] = KIND_BOOL
+            ints[i] = value
+        elif isinstance(value, (int, np.integer)):
+            kinds[i] = KIND_INT
+            ints[i] = value
+        elif isinstance(value, (float, np.floating)):
+            kinds[i] = KIND_FLOAT
+            floats[i] = value
+        elif isinstance(value, str):
+            kinds[i] = KIND_STR
+            texts[i] = value
+        else:
+            raise TypeError(f"unsupported {what}: {value!r}")
+    return {
+        "kinds": kinds,
+        "ints": ints,
+        "floats": floats,
+        "texts": np.array(texts, dtype=str),
+        "phonemes": phonemes,
+        "tones": tones,
+    }
+
+
+def _encode_attr(attr: str, column: list) -> tuple[dict, str]:
+    """编码一个顶点属性列，返回 (数组, 类型)。只有 None / bool / int 的列
+    编码为一个 int64 数组，类型为 bool 或 int；其他列按 _encode_values
+    编码，类型为 value"""
+    values = [v for v in column if v is not None]
+    if all(isinstance(v, (bool, int, np.integer)) for v in values):
+        kind = "bool" if all(isinstance(v, bool) for v in values) else "int"
+        return {
+            f"attr.{attr}":
+            np.array([NONE if v is None else int(v) for v in column],
+                     dtype=np.int64)
+        }, kind
+    arrays = _encode_values(column, f"value of vertex attribute {attr!r}")
+    return {f"attr.{attr}.{key}": array
+            for key, array in arrays.items()}, "value"
+
+
+def save_snapshot(memory, path: str):
+    """把记忆保存为二进制快照目录，每个数组一个 .npy 文件。无法编码的
+    顶点 data 或属性在写入任何文件之前报 TypeError"""
+    attrs, edges, weights = _columns(memory)
+    names = attrs.get("name", [])
+    arrays = _encode_values(attrs.get("data", [None] * len(names)))
+    arrays["names"] = np.array(names, dtype=str)
+    arrays["edges"] = edges.astype(np.int64)
+    arrays["weights"] = np.asarray(weights, dtype=np.float64)
+    meta_attrs = {}
+    for attr, column in attrs.items():
+        if attr in ("name", "data"):
+            continue
+        encoded, meta_attrs[attr] = _encode_attr(attr, column)
+        arrays.update(encoded)
+    os.makedirs(path, exist_ok=True)
+    for key, array in arrays.items():
+        np.save(os.path.join(path, f"{key}.npy"), array)
+    meta = {
+        "version": VERSION,
+        "num_nodes": len(names),
+        "num_edges": len(edges),
+        "phonemes": sd.phoneme_table.data["name"].tolist(),
+        "attrs": meta_attrs,
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+class Snapshot:
+    """磁盘上的记忆快照，数组通过 np.load(mmap_mode='r') 按需映射，
+    可以检查大量记忆而不必全部读入内存。
+
+    属性：
+        - path: 快照目录
+        - meta: 元数据（顶点数、边数、音素表、属性类型）"""
+
+    def __init__(self, path: str, mmap_mode: str | None = "r"):
+        """打开快照"""
+        self.path = path
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta["version"] not in READABLE:
+            raise ValueError(
+                f"unsupported snapshot version: {self.meta['version']}")
+        self._arrays = {}
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        """按名称读取数组，如 names、edges、weights、attr.sound"""
+        if key not in self._arrays:
+            self._arrays[key] = np.load(os.path.join(self.path, f"{key}.npy"),
+                                        mmap_mode=self.mmap_mode)
+        return self._arrays[key]
+
+    @property
+    def num_nodes(self):
+        return self.meta["num_nodes"]
+
+    @property
+    def num_edges(self):
+        return self.meta["num_edges"]
+
+    def _value(self, prefix: str, index: int):
+        """还原 _encode_values 编码的第 index 个值"""
+        kind = self[prefix + "kinds"][index]
+        if kind == KIND_SOUND:
+            phonemes = [
+                sd.phoneme_table.find(self.meta["phonemes"][i])
+                for i in self[prefix + "phonemes"][index] if i >= 0
+            ]
+            return sd.Sound.get(phonemes,
+                                float(self[prefix + "floats"][index]),
+                                sd.Tone(int(self[prefix + "tones"][index])))
+        if kind == KIND_BOOL:
+            return bool(self[prefix + "ints"][index])
+        if kind == KIND_INT:
+            return int(self[prefix + "ints"][index])
+        if kind == KIND_FLOAT:
+            return float(self[prefix + "floats"][index])
+        if kind == KIND_STR:
+            return str(self[prefix + "texts"][index])
+        return None
+
+    def data(self, index: int):
+        """还原单个顶点的 data"""
+        return self._value("", index)
+
+    def attr(self, attr: str) -> list:
+        """还原一个顶点属性列"""
+        kind = self.meta["attrs"][attr]
+        if kind == "value":
+            return [
+                self._value(f"attr.{attr}.", i)
+                for i in range(self.num_nodes)
+            ]
+        values = self[f"attr.{attr}"]
+        cast = bool if kind == "bool" else int
+        return [None if v == NONE else cast(v) for v in values.tolist()]
+
+    def columns(self) -> dict[str, list]:
+        """还原全部顶点属性列"""
+        columns = {
+            "name": self["names"].tolist(),
+            "data": [self.data(i) for i in range(self.num_nodes)],
+        }
+        for attr in self.meta["attrs"]:
+            columns[attr] = self.attr(attr)
+        return columns
+
+    def to_graph(self) -> ig.Graph:
+        """还原为 igraph 图"""
+        graph = ig.Graph(n=self.num_nodes, edges=self["edges"].tolist())
+        for attr, column in self.columns().items():
+            graph.vs[attr] = column
+        graph.es["weight"] = self["weights"].tolist()
+        return graph
+
+    def restore(self, memory):
+        """把快照内容载入记忆（Memory、BaseMemory 或 ArrayMemory），重建
+        索引与容量记录"""
+        if isinstance(memory, ArrayMemory):
+            edges = np.asarray(self["edges"])
+            memory.rebuild(self.columns(), edges[:, 0], edges[:, 1],
+                           self["weights"])
+        else:
+            memory.data = self.to_graph()
+            memory.index.rebuild(memory.data)
+            memory.argmax.clear()
+        memory._reindex_sounds()
+        if memory.capacity:
+            memory.capacity.reset(memory.num_nodes)
+        return memory
+
+
+def load_snapshot(path: str, mmap_mode: str | None = "r") -> Snapshot:
+    """打开快照，数组默认以只读内存映射方式读取"""
+    return Snapshot(path, mmap_mode)
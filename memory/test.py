@@ -1,5 +1,8 @@
 from base import *
+from memory.array_memory import ArrayMemory
+from memory.memory import Memory
 import matplotlib.pyplot as plt
+import numpy as np
 import pytest
 
 bm = BaseMemory()
@@ -31,6 +34,346 @@ def test_sort():
     assert edges[0]['weight'] == 2
 
 
+def test_match_node_index():
+    m = BaseMemory()
+    a = m.match_node("a")
+    b = m.match_node("b", num=True)
+    assert m.match_node("a") == a
+    assert m.match_node("b").index == b.index
+    m.delete_nodes([a])
+    assert m.match_node("b").index == 0
+    assert "'a'" not in m.index
+    c = m.match_node("c")
+    assert m.match_node("c") == c and len(m.data.vs) == 2
+
+
+def test_max_weight_cache():
+    m = BaseMemory()
+    center = m.match_node("c")
+    nodes = [m.match_node(i, num=(i % 2 == 0)) for i in range(6)]
+    edges = [m.match_edge(center, n)[0] for n in nodes]
+    assert m.max_weight_node(center, num_eq=True)["num"]
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        m.set_weight(edges[rng.integers(len(edges))], rng.random())
+        best = max(edges, key=lambda e: e["weight"])
+        assert m.max_weight_edge(center) == best
+        best_num = max(edges[::2], key=lambda e: e["weight"])
+        assert m.max_weight_edge(center, num_eq=True) == best_num
+    top = m.sort_weight_edges(center, n=3)
+    assert [e["weight"] for e in top] == sorted(
+        [e["weight"] for e in edges], reverse=True)[:3]
+
+
+def test_attribute_index():
+    m = Memory()
+    for i in range(10):
+        m.match_node(f"{i}", i, sound=(i % 3 == 0), good=i % 2)
+    assert m.select_nodes(good=True).indices == [1, 3, 5, 7, 9]
+    assert m.select_nodes(sound_eq=True, good=1).indices == [3, 9]
+    assert m.select_nodes(action=True) is None
+    m.delete_nodes([m.match_node("3")])
+    expected = m.data.vs.select(lambda v: v["sound"]).indices
+    assert m.select_nodes(sound=True).indices == expected
+    assert [n["name"] for n in m.select_nodes(data_gt=7)] == ["8", "9"]
+
+
+def test_array_memory_parity():
+    np.random.seed(1)
+    rng = np.random.default_rng(1)
+    memories = [Memory(), ArrayMemory(edge_capacity=1)]
+    for m in memories:
+        np.random.seed(1)
+        for i in range(8):
+            m.match_node(f"{i}", i, sound=(i % 2 == 0))
+        for i, j in [(0, 1), (0, 2), (0, 3), (2, 5), (3, 7), (0, 6)]:
+            m.match_edge(m.match_node(f"{i}"), m.match_node(f"{j}"))
+    for _ in range(20):
+        i, j = [(0, 1), (0, 2), (0, 3), (0, 6)][rng.integers(4)]
+        w = rng.random()
+        for m in memories:
+            m.set_weight(m.match_edge(m.match_node(f"{i}"),
+                                      m.match_node(f"{j}")), w)
+        for kwargs in [{}, {"sound_eq": True}]:
+            a, b = [m.max_weight_node(m.match_node("0"), **kwargs)
+                    for m in memories]
+            assert a["name"] == b["name"]
+    a, b = [[n["name"] for n in m.select_nodes(sound=True)] for m in memories]
+    assert a == b
+    for m in memories:
+        m.delete_nodes([m.match_node("2")])
+    a, b = [m.max_weight_node(m.match_node("0"))["name"] for m in memories]
+    assert a == b
+    graph = memories[1].to_graph()
+    assert graph.vcount() == 7 and graph.ecount() == 4
+
+
+def test_associate_many():
+    pairs = [("a", "x"), ("b", "x"), ("a", "x"), ("x", "a"), ("b", "y")]
+    np.random.seed(3)
+    sequential = BaseMemory()
+    sequential.match_edge(sequential.match_node("a"),
+                          sequential.match_node("x"))
+    for d1, d2 in pairs:
+        edge, connected = sequential.match_edge(sequential.match_node(d1),
+                                                sequential.match_node(d2))
+        if connected:
+            sequential.set_weight(edge, edge["weight"] * 2)
+    np.random.seed(3)
+    batched = BaseMemory()
+    batched.match_edge(batched.match_node("a"), batched.match_node("x"))
+    edges = batched.associate_many([((repr(d1), d1), (repr(d2), d2))
+                                    for d1, d2 in pairs])
+    assert [e["weight"] for e in edges] == [
+        sequential.data.es[sequential.data.get_eid(
+            sequential.match_node(d1), sequential.match_node(d2))]["weight"]
+        for d1, d2 in pairs
+    ]
+    assert batched.max_weight_node(batched.match_node("x"))["name"] == "'a'"
+    for m in [Memory(), ArrayMemory()]:
+        np.random.seed(3)
+        items = [((f"{d1}", d1, {}), (f"{d2}", d2, {"sound": True}))
+                 for d1, d2 in pairs]
+        edges = m.associate_many(items)
+        assert edges[0] == edges[2] == edges[3]
+        assert edges[0]["weight"] == np.random.RandomState(3).rand() * 4
+        assert [n["name"] for n in m.select_nodes(sound=True)] == ["x", "y"]
+
+
+@pytest.mark.parametrize("cls", [BaseMemory, Memory, ArrayMemory])
+def test_batch_items(cls):
+    """三种记忆的 match_nodes 与 associate_many 接受相同的 items"""
+    pairs = [("a", "x"), ("b", "x"), ("a", "x"), ("x", "a"), ("b", "y")]
+    np.random.seed(3)
+    m = cls()
+    nodes = m.match_nodes([("cry", "cry", {"action": True}), ("a", "a")])
+    assert [n["name"] for n in nodes] == ["cry", "a"]
+    assert [n["name"] for n in m.select_nodes(action=True)] == ["cry"]
+    edges = m.associate_many([((d1, d1), (d2, d2, {
+        "sound": True
+    })) for d1, d2 in pairs])
+    assert [m.match_nodes([(name, None)])[0]["name"]
+            for name in ["a", "b", "x", "y"]] == ["a", "b", "x", "y"]
+    assert edges[0]["weight"] == edges[2]["weight"] == edges[3]["weight"]
+    assert edges[0]["weight"] == np.random.RandomState(3).rand() * 4
+    assert [n["name"] for n in m.select_nodes(sound=True)] == ["x", "y"]
+    assert m.max_weight_node(m.match_nodes([("x", None)])[0])["name"] == "a"
+
+
+def test_array_memory_csr():
+    memories = [Memory(), ArrayMemory(edge_capacity=1)]
+    rng = np.random.default_rng(2)
+    pairs = [(i, j) for i, j in rng.integers(30, size=(300, 2)).tolist()
+             if i != j]
+    for m in memories:
+        np.random.seed(2)
+        m.match_nodes([(f"{i}", i, {"sound": i % 3 == 0}) for i in range(30)])
+        for i, j in pairs[:100]:
+            m.match_edge(m.match_node(f"{i}"), m.match_node(f"{j}"))
+        m.associate_many([((f"{i}", i), (f"{j}", j)) for i, j in pairs[100:]])
+    a, b = memories
+    for i in range(30):
+        # 邻接块搬移后，邻接边与 igraph 一致
+        assert sorted(a.incident_edges(a.match_node(f"{i}"))) == sorted(
+            b.incident_edges(b.match_node(f"{i}")))
+    assert np.array_equal(a.edge_arrays()[2], b.edge_arrays()[2])
+    for m in memories:
+        m.decay_weights(0.5, np.median(m.edge_arrays()[2]) / 2)
+    assert np.array_equal(a.edge_arrays()[2], b.edge_arrays()[2])
+    for i in range(30):
+        nodes = [m.incident_nodes(m.match_node(f"{i}")) for m in memories]
+        assert sorted(nodes[0]["name"]) == sorted(nodes[1]["name"])
+        assert sorted(n["name"] for n in nodes[0].select(sound=True)) == \
+            sorted(n["name"] for n in nodes[1].select(sound=True))
+        x, y = [m.max_weight_node(m.match_node(f"{i}")) for m in memories]
+        assert (x and x["name"]) == (y and y["name"])
+    assert b.select_nodes(data_lt=3)["name"] == ["0", "1", "2"]
+    assert b.select_nodes(sound=True).select(data_gt=20).indices == [21, 24, 27]
+
+
+def test_snapshot(tmp_path):
+    import combination.sound as sd
+    from memory.snapshot import load_snapshot
+    m = Memory()
+    sound = sd.Sound([sd.dict_consonants["b"], sd.dict_vowels["ü"]], 2.,
+                     sd.Tone.THIRD)
+    m.associate_many([(("0", 0, {"good": True}), (sound.name, sound, {
+        "sound": True
+    })), (("cry", "cry", {"action": True}), (sound.name, sound))])
+    m.save_snapshot(tmp_path / "m")
+    snapshot = load_snapshot(tmp_path / "m")
+    assert isinstance(snapshot["weights"], np.memmap)
+    assert snapshot["names"].tolist() == ["0", "bü", "cry"]
+    for restored in [Memory(), BaseMemory(), ArrayMemory()]:
+        restored.load_snapshot(tmp_path / "m")
+        node = restored.match_node("bü") if not isinstance(
+            restored, BaseMemory) else restored.data.vs[1]
+        data = node["data"]
+        assert (data.name, data.strength, data.tone) == (sound.name,
+                                                         sound.strength,
+                                                         sound.tone)
+        assert [n["name"] for n in restored.select_nodes(good=True)] == ["0"]
+        assert restored.max_weight_edge(node)["weight"] == max(
+            m.data.es["weight"])
+    empty = tmp_path / "empty"
+    ArrayMemory().save_snapshot(empty)
+    restored = ArrayMemory()
+    restored.load_snapshot(empty)
+    assert restored.num_nodes == 0
+
+
+def test_snapshot_values(tmp_path):
+    from memory.snapshot import load_snapshot
+    m = ArrayMemory(capacity=3)
+    m.match_nodes([("t", True, {"score": 0.5, "tag": "x"}),
+                   ("n", "n", {"score": None, "flag": False}),
+                   ("f", 2.5, {"tag": 3})])
+    m.save_snapshot(tmp_path / "m")
+    snapshot = load_snapshot(tmp_path / "m")
+    assert [snapshot.data(i) for i in range(3)] == [True, "n", 2.5]
+    assert type(snapshot.data(0)) is bool
+    assert snapshot.attr("score") == [0.5, None, None]
+    assert snapshot.attr("tag") == ["x", None, 3]
+    assert snapshot.attr("flag") == [None, False, None]
+    restored = ArrayMemory(capacity=2)
+    restored.capacity.touch(5)
+    restored.load_snapshot(tmp_path / "m")
+    # 容量记录按载入的顶点重建
+    assert len(restored.capacity.last_access) == 3
+    assert restored.enforce_capacity() == 1
+    bad = Memory()
+    bad.match_node("x", 1, tags=[1, 2])
+    with pytest.raises(TypeError, match="'tags'"):
+        bad.save_snapshot(tmp_path / "bad")
+    assert not (tmp_path / "bad").exists()
+
+
+def test_capacity():
+    from memory.eviction import DecayPolicy, WeightPolicy
+    for m in [Memory(capacity=5), ArrayMemory(capacity=5)]:
+        good = m.match_node("0", 0, good=True)
+        for i in range(20):
+            m.match_node("0")
+            sound = m.match_node(f"s{i}", i, sound=True)
+            m.match_edge(m.match_node("0"), sound)
+            m.enforce_capacity()
+            assert m.num_nodes <= 5
+        # 最近访问的节点被保留，索引与图保持一致
+        assert sorted(n["name"] for n in m.select_nodes(sound=True)) == [
+            "s16", "s17", "s18", "s19"
+        ]
+        good = m.match_node("0")
+        assert m.match_node("s19")["data"] == 19
+        assert len(m.incident_nodes(good)) == 4
+    m = Memory(capacity=3, policy=WeightPolicy(), evict_only={"sound": True})
+    good = m.match_node("0", 0, good=True)
+    for i, w in enumerate([5., 1., 3.]):
+        sound = m.match_node(f"s{i}", i, sound=True)
+        m.set_weight(m.match_edge(good, sound), w)
+    assert m.enforce_capacity() == 1
+    assert [n["name"] for n in m.select_nodes(sound=True)] == ["s0", "s2"]
+    for limit in [3, 2]:
+        m = BaseMemory(capacity=limit, policy=DecayPolicy(0.5, 1.))
+        n1, n2, n3 = m.match_node(1), m.match_node(2), m.match_node(3)
+        m.set_weight(m.match_edge(n1, n2)[0], 4.)
+        m.set_weight(m.match_edge(n1, n3)[0], 1.)
+        m.enforce_capacity()
+        # 未超出容量时不衰减；超出时先衰减并剪掉弱边，再淘汰无边的节点
+        assert m.data.es["weight"] == ([4., 1.] if limit == 3 else [2.])
+    assert m.data.vs["name"] == ["1", "2"]
+
+
+def test_capacity_reload(tmp_path):
+    m = BaseMemory(capacity=3)
+    for i in range(3):
+        m.match_node(i)
+    m.match_edge(m.match_node(0), m.match_node(1))
+    m.save(str(tmp_path / "m.graphml"))
+    m.load(str(tmp_path / "m.graphml"))
+    assert len(m.capacity.last_access) == m.num_nodes
+    # 载入后访问的节点比载入的节点新
+    m.match_node(0)
+    m.match_node(3)
+    m.enforce_capacity()
+    assert sorted(m.data.vs["name"]) == ["0", "2", "3"]
+
+
+def test_match_similar():
+    import combination.sound as sd
+    lexicon = sd.Syllable.random_syllables(200, seed=0)
+    sounds = [
+        sd.Sound.get([sd.phoneme_table.phonemes[i] for i in s.ids],
+                     tone=sd.Tone(t % 4 + 1))
+        for t, s in enumerate(lexicon) if len(s.ids)
+    ]
+    sounds = list({s.name: s for s in sounds}.values())
+    query = sd.Sound.get([sd.dict_consonants["b"], sd.dict_vowels["a"]],
+                         1.5)
+    for m in [Memory(), ArrayMemory(), BaseMemory()]:
+        assert m.match_similar(query, 3) == []
+        for sound in sounds:
+            if isinstance(m, BaseMemory):
+                m.match_node(sound, sound=True)
+            else:
+                m.match_node(sound.name, sound, sound=True)
+        expected = sd.sound_similarity.matrix([query], sounds)[0]
+        result = m.match_similar(query, 3)
+        assert [score for _, score in result] == pytest.approx(
+            np.sort(expected)[::-1][:3])
+        assert result[0][0]["data"] is sounds[int(np.argmax(expected))]
+        # 按离散得分跳过大部分桶
+        assert m.sounds.scored < len(sounds) // 2
+        # 删除顶点只移出对应的声音，其余声音不重新登记
+        best = result[0][0].index
+        m.delete_nodes([best])
+        assert not m.sounds.pending
+        assert len(m.sounds.located) == len(sounds) - 1
+        result = m.match_similar(query, 1)
+        assert result[0][1] == pytest.approx(np.sort(expected)[-2])
+        assert len(m.match_similar(query, 1000)) == len(sounds) - 1
+
+
+def test_match_similar_far_cell():
+    import combination.sound as sd
+    b, a = sd.dict_consonants["b"], sd.dict_vowels["a"]
+    p, o = sd.dict_consonants["p"], sd.dict_vowels["o"]
+    sounds = [sd.Sound.get([b, a], 3.0)] + [
+        sd.Sound.get([p, o], f) for f in np.linspace(0.25, 100, 399)
+    ]
+    query = sd.Sound.get([b, a], 1.0)
+    best, score = sd.sound_similarity.closest(query, sounds)
+    for m in [Memory(), ArrayMemory()]:
+        # 同名声音强度不同，按编号命名使每个声音成为一个顶点
+        m.match_nodes([(f"{s.name}{i}", s, {
+            "sound": True
+        }) for i, s in enumerate(sounds)])
+        assert m.num_nodes == 400
+        # 最相似的声音不在查询所在格子附近
+        assert m.sounds._cell(best) != m.sounds._cell(query)
+        result = m.match_similar(query, 1)
+        assert result[0][0]["data"] is best
+        assert result[0][1] == pytest.approx(score)
+
+
+def test_match_similar_reload(tmp_path):
+    import combination.sound as sd
+    b, a, o = sd.dict_consonants["b"], sd.dict_vowels["a"], sd.dict_vowels["o"]
+    sounds = [sd.Sound.get([b, a], 1.0), sd.Sound.get([b, o], 2.0)]
+    query = sd.Sound.get([b, a], 1.2)
+    for factory in [Memory, ArrayMemory]:
+        m = factory()
+        m.match_nodes([(s.name, s, {"sound": True}) for s in sounds])
+        m.match_node("x", 1)
+        m.save_snapshot(str(tmp_path / factory.__name__))
+        loaded = factory()
+        loaded.match_node("stale", sounds[1], sound=True)
+        loaded.load_snapshot(str(tmp_path / factory.__name__))
+        # 载入后按快照重新登记，原有的声音不再出现
+        assert len(loaded.sounds) == 2
+        result = loaded.match_similar(query, 3)
+        assert [node["name"] for node, _ in result] == ["ba", "bo"]
+
+
 def plot():
     bm = BaseMemory()
     n1 = bm.match_node(1)
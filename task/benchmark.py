@@ -0,0 +1,67 @@
+import contextlib
+import io
+import numpy as np
+from agent.population import Population
+from agent.replay import ReplayBuffer
+from task.task import train_population
+
+
+def comprehension(population: Population) -> float:
+    """贪心策略下的理解率：每个代理为每个状态说出权重最大的声音，其余
+    代理听到后按权重最大选回同一状态的比例，没有听过该声音的代理计为
+    不理解"""
+    q = np.where(np.isnan(population.q), -np.inf, population.q)
+    # 代理 × 状态 -> 说出的声音；代理 × 声音 -> 听到后选择的状态
+    speak = q.argmax(axis=2)
+    hear = q.argmax(axis=1)
+    known = ~np.isnan(population.q).all(axis=1)
+    states = np.arange(population.num_states)
+    # 听者 × 说者 × 状态
+    understood = (hear[:, speak] == states) & known[:, speak]
+    agents = np.arange(population.num_agents)
+    understood[agents, agents] = False
+    return float(understood.sum() / (population.num_agents - 1) /
+                 speak.size)
+
+
+def bench_replay(num_agents: int = 50,
+                 num_states: int = 10,
+                 episodes: tuple = (10, 20, 40),
+                 buffers: tuple = (None, 2, 10),
+                 seeds: range = range(6),
+                 max_steps: int = 20) -> dict:
+    """比较有无经验回放时 train_population 的收敛：buffers 为缓冲区
+    容量（代理数的倍数，None 为不回放），返回 (容量, 轮数) -> 各 seed
+    训练后的平均理解率"""
+    result = {}
+    for buffer in buffers:
+        for num_episodes in episodes:
+            scores = []
+            for seed in seeds:
+                population = Population(num_agents,
+                                        list(range(num_states)),
+                                        seed=seed)
+                replay = None if buffer is None else ReplayBuffer(
+                    buffer * num_agents, seed=seed)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    train_population(population,
+                                     num_episodes,
+                                     max_steps=max_steps,
+                                     replay=replay)
+                scores.append(comprehension(population))
+            result[buffer, num_episodes] = float(np.mean(scores))
+    return result
+
+
+def main():
+    episodes = (10, 20, 40)
+    result = bench_replay(episodes=episodes)
+    print(f"{'buffer':>8}" + "".join(f"{e:>8}" for e in episodes))
+    for buffer in dict.fromkeys(key[0] for key in result):
+        label = "none" if buffer is None else f"{buffer}x"
+        print(f"{label:>8}" +
+              "".join(f"{result[buffer, e]:>8.3f}" for e in episodes))
+
+
+if __name__ == "__main__":
+    main()
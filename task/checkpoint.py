@@ -0,0 +1,188 @@
+import io
+import os
+import pickle
+import random
+import threading
+import numpy as np
+import combination.sound as sd
+
+# 检查点目录中的主状态文件与记忆子目录
+STATE_FILE = "state.pkl"
+MEMORY_DIR = "memory"
+
+
+class _Pickler(pickle.Pickler):
+    """refs 中的对象（按 id）只保存引用键，由载入方提供"""
+
+    def __init__(self, file, refs: dict):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.refs = refs
+
+    def persistent_id(self, obj):
+        return self.refs.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    """引用键由 resolve(key) 还原为对象"""
+
+    def __init__(self, file, resolve: callable):
+        super().__init__(file)
+        self.resolve = resolve
+
+    def persistent_load(self, key):
+        return self.resolve(key)
+
+
+def _dumps(obj, refs: dict) -> bytes:
+    buffer = io.BytesIO()
+    _Pickler(buffer, refs).dump(obj)
+    return buffer.getvalue()
+
+
+def _loads(data: bytes, resolve: callable):
+    return _Unpickler(io.BytesIO(data), resolve).load()
+
+
+def _write(path: str, data: bytes):
+    """先写临时文件再替换，中断时不会留下半个文件"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Checkpointer:
+    """训练检查点：环境（代理、位置、记忆、随机数状态）与训练循环的
+    状态（episode、探索率、奖励与步数记录）。
+
+    save 在调用线程中序列化，写盘在后台线程中进行，训练不必等待磁盘。
+    每个代理的记忆单独保存为一个文件，只有 memory.version 变化的代理
+    才重新序列化和写入；主状态文件最后原子替换，中断时目录中总是一个
+    完整的检查点。
+
+    属性：
+        - path: 检查点目录
+        - interval: 每隔多少个 episode 保存一次
+        - written: 代理编号 -> (记忆对象 id, 记忆版本, 文件名)"""
+
+    def __init__(self, path: str, interval: int = 10):
+        """初始化检查点"""
+        self.path = path
+        self.interval = interval
+        self.written: dict[int, tuple] = {}
+        self._count = 0  # 已保存的检查点数，用于生成记忆文件名
+        self._thread = None
+        self._error = None
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, STATE_FILE))
+
+    def due(self, episode: int) -> bool:
+        """完成 episode 个 episode 后是否应保存"""
+        return episode % self.interval == 0
+
+    def save(self, environment, state: dict, wait: bool = False):
+        """保存检查点，state 为训练循环的状态。上一次的写盘未完成时先
+        等待其完成；wait 为 True 时等待本次写盘完成。"""
+        self.wait()
+        self._count += 1
+        similarity = {id(sd.sound_similarity): ("similarity", )}
+        memories = {}
+        files = {}
+        for agent in environment.agents:
+            memory = agent.memory
+            previous = self.written.get(agent.id)
+            key = (id(memory), getattr(memory, "version", None))
+            if previous is not None and previous[:2] == key \
+                    and key[1] is not None:
+                files[agent.id] = previous[2]
+                continue
+            name = f"{agent.id}.{self._count}.pkl"
+            refs = dict(similarity)
+            if getattr(agent, "rng", None) is not None:
+                refs[id(agent.rng)] = ("rng", )
+            memories[name] = _dumps(memory, refs)
+            files[agent.id] = name
+            self.written[agent.id] = key + (name, )
+        refs = dict(similarity)
+        refs[id(environment)] = ("environment", )
+        for agent in environment.agents:
+            refs[id(agent.memory)] = ("memory", agent.id)
+        data = _dumps(
+            {
+                "environment": environment.__dict__,
+                "random": random.getstate(),
+                "np_random": np.random.get_state(),
+                "state": state,
+                "memories": files,
+            }, refs)
+        self._thread = threading.Thread(target=self._flush,
+                                        args=(memories, data, set(
+                                            files.values())),
+                                        daemon=True)
+        self._thread.start()
+        if wait:
+            self.wait()
+
+    def _flush(self, memories: dict, data: bytes, keep: set):
+        """后台线程：写入变化的记忆，替换主状态文件，删除不再引用的记忆"""
+        try:
+            directory = os.path.join(self.path, MEMORY_DIR)
+            os.makedirs(directory, exist_ok=True)
+            for name, memory in memories.items():
+                _write(os.path.join(directory, name), memory)
+            _write(os.path.join(self.path, STATE_FILE), data)
+            for name in os.listdir(directory):
+                if name not in keep:
+                    os.remove(os.path.join(directory, name))
+        except Exception as e:
+            self._error = e
+
+    def wait(self):
+        """等待后台写盘完成，写盘出错时在这里抛出"""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def restore(self, environment) -> dict | None:
+        """把最近的检查点载入 environment，恢复 random 与 np.random 的
+        状态，返回训练循环的状态；没有检查点时返回 None"""
+        self.wait()
+        if not self.exists():
+            return None
+        with open(os.path.join(self.path, STATE_FILE), "rb") as f:
+            data = f.read()
+
+        def resolve(key):
+            if key[0] == "environment":
+                return environment
+            if key[0] == "similarity":
+                return sd.sound_similarity
+            # 记忆在主状态载入后逐个读入
+            return None
+
+        saved = _loads(data, resolve)
+        environment.__dict__.update(saved["environment"])
+        directory = os.path.join(self.path, MEMORY_DIR)
+        self.written = {}
+        for agent in environment.agents:
+            agent.env = environment
+            name = saved["memories"][agent.id]
+            with open(os.path.join(directory, name), "rb") as f:
+                agent.memory = _loads(
+                    f.read(), lambda key, agent=agent: agent.rng
+                    if key[0] == "rng" else sd.sound_similarity)
+            self.written[agent.id] = (id(agent.memory),
+                                      getattr(agent.memory, "version",
+                                              None), name)
+        self._count = max(
+            (int(name.split(".")[1]) for name in saved["memories"].values()),
+            default=0)
+        random.setstate(saved["random"])
+        np.random.set_state(saved["np_random"])
+        return saved["state"]
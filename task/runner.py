@@ -0,0 +1,126 @@
+import contextlib
+import csv
+import io
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+# 一组实验配置的字段，结果表中每行为 配置 + (episode, reward, steps)
+CONFIG_FIELDS = ("mode", "seed", "num_agents", "alpha", "gamma", "epsilon",
+                 "beta", "episodes")
+RESULT_FIELDS = CONFIG_FIELDS + ("episode", "reward", "steps")
+# 可选的训练方式
+MODES = ("action", "good", "population")
+
+
+def grid(seeds,
+         num_agents,
+         alpha=(0.2, ),
+         gamma=(0.9, ),
+         epsilon=(0.1, ),
+         beta=(0.95, ),
+         episodes: int = 100,
+         mode: str = "action") -> list[dict]:
+    """生成参数网格上的全部配置"""
+    if mode not in MODES:
+        raise ValueError(f"unknown mode: {mode!r}")
+    return [
+        dict(zip(CONFIG_FIELDS, values)) for values in itertools.product(
+            [mode], seeds, num_agents, alpha, gamma, epsilon, beta,
+            [episodes])
+    ]
+
+
+def config_key(config: dict) -> tuple:
+    """配置在结果表中的键，与 CSV 读回的字符串一致"""
+    return tuple(str(config[field]) for field in CONFIG_FIELDS)
+
+
+def run_replica(config: dict) -> list[dict]:
+    """运行一个独立的环境副本，返回每个 episode 一行结果。
+    random 与 np.random 都以配置的 seed 重新播种，结果只由配置决定。"""
+    from agent._agent import Agent
+    from agent.population import Population
+    from env.environment import Environment
+    from task.task import train_action, train_population
+
+    seed = int(config["seed"])
+    random.seed(seed)
+    np.random.seed(seed)
+    params = {p: float(config[p]) for p in ("alpha", "gamma", "beta")}
+    episodes = int(config["episodes"])
+    epsilon = float(config["epsilon"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        if config["mode"] == "population":
+            population = Population(int(config["num_agents"]),
+                                    ["cry", "laugh"],
+                                    seed=seed)
+            vars(population).update(params)
+            rewards, steps = train_population(population,
+                                              episodes,
+                                              epsilon=epsilon)
+        else:
+            environment = Environment()
+            for i in range(int(config["num_agents"])):
+                agent = Agent(environment, i, f"H-{i}")
+                vars(agent).update(params)
+                environment.add_agent(agent)
+            if config["mode"] == "action":
+                rewards, steps = train_action(environment, episodes, epsilon)
+            else:
+                rewards, steps = environment.train(episodes, epsilon)
+    return [
+        dict(config, episode=ep, reward=float(reward), steps=int(step))
+        for ep, (reward, step) in enumerate(zip(rewards, steps))
+    ]
+
+
+def completed(path: str) -> set[tuple]:
+    """读取结果表，返回已经完整运行的配置键"""
+    if not os.path.exists(path):
+        return set()
+    counts = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            key = config_key(row)
+            counts[key] = counts.get(key, 0) + 1
+    return {key for key, n in counts.items() if n >= int(key[-1])}
+
+
+def run_sweep(configs: list[dict],
+              path: str,
+              max_workers: int = None) -> int:
+    """在进程池中运行全部配置，结果逐个配置追加写入 CSV 表 path。
+    表中已完整的配置会被跳过，中断后重新运行即可继续。返回本次运行的
+    配置数。"""
+    done = completed(path)
+    todo = []
+    for config in configs:
+        key = config_key(config)
+        if key not in done:
+            done.add(key)
+            todo.append(config)
+    if not todo:
+        return 0
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if new_file:
+            writer.writeheader()
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(run_replica, config) for config in todo]
+            for future in as_completed(futures):
+                writer.writerows(future.result())
+                f.flush()
+    return len(todo)
+
+
+if __name__ == "__main__":
+    configs = grid(seeds=range(4), num_agents=[10, 30], epsilon=[0.1, 0.2])
+    result_dir = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.realpath(__file__))), "result")
+    os.makedirs(result_dir, exist_ok=True)
+    n = run_sweep(configs, os.path.join(result_dir, "sweep.csv"))
+    print(f"ran {n} configurations")
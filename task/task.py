@@ -3,61 +3,78 @@ import combination.sound as sd
 import numpy as np
 import env.environment as env
 import random
+from agent.population import Population
+from agent.replay import ReplayBuffer
+from env.executor import SerialExecutor, choice
 
 
-def train_action(environment, episodes: int):
+def train_action(environment,
+                 episodes: int,
+                 epsilon: float = 0.1,
+                 checkpoint=None,
+                 executor=None,
+                 seed=None):
+    """代理轮流为动作发声，其余代理听到后做出动作，全部一致则本轮结束。
+    epsilon 为初始探索率，随训练线性衰减到 0.01。
+
+    代理的选择与更新由 executor（env.executor 中的执行器，默认为
+    environment.agents 上的 SerialExecutor）完成，协调循环只交换声音与
+    各情绪的票数。发送者与动作由 seed 给出的随机数生成器抽取，seed 为
+    None 时使用全局的 random；代理使用各自的随机数流（见 spawn_agents）
+    时，结果与执行器和分片数无关。
+
+    给定 checkpoint (task.checkpoint.Checkpointer) 时先从最近的检查点
+    恢复环境与训练状态，之后每 checkpoint.interval 个 episode 以及结束时
+    保存一次，恢复后的结果与不中断的运行完全相同。检查点只保存
+    environment 中的代理，因此不能与 executor 同时给出。"""
+    if checkpoint is not None and executor is not None:
+        raise ValueError("checkpoint requires the default executor")
     rewards = []
     steps = []
-    epsilon = 0.1
-    # 首先是将状态更新到记忆
-    for agent in environment.agents:
-        add_action_memory(agent)
+    initial_epsilon = epsilon
+    start = 0
+    rng = None if seed is None else np.random.default_rng(seed)
+    state = None if checkpoint is None else checkpoint.restore(environment)
+    if executor is None:
+        executor = SerialExecutor(environment.agents)
+    if state is not None:
+        start = state["episode"]
+        epsilon = state["epsilon"]
+        initial_epsilon = state["initial_epsilon"]
+        rewards = state["rewards"]
+        steps = state["steps"]
+        if rng is not None:
+            rng.bit_generator.state = state["rng"]
+    else:
+        # 首先是将状态更新到记忆
+        executor.add_action_memory()
+    agent_ids = executor.agent_ids
 
-    for ep in range(episodes):
+    for ep in range(start, episodes):
         # 随机选择一个代理
-        agent = random.choice(environment.agents)
-        action = random.choice(agent.actions)
+        agent = choice(rng, agent_ids)
+        action = choice(rng, executor.actions)
 
         total_average_reward = 0
         step = 0
-        done = False
         # 设置探索率
-        for a in environment.agents:
-            a.epsilon = epsilon
+        executor.set_epsilon(epsilon)
         while True:
-            sound = agent.choose_sound(action, action, action=True)
-            done = False
-            # 检查
-            filtered_agents = [a for a in environment.agents if a is not agent]
-
-            agent.reward = 5
-            average_reward = 0
-            for a in filtered_agents:
-                a.choose_action(sound)
-                if a.mood == agent.mood:
-                    a.reward = 5
-                    agent.reward += 1
-                else:
-                    done = True
-                    a.reward = -5
-                    agent.reward -= 1
-                average_reward += a.reward
-
-            average_reward /= len(filtered_agents)
-            total_average_reward += average_reward
-
-            for a in environment.agents:
-                next_action = random.choice(a.actions)
-                a.update_qlearning(action,
-                                   sound,
-                                   next_action,
-                                   agent.reward,
-                                   action=True)
-            # # 重置 mood
-            for a in environment.agents:
-                a.mood = 0
-            agent = random.choice(filtered_agents)
-            action = agent.choose_action()
+            sound = executor.choose_sound(agent, action, action, action=True)
+            # 检查：接收者的情绪与发送者相同即为一致
+            mood = executor.mood(agent)
+            counts = executor.choose_actions(sound, agent)
+            receivers = len(agent_ids) - 1
+            agreed = counts.get(mood, 0)
+            done = agreed < receivers
+            reward = 5 + agreed - (receivers - agreed)
+            total_average_reward += (10 * agreed - 5 * receivers) / receivers
+
+            # 更新后重置全部代理的情绪
+            executor.update_actions(action, sound, reward)
+            filtered_agents = [a for a in agent_ids if a != agent]
+            agent = choice(rng, filtered_agents)
+            action = executor.choose_action(agent)
             step += 1
 
             if not done:
@@ -66,7 +83,85 @@ def train_action(environment, episodes: int):
         rewards.append(total_average_reward)
         steps.append(step)
         # 动态调整探索率
-        epsilon = max(0.01, 0.1 - ep / 500)
+        epsilon = max(0.01, initial_epsilon - ep / 500)
+
+        if ep % 50 == 0:
+            print(
+                f"Episode {ep}: Steps={step}, Reward={total_average_reward:.1f}"
+            )
+        if checkpoint is not None and (checkpoint.due(ep + 1)
+                                       or ep + 1 == episodes):
+            checkpoint.save(
+                environment, {
+                    "episode": ep + 1,
+                    "epsilon": epsilon,
+                    "initial_epsilon": initial_epsilon,
+                    "rewards": list(rewards),
+                    "steps": list(steps),
+                    "rng": None if rng is None else rng.bit_generator.state,
+                })
+    if checkpoint is not None:
+        checkpoint.wait()
+    return rewards, steps
+
+
+def train_population(population: Population,
+                     episodes: int,
+                     max_steps: int = None,
+                     replay: ReplayBuffer = None,
+                     replay_batch: int = None,
+                     epsilon: float = 0.1):
+    """train_action 的群体张量版本：状态为动作，接收者选中与发送者相同的
+    动作即为一致，每一步的 Q-learning 更新对全部代理一次完成。
+    代理很多时全体一致的概率很低，可用 max_steps 限制每轮步数。
+    给定 replay 时每一步的经验写入缓冲区，并回放 replay_batch 条经验
+    （默认为代理数的两倍）。按 task.benchmark 的 bench_replay 测量
+    （50 个代理、10 个状态），回放并没有减少达到一致所需的轮数：容量为
+    代理数两倍时与不回放相当，缓冲区较大时保存的旧经验反而拖慢一致。
+    epsilon 为初始探索率。"""
+    rewards = []
+    steps = []
+    initial_epsilon = epsilon
+    rng = population.rng
+    agents = np.arange(population.num_agents)
+    replay_batch = replay_batch or 2 * population.num_agents
+
+    for ep in range(episodes):
+        # 随机选择一个代理
+        agent = int(rng.integers(population.num_agents))
+        action = int(rng.integers(population.num_states))
+
+        total_average_reward = 0
+        step = 0
+        # 设置探索率
+        population.epsilon = epsilon
+        while True:
+            sound = population.choose_sound(agent, action)
+            filtered_agents = agents[agents != agent]
+            choices = population.choose_states(sound, filtered_agents)
+            agreed = choices == action
+            done = not agreed.all()
+            reward = 5 + agreed.sum() - (~agreed).sum()
+            total_average_reward += np.where(agreed, 5, -5).mean()
+
+            next_actions = rng.integers(population.num_states,
+                                        size=population.num_agents)
+            population.update(action, sound, next_actions, reward)
+            if replay is not None:
+                replay.add(agents, action, sound, next_actions, reward)
+                population.replay(replay, replay_batch)
+
+            agent = int(rng.choice(filtered_agents))
+            action = int(rng.integers(population.num_states))
+            step += 1
+
+            if not done or step == max_steps:
+                break
+
+        rewards.append(total_average_reward)
+        steps.append(step)
+        # 动态调整探索率
+        epsilon = max(0.01, initial_epsilon - ep / 500)
 
         if ep % 50 == 0:
             print(
@@ -77,5 +172,5 @@ def train_action(environment, episodes: int):
 
 def add_action_memory(agent: agt.Agent):
     """将位置添加到记忆中"""
-    for a in agent.actions:
-        agent.memory.match_node(a, data=a, action=True)
+    agent.memory.match_nodes([(a, a, {"action": True})
+                              for a in agent.actions])
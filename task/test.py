@@ -0,0 +1,99 @@
+import csv
+import os
+import random
+import numpy as np
+import pytest
+import combination.sound as sd
+from task.runner import completed, grid, run_replica, run_sweep
+from task.checkpoint import Checkpointer
+from task.task import train_action
+from task.benchmark import bench_replay, comprehension
+
+
+def test_run_sweep(tmp_path):
+    path = tmp_path / "sweep.csv"
+    configs = grid(seeds=[0, 1], num_agents=[4], episodes=5)
+    configs += grid(seeds=[0], num_agents=[6], episodes=5, mode="population")
+    assert run_sweep(configs[:2], path, max_workers=2) == 2
+    # 已完成的配置被跳过，只运行剩余的
+    assert run_sweep(configs, path, max_workers=2) == 1
+    assert run_sweep(configs, path) == 0
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 15 and len(completed(path)) == 3
+    # 同一配置的结果可以复现
+    seed0 = [r for r in rows if r["seed"] == "0" and r["mode"] == "action"]
+    assert [float(r["reward"]) for r in seed0] == [
+        r["reward"] for r in run_replica(configs[0])
+    ]
+
+
+def test_bench_replay():
+    from agent.population import Population
+    p = Population(3, ["cry", "laugh"], seed=0)
+    assert comprehension(p) == 0.
+    # 全部代理用声音 0 表示状态 0、声音 1 表示状态 1
+    p.q[:, 0, 0] = p.q[:, 1, 1] = 1.
+    assert comprehension(p) == 1.
+    p.q[2] = np.nan
+    # 代理 2 不认识任何声音：听不懂别人，两个状态都说声音 0
+    assert comprehension(p) == 0.5
+    result = bench_replay(num_agents=6,
+                          num_states=3,
+                          episodes=(5, ),
+                          buffers=(None, 2),
+                          seeds=range(2))
+    assert set(result) == {(None, 5), (2, 5)}
+    assert all(0. <= v <= 1. for v in result.values())
+
+
+def test_checkpoint_resume(tmp_path):
+    from agent._agent import Agent
+    from env.environment import Environment
+
+    def build(seed):
+        random.seed(seed)
+        np.random.seed(seed)
+        env = Environment()
+        for i in range(6):
+            env.add_agent(Agent(env, i, f"H-{i}"))
+        return env
+
+    def memories(env):
+        return [(a.memory.data.get_edgelist(), a.memory.data.es["weight"],
+                 a.memory.data.vs["name"], a.position.tolist())
+                for a in env.agents]
+
+    env = build(0)
+    expected = train_action(env, 12)
+
+    path = tmp_path / "checkpoint"
+    checkpoint = Checkpointer(str(path), interval=4)
+    interrupted = build(0)
+    assert train_action(interrupted, 7, checkpoint=checkpoint) == (
+        expected[0][:7], expected[1][:7])
+    # 记忆没有变化时不重新写入
+    files = sorted(os.listdir(path / "memory"))
+    assert len(files) == 6
+    state = Checkpointer(str(path)).restore(Environment())
+    assert state["episode"] == 7
+    checkpoint.save(interrupted, state, wait=True)
+    assert sorted(os.listdir(path / "memory")) == files
+
+    # 新进程中从检查点继续，结果与不中断的运行相同
+    resumed = build(2)
+    checkpoint = Checkpointer(str(path))
+    assert train_action(resumed, 12, checkpoint=checkpoint) == expected
+    assert memories(resumed) == memories(env)
+    assert all(a.env is resumed for a in resumed.agents)
+
+    # 只有变化的代理被重写
+    files = set(os.listdir(path / "memory"))
+    resumed.agents[3].receive_sound(sd.monster_roar)
+    checkpoint.save(resumed, {}, wait=True)
+    changed = set(os.listdir(path / "memory")) ^ files
+    assert {name.split(".")[0] for name in changed} == {"3"}
+    assert len(changed) == 2
+
+if __name__ == "__main__":
+    pytest.main([__file__])